@@ -1,3 +1,10 @@
 from django.contrib import admin
+from .models import AnswerCacheEntry
 
-# Register your models here.
+
+@admin.register(AnswerCacheEntry)
+class AnswerCacheEntryAdmin(admin.ModelAdmin):
+    list_display = ("id", "project", "question", "hit_count", "use_reranker", "model", "last_used_at")
+    list_filter = ("use_reranker", "model")
+    search_fields = ("question",)
+    exclude = ("query_vector",)
@@ -0,0 +1,262 @@
+import hashlib
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from django.conf import settings
+from django.db.models import F, Q
+from django.utils import timezone
+
+from knowledge_base.services.candidate_set import CandidateSet
+from knowledge_base.utils import pack_float32
+
+from .models import AnswerCacheEntry, WorkMessage
+
+# 의미 기반 답변 캐시
+#
+# - 검색(근거 확정)까지는 그대로 수행하고, LLM 호출만 생략합니다.
+# - 후보: 같은 (project, use_reranker, model, evidence_hash) 항목 → 최근 사용 순 최대 AGENT_ANSWER_CACHE_SCAN_LIMIT개
+# - 유사도: 저장된 단위 벡터 행렬 @ 질문 단위 벡터(numpy 1회)
+# - hit/miss는 assistant WorkMessage.meta["answer_cache"]에 남겨 hit rate를 집계합니다.
+
+
+def is_enabled() -> bool:
+    return settings.AGENT_ANSWER_CACHE_THRESHOLD > 0
+
+
+def evidence_signature(candidates: CandidateSet, limit: int = 8) -> Tuple[List[int], str]:
+    """
+    프롬프트에 들어가는 근거(상위 limit개)의 청크 id 목록과 집합 해시를 반환합니다.
+
+    - 순서와 무관하게 같은 청크 집합이면 같은 해시입니다.
+    """
+    ids = candidates.ids()[:limit]
+
+    raw = ",".join(str(x) for x in sorted(set(ids)))
+    return ids, hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _unit(vector) -> Optional[np.ndarray]:
+    v = np.asarray(vector, dtype=np.float32)
+    norm = float(np.linalg.norm(v))
+    if norm == 0.0:
+        return None
+    return v / norm
+
+
+def _candidates_qs(project_id: int, use_reranker: bool, model: str, evidence_hash: str):
+    return (
+        AnswerCacheEntry.objects.filter(
+            project_id=project_id,
+            use_reranker=use_reranker,
+            model=model,
+            evidence_hash=evidence_hash,
+        )
+        .order_by("-last_used_at")
+        .values_list("id", "query_vector")[: settings.AGENT_ANSWER_CACHE_SCAN_LIMIT]
+    )
+
+
+def _best_match(rows, query_vec) -> Tuple[Optional[int], float]:
+    """
+    (entry_id, query_vector) 목록에서 질문 벡터와 가장 유사한 항목을 고릅니다.
+
+    Returns:
+        Tuple[entry_id | None, similarity]: threshold 미만이면 (None, 최고 유사도)
+    """
+    q = _unit(query_vec)
+    if q is None or not rows:
+        return None, 0.0
+
+    ids = []
+    vecs = []
+    for entry_id, blob in rows:
+        v = np.frombuffer(bytes(blob), dtype="<f4")
+        if v.shape[0] != q.shape[0]:
+            continue
+        ids.append(entry_id)
+        vecs.append(v)
+
+    if not ids:
+        return None, 0.0
+
+    sims = np.vstack(vecs) @ q
+    best = int(np.argmax(sims))
+    similarity = float(sims[best])
+
+    if similarity < settings.AGENT_ANSWER_CACHE_THRESHOLD:
+        return None, similarity
+    return ids[best], similarity
+
+
+def find_cached_answer(
+    project_id: int,
+    use_reranker: bool,
+    model: str,
+    evidence_hash: str,
+    get_query_vec,
+) -> Tuple[Optional[AnswerCacheEntry], float]:
+    """
+    재사용 가능한 답변을 찾습니다.
+
+    Parameters:
+        get_query_vec: 질문 임베딩을 반환하는 함수(같은 근거 집합의 항목이 있을 때만 호출)
+
+    Returns:
+        Tuple[AnswerCacheEntry | None, similarity]
+    """
+    rows = list(_candidates_qs(project_id, use_reranker, model, evidence_hash))
+    if not rows:
+        return None, 0.0
+
+    entry_id, similarity = _best_match(rows, get_query_vec())
+    if entry_id is None:
+        return None, similarity
+
+    now = timezone.now()
+    AnswerCacheEntry.objects.filter(id=entry_id).update(hit_count=F("hit_count") + 1, last_used_at=now)
+    return AnswerCacheEntry.objects.get(id=entry_id), similarity
+
+
+async def afind_cached_answer(
+    project_id: int,
+    use_reranker: bool,
+    model: str,
+    evidence_hash: str,
+    get_query_vec,
+) -> Tuple[Optional[AnswerCacheEntry], float]:
+    """
+    find_cached_answer의 async 버전(get_query_vec는 coroutine 함수)
+    """
+    rows = []
+    async for row in _candidates_qs(project_id, use_reranker, model, evidence_hash):
+        rows.append(row)
+    if not rows:
+        return None, 0.0
+
+    entry_id, similarity = _best_match(rows, await get_query_vec())
+    if entry_id is None:
+        return None, similarity
+
+    now = timezone.now()
+    await AnswerCacheEntry.objects.filter(id=entry_id).aupdate(hit_count=F("hit_count") + 1, last_used_at=now)
+    return await AnswerCacheEntry.objects.aget(id=entry_id), similarity
+
+
+def _new_entry(project_id, use_reranker, model, question, query_vec, evidence_ids, evidence_hash, answer):
+    q = _unit(query_vec)
+    if q is None:
+        return None
+
+    return AnswerCacheEntry(
+        project_id=project_id,
+        use_reranker=use_reranker,
+        model=model,
+        question=question,
+        query_vector=pack_float32(q.tolist()),
+        evidence_ids=evidence_ids,
+        evidence_hash=evidence_hash,
+        answer=answer,
+    )
+
+
+def _overflow_ids_qs(project_id: int):
+    return (
+        AnswerCacheEntry.objects.filter(project_id=project_id)
+        .order_by("-last_used_at")
+        .values_list("id", flat=True)[settings.AGENT_ANSWER_CACHE_MAX_ENTRIES :]
+    )
+
+
+def store_answer(
+    project_id: int,
+    use_reranker: bool,
+    model: str,
+    question: str,
+    query_vec,
+    evidence_ids: List[int],
+    evidence_hash: str,
+    answer: str,
+) -> Optional[AnswerCacheEntry]:
+    """
+    새 답변을 캐시에 저장하고, 프로젝트당 AGENT_ANSWER_CACHE_MAX_ENTRIES를 넘는 오래된 항목을 지웁니다.
+    """
+    entry = _new_entry(project_id, use_reranker, model, question, query_vec, evidence_ids, evidence_hash, answer)
+    if entry is None or answer.strip() == "":
+        return None
+
+    entry.save()
+
+    overflow = list(_overflow_ids_qs(project_id))
+    if overflow:
+        AnswerCacheEntry.objects.filter(id__in=overflow).delete()
+    return entry
+
+
+async def astore_answer(
+    project_id: int,
+    use_reranker: bool,
+    model: str,
+    question: str,
+    query_vec,
+    evidence_ids: List[int],
+    evidence_hash: str,
+    answer: str,
+) -> Optional[AnswerCacheEntry]:
+    """
+    store_answer의 async 버전
+    """
+    entry = _new_entry(project_id, use_reranker, model, question, query_vec, evidence_ids, evidence_hash, answer)
+    if entry is None or answer.strip() == "":
+        return None
+
+    await entry.asave()
+
+    overflow = [entry_id async for entry_id in _overflow_ids_qs(project_id)]
+    if overflow:
+        await AnswerCacheEntry.objects.filter(id__in=overflow).adelete()
+    return entry
+
+
+def cache_meta(status: str, entry: Optional[AnswerCacheEntry] = None, similarity: float = 0.0) -> Dict[str, Any]:
+    """
+    assistant WorkMessage.meta에 남길 캐시 결과(hit rate 집계용)
+
+    status: "hit" / "miss" / "off"
+    """
+    meta: Dict[str, Any] = {"answer_cache": status}
+    if entry is not None:
+        meta["answer_cache_entry"] = entry.id
+    if status != "off":
+        meta["answer_cache_similarity"] = round(similarity, 4)
+    return meta
+
+
+def cache_stats(project_id: int, top: int = 10) -> Dict[str, Any]:
+    """
+    프로젝트의 답변 캐시 통계(조회 수, hit 수, hit rate, 자주 재사용된 항목)
+    """
+    msgs = WorkMessage.objects.filter(conversation__project_id=project_id, role="assistant")
+    hits = msgs.filter(meta__answer_cache="hit").count()
+    lookups = msgs.filter(Q(meta__answer_cache="hit") | Q(meta__answer_cache="miss")).count()
+
+    entries = AnswerCacheEntry.objects.filter(project_id=project_id)
+
+    top_entries = []
+    for e in entries.filter(hit_count__gt=0).order_by("-hit_count")[:top]:
+        top_entries.append(
+            {
+                "id": e.id,
+                "question": e.question,
+                "hit_count": e.hit_count,
+                "last_used_at": e.last_used_at.isoformat(),
+            }
+        )
+
+    return {
+        "lookups": lookups,
+        "hits": hits,
+        "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+        "entries": entries.count(),
+        "threshold": settings.AGENT_ANSWER_CACHE_THRESHOLD,
+        "top_entries": top_entries,
+    }
@@ -1,25 +1,47 @@
+import asyncio
 import json
+import logging
+import time
 
 from django.contrib.auth.decorators import login_required
 from django.http import JsonResponse
 from django.views.decorators.http import require_http_methods
 from django.conf import settings
 
-from django.shortcuts import get_object_or_404
+from django.shortcuts import aget_object_or_404, get_object_or_404
 from django.views.decorators.http import require_http_methods
 
+from . import answer_cache
 from .models import Project, WorkConversation, WorkMessage
-from knowledge_base.services.pinecone_retriever import PineconeRetriever
 
+from core.sse import sse_event, sse_response
+from knowledge_base.services.clients import get_async_openai_client, get_openai_client
 from knowledge_base.services.openai_embeddings import OpenAIEmbeddingClient
-from knowledge_base.services.pinecone_retriever import PineconeRetriever
+from knowledge_base.services.vector_store import get_retriever
+from knowledge_base.services.lexical_index import lexical_search
+from knowledge_base.services.local_reranker import LocalReranker, aload_chunk_vectors, load_chunk_vectors
 from knowledge_base.services.rag_context import (
+    fuse_matches_rrf,
     sort_matches_with_importance,
     build_context_snippets,
     build_system_rules,
 )
 
-from knowledge_base.models import KBChunk  # kb_chunk_id로 텍스트/미리보기 가져오려면 필요
+from knowledge_base.services.chunk_hydration import ahydrate_matches, hydrate_matches
+from knowledge_base.services.retrieval_cache import (
+    aget_cached_ranking,
+    aproject_version,
+    aset_cached_ranking,
+    get_cached_ranking,
+    project_version,
+    set_cached_ranking,
+)
+from knowledge_base.services.timing import StepTimer, get_fanout_pool, submit_rerank
+
+logger = logging.getLogger(__name__)
+
+# 에이전트 답변 생성 모델
+AGENT_CHAT_MODEL = "gpt-5.2"
 
 @login_required
 @require_http_methods(["GET", "POST"])
@@ -99,6 +121,16 @@ def message_list(request, conversation_id):
     return JsonResponse({"messages": items})
 
 
+@login_required
+@require_http_methods(["GET"])
+def answer_cache_stats(request, project_id):
+    """
+    프로젝트 답변 캐시 통계(hit rate, 항목 수, 자주 재사용된 질문)
+    """
+    project = get_object_or_404(Project, id=project_id, owner=request.user)
+    return JsonResponse(answer_cache.cache_stats(project.id))
+
+
 # (Step6-추가) Pinecone rerank(외부 API)
 from knowledge_base.services.pinecone_reranker import PineconeHostedReranker
 
@@ -120,179 +152,365 @@ def parse_bool(value) -> bool:
 
 
 
-@login_required
-@require_http_methods(["POST"])
-def send_message(request, conversation_id: int):
-    """
-    Step6: RAG 연결된 메시지 전송 API
-    - URL의 conversation_id만 신뢰합니다.
-    - 프로젝트 스코프는 conv.project로 제한됩니다.
-    - namespace는 user_id로 분리되어 있으므로 user scope도 자연히 제한됩니다.
+RERANKERS = ("hosted", "local")
+
+
+def parse_send_payload(request):
     """
+    send_message 요청 바디를 파싱합니다.
 
-    # 1) JSON 파싱
+    - use_reranker가 참이면 reranker("hosted" / "local", 기본 AGENT_RERANKER)로 rerank 엔진을 고릅니다.
+
+    Returns:
+        Tuple[str, str, JsonResponse | None]: (user_text, reranker("off"/"hosted"/"local"), 오류 응답)
+    """
     try:
         payload = json.loads(request.body.decode("utf-8"))
     except json.JSONDecodeError:
-        return JsonResponse({"error": "요청 바디가 JSON 형식이 아닙니다."}, status=400)
+        return "", "off", JsonResponse({"error": "요청 바디가 JSON 형식이 아닙니다."}, status=400)
 
     user_text = str(payload.get("message") or "").strip()
     if user_text == "":
-        return JsonResponse({"error": "message 가 비었습니다."}, status=400)
+        return "", "off", JsonResponse({"error": "message 가 비었습니다."}, status=400)
 
-    use_reranker = parse_bool(payload.get("use_reranker", False))
+    if not parse_bool(payload.get("use_reranker", False)):
+        return user_text, "off", None
 
-    # 2) conversation 조회 + 소유권 검증(매우 중요)
-    conv = get_object_or_404(
-        WorkConversation.objects.select_related("project"),
-        id=int(conversation_id),
-        project__owner=request.user,
-    )
-    project = conv.project
+    reranker = str(payload.get("reranker") or settings.AGENT_RERANKER).strip().lower()
+    if reranker not in RERANKERS:
+        return "", "off", JsonResponse({"error": f"reranker 는 {', '.join(RERANKERS)} 중 하나입니다."}, status=400)
+    return user_text, reranker, None
 
-    # 3) 사용자 메시지 저장
-    user_msg = WorkMessage.objects.create(
-        conversation=conv,
-        role="user",
-        content=user_text,
-    )
 
-    # 4) 임베딩 생성
+def embed_query(user_text: str):
+    """
+    질문 임베딩(ORM을 쓰지 않으므로 fan-out 스레드에서 실행 가능)
+    """
     embedder = OpenAIEmbeddingClient()
-    query_vec = embedder.embed_texts([user_text])[0]
-
-    # 5) Pinecone 검색(top_k 넉넉히)
-    retriever = PineconeRetriever()
-    raw_matches = retriever.query(
-        namespace=str(request.user.id),
-        vector=query_vec,
-        project_id=project.id,
-        top_k=30,
-        include_metadata=True,
-    )
+    return embedder.embed_texts([user_text])[0]
 
-    # 6) importance 반영 정렬
+
+def retrieve_candidates(request, conv, user_text: str, reranker: str, query_vec=None, timer=None, cache_version=None):
+    """
+    질문 임베딩 → 벡터 검색(+ 키워드 검색, RRF 결합) → importance 정렬 → KBChunk 매핑 → (옵션) rerank
+
+    Parameters:
+        reranker: "off" / "hosted" / "local"
+        query_vec: 미리 계산한 질문 임베딩(없으면 여기서 계산)
+        timer (StepTimer | None): 단계별 시간 기록기
+        cache_version: 검색 캐시 조회 때 읽은 프로젝트 버전(결과를 이 버전으로 저장, 없으면 검색 전에 읽음)
+
+    Returns:
+        List[dict]: hydrate_matches() 후보 목록(최종 순서)
+    """
+    project = conv.project
+    if timer is None:
+        timer = StepTimer()
+    if cache_version is None:
+        cache_version = project_version(project.id)
+
+    # 4) 임베딩 생성
+    if query_vec is None:
+        with timer.step("embed"):
+            query_vec = embed_query(user_text)
+
+    # 5) 벡터 검색(top_k 넉넉히, KB_VECTOR_BACKEND: pinecone/local)
+    #    하이브리드면 키워드(BM25) 검색을 fan-out 스레드에서 동시에 실행합니다(파일 역색인, ORM 없음).
+    lexical_future = None
+    if settings.KB_HYBRID_SEARCH:
+        lexical_future = get_fanout_pool().submit(timer.call, "lexical_query", lexical_search, project.id, user_text)
+
+    with timer.step("vector_query"):
+        retriever = get_retriever()
+        raw_matches = retriever.query(
+            namespace=str(request.user.id),
+            vector=query_vec,
+            project_id=project.id,
+            top_k=30,
+            include_metadata=True,
+        )
+
+    # 6) (하이브리드) RRF 결합 → importance 반영 정렬
+    if lexical_future is not None:
+        with timer.step("wait_lexical"):
+            raw_matches = fuse_lexical(conv, raw_matches, lexical_future.result)
     sorted_matches = sort_matches_with_importance(raw_matches)
 
     # 7) match -> KBChunk 매핑 (kb_chunk_id 우선, 없으면 pinecone_id로 역조회)
-    candidates = []
-    i = 0
-    while i < len(sorted_matches):
-        m = sorted_matches[i]
-        pinecone_id = m.get("id")
-        meta = m.get("metadata", {}) or {}
-
-        kb_chunk_id = meta.get("kb_chunk_id")
-
-        ch = None
-        if kb_chunk_id:
-            try:
-                ch = KBChunk.objects.select_related("document").get(
-                    id=int(kb_chunk_id),
-                    document__project=project,
-                    document__owner=request.user,
-                )
-            except KBChunk.DoesNotExist:
-                ch = None
-        else:
-            if pinecone_id:
-                try:
-                    ch = KBChunk.objects.select_related("document").get(
-                        pinecone_id=str(pinecone_id),
-                        document__project=project,
-                        document__owner=request.user,
-                    )
-                except KBChunk.DoesNotExist:
-                    ch = None
-
-        if ch is not None:
-            candidates.append(
-                {
-                    "pinecone_id": str(pinecone_id),
-                    "kb_chunk": ch,
-                    "score": m.get("score"),
-                    "final_score": m.get("final_score"),
-                }
-            )
+    #    - id__in / pinecone_id__in 일괄 조회(최대 2쿼리), 정렬 순서 유지
+    with timer.step("db_hydrate"):
+        candidates, missing_ids, stale_ids = hydrate_matches(
+            sorted_matches,
+            project_id=project.id,
+            owner_id=request.user.id,
+        )
+    if missing_ids or stale_ids:
+        logger.warning(
+            "conversation %s: %s matches not in DB, %s stale pinecone ids",
+            conv.id,
+            len(missing_ids),
+            len(stale_ids),
+        )
 
-        i = i + 1
+    # 8) (옵션) rerank: hosted(Pinecone bge-reranker-v2-m3, 시간 제한) / local(CPU)
+    #    - 안정성 우선: hosted가 실패/시간 초과면 로컬 순위로 진행(이 결과는 캐시하지 않음)
+    cacheable = True
+    if reranker != "off" and len(candidates) > 0:
+        candidates, cacheable = rerank_candidates(conv, user_text, query_vec, candidates, reranker, timer)
 
-    # 8) (옵션) Pinecone rerank(bge-reranker-v2-m3)
-    #    - 안정성 우선: 실패하면 rerank 없이 진행
-    if use_reranker and len(candidates) > 0:
-        reranker = PineconeHostedReranker()
+    if cacheable:
+        set_cached_ranking(
+            str(request.user.id), project.id, user_text, reranker, candidates, cache_version, query_vec=query_vec
+        )
 
-        docs = []
-        j = 0
-        while j < len(candidates):
-            ch = candidates[j]["kb_chunk"]
-            docs.append(
-                {
-                    "id": candidates[j]["pinecone_id"],
-                    "text": ch.chunk_text,
-                }
+    return candidates
+
+
+def fuse_lexical(conv, vector_matches, get_lexical_matches):
+    """
+    키워드 검색 결과를 벡터 검색 결과와 RRF로 합칩니다.
+
+    - 안정성 우선: 키워드 검색이 실패하면 벡터 검색 결과만 사용합니다.
+    """
+    try:
+        lexical_matches = get_lexical_matches()
+    except Exception:
+        logger.warning("conversation %s: lexical search failed", conv.id, exc_info=True)
+        return vector_matches
+
+    return fuse_matches_rrf(vector_matches, lexical_matches, k=settings.KB_RRF_K)
+
+
+async def aembed_query(user_text: str):
+    embedder = OpenAIEmbeddingClient()
+    return (await embedder.aembed_texts([user_text]))[0]
+
+
+async def aretrieve_candidates(
+    request, conv, user_text: str, reranker: str, query_vec=None, timer=None, cache_version=None
+):
+    """
+    retrieve_candidates의 async 버전
+
+    - 임베딩: AsyncOpenAI / 검색·rerank: PineconeAsyncio(없으면 스레드 실행)
+    - KBChunk 매핑: async ORM
+    """
+    project = conv.project
+    user = await request.auser()
+    if timer is None:
+        timer = StepTimer()
+    if cache_version is None:
+        cache_version = await aproject_version(project.id)
+
+    if query_vec is None:
+        with timer.step("embed"):
+            query_vec = await aembed_query(user_text)
+
+    lexical_task = None
+    if settings.KB_HYBRID_SEARCH:
+        lexical_task = asyncio.ensure_future(
+            asyncio.to_thread(timer.call, "lexical_query", lexical_search, project.id, user_text)
+        )
+
+    try:
+        with timer.step("vector_query"):
+            retriever = get_retriever()
+            raw_matches = await retriever.aquery(
+                namespace=str(user.id),
+                vector=query_vec,
+                project_id=project.id,
+                top_k=30,
+                include_metadata=True,
             )
-            j = j + 1
+    except BaseException:
+        if lexical_task is not None:
+            lexical_task.cancel()
+        raise
+
+    if lexical_task is not None:
+        with timer.step("wait_lexical"):
+            await asyncio.wait([lexical_task])
+        raw_matches = fuse_lexical(conv, raw_matches, lexical_task.result)
+    sorted_matches = sort_matches_with_importance(raw_matches)
 
-        try:
-            reranked = reranker.rerank(
+    with timer.step("db_hydrate"):
+        candidates, missing_ids, stale_ids = await ahydrate_matches(
+            sorted_matches,
+            project_id=project.id,
+            owner_id=user.id,
+        )
+    if missing_ids or stale_ids:
+        logger.warning(
+            "conversation %s: %s matches not in DB, %s stale pinecone ids",
+            conv.id,
+            len(missing_ids),
+            len(stale_ids),
+        )
+
+    cacheable = True
+    if reranker != "off" and len(candidates) > 0:
+        candidates, cacheable = await arerank_candidates(conv, user_text, query_vec, candidates, reranker, timer)
+
+    if cacheable:
+        await aset_cached_ranking(
+            str(user.id), project.id, user_text, reranker, candidates, cache_version, query_vec=query_vec
+        )
+
+    return candidates
+
+
+def rerank_documents(candidates):
+    """
+    rerank 요청 documents([{"id", "text"}])를 만듭니다.
+
+    - id는 kb_chunk_id입니다(키워드 검색으로만 찾은 미인덱싱 청크는 벡터 id가 없음).
+    """
+    docs = []
+    for cand in candidates:
+        docs.append(
+            {
+                "id": str(cand["kb_chunk_id"]),
+                "text": cand["chunk_text"],
+            }
+        )
+
+    return docs
+
+
+def hosted_rerank(user_text: str, documents):
+    """
+    Pinecone hosted rerank(클라이언트 생성 실패도 호출 실패로 처리되도록 fan-out 스레드 안에서 생성)
+    """
+    return PineconeHostedReranker().rerank(
+        query=user_text,
+        documents=documents,
+        top_n=8,
+        rank_fields=["text"],
+    )
+
+
+def local_rerank(user_text: str, query_vec, documents, vectors):
+    """
+    로컬 reranker 순서(hosted와 같은 top_n)
+    """
+    return LocalReranker().rerank(
+        query=user_text,
+        documents=documents,
+        top_n=8,
+        query_vec=query_vec,
+        vectors=vectors,
+    )
+
+
+def rerank_candidates(conv, user_text: str, query_vec, candidates, reranker: str, timer: StepTimer):
+    """
+    후보를 rerank합니다.
+
+    - hosted: Pinecone rerank를 전용 스레드풀(submit_rerank)에서 호출하고, 기다리는 동안 로컬 순위를 미리 계산합니다.
+      AGENT_RERANK_TIMEOUT 안에 응답이 없거나 실패하면 hosted 결과를 버리고 로컬 순위를 사용합니다.
+      전용 풀이 느린 호출로 꽉 차 있으면 hosted를 호출하지 않습니다.
+    - local: 로컬 순위만 계산합니다(외부 호출 없음).
+
+    Returns:
+        Tuple[List[dict], bool]: (재배열된 후보, 검색 캐시에 저장해도 되는지)
+    """
+    documents = rerank_documents(candidates)
+
+    hosted_future = None
+    if reranker == "hosted":
+        deadline = time.perf_counter() + settings.AGENT_RERANK_TIMEOUT
+        hosted_future = submit_rerank(timer.call, "rerank_hosted", hosted_rerank, user_text, documents)
+        if hosted_future is None:
+            logger.warning("conversation %s: hosted rerank pool is full; using local ranking", conv.id)
+
+    # 청크 임베딩 조회(DB)는 요청 스레드에서
+    with timer.step("rerank_local"):
+        vectors = load_chunk_vectors(candidates.ids())
+        local_order = local_rerank(user_text, query_vec, documents, vectors)
+
+    # hosted를 요청했는데 호출하지 못한 결과는 캐시하지 않음
+    if hosted_future is None:
+        return apply_rerank_order(candidates, local_order), reranker != "hosted"
+
+    try:
+        with timer.step("wait_rerank"):
+            reranked = hosted_future.result(timeout=max(0.0, deadline - time.perf_counter()))
+        return apply_rerank_order(candidates, reranked), True
+    except Exception:
+        hosted_future.cancel()
+        logger.warning("conversation %s: hosted rerank failed or timed out; using local ranking", conv.id, exc_info=True)
+        return apply_rerank_order(candidates, local_order), False
+
+
+async def arerank_candidates(conv, user_text: str, query_vec, candidates, reranker: str, timer: StepTimer):
+    """
+    rerank_candidates의 async 버전(시간 초과 시 hosted 호출을 취소)
+    """
+    documents = rerank_documents(candidates)
+
+    async def timed_hosted():
+        with timer.step("rerank_hosted"):
+            return await PineconeHostedReranker().arerank(
                 query=user_text,
-                documents=docs,
+                documents=documents,
                 top_n=8,
                 rank_fields=["text"],
             )
 
-            order = []
-            k = 0
-            while k < len(reranked):
-                rid = reranked[k].get("id")
-                if rid:
-                    order.append(str(rid))
-                k = k + 1
+    hosted_task = None
+    if reranker == "hosted":
+        deadline = time.perf_counter() + settings.AGENT_RERANK_TIMEOUT
+        hosted_task = asyncio.ensure_future(timed_hosted())
 
-            new_candidates = []
-            k = 0
-            while k < len(order):
-                target_id = order[k]
+    try:
+        with timer.step("rerank_local"):
+            vectors = await aload_chunk_vectors(candidates.ids())
+            local_order = local_rerank(user_text, query_vec, documents, vectors)
+    except BaseException:
+        if hosted_task is not None:
+            hosted_task.cancel()
+        raise
 
-                t = 0
-                while t < len(candidates):
-                    if candidates[t]["pinecone_id"] == target_id:
-                        new_candidates.append(candidates[t])
-                        break
-                    t = t + 1
+    if hosted_task is None:
+        return apply_rerank_order(candidates, local_order), True
 
-                k = k + 1
+    try:
+        with timer.step("wait_rerank"):
+            reranked = await asyncio.wait_for(hosted_task, timeout=max(0.0, deadline - time.perf_counter()))
+        return apply_rerank_order(candidates, reranked), True
+    except Exception:
+        logger.warning("conversation %s: hosted rerank failed or timed out; using local ranking", conv.id, exc_info=True)
+        return apply_rerank_order(candidates, local_order), False
 
-            if len(new_candidates) > 0:
-                candidates = new_candidates
 
-        except Exception:
-            pass
+def apply_rerank_order(candidates, reranked):
+    """
+    rerank 결과 순서대로 후보를 재배열합니다(결과가 비면 기존 순서 유지).
+
+    - rerank id는 kb_chunk_id이므로 CandidateSet.reorder로 O(n)에 재배열합니다.
+    """
+    return candidates.reorder(r.get("id") for r in reranked)
+
 
+def build_chat_messages(user_text: str, candidates):
+    """
+    근거 컨텍스트와 시스템 규칙으로 Chat Completions messages를 구성합니다.
+    """
     # 9) 프롬프트 구성(importance 반영: 높은 것 우선, 최대 8개)
     context_blocks = []
-    c = 0
-    while c < len(candidates) and c < 8:
-        ch = candidates[c]["kb_chunk"]
-        title = ch.document.title
-        imp = ch.importance
-        idx = ch.chunk_index
+    for cand in candidates.top(8):
+        title = cand["doc_title"]
+        imp = cand["importance"]
+        idx = cand["chunk_index"]
 
         block = (
             f"[문서: {title} | chunk #{idx} | importance={imp}]\n"
-            f"{ch.chunk_text}\n"
+            f"{cand['chunk_text']}\n"
         )
         context_blocks.append(block)
 
-        c = c + 1
-
     context_text = "\n\n".join(context_blocks).strip()
 
-    # 10) GPT 호출
-    from openai import OpenAI
-    client = OpenAI(api_key=settings.OPENAI_API_KEY)
-
     system_rules = build_system_rules()
 
     messages = []
@@ -305,44 +523,489 @@ def send_message(request, conversation_id: int):
 
     messages.append({"role": "user", "content": user_text})
 
-    resp = client.chat.completions.create(
-        model="gpt-5.2",
-        messages=messages,
+    return messages
+
+
+def build_evidence(candidates, limit: int = 5):
+    """
+    화면 표시용 근거 Top-N 목록을 만듭니다.
+    """
+    evidence = []
+    for cand in candidates.top(limit):
+        text = cand["chunk_text"]
+        evidence.append(
+            {
+                "kb_chunk_id": cand["kb_chunk_id"],
+                "pinecone_id": cand["pinecone_id"],
+                "document_id": cand["document_id"],
+                "doc_title": cand["doc_title"],
+                "chunk_index": cand["chunk_index"],
+                "importance": cand["importance"],
+                "tags": cand["tags"],
+                "text_preview": (text[:300] + "...") if len(text) > 300 else text,
+            }
+        )
+
+    return evidence
+
+
+def prepare_turn(request, conversation_id: int, user_text: str, reranker: str, timer: StepTimer):
+    """
+    메시지 1턴의 준비 단계(검색까지)를 실행합니다.
+
+    순서:
+        - conversation 조회(소유권 검증, 로컬 DB) 후 검색 결과 캐시를 확인합니다.
+        - 캐시 hit: 임베딩/Pinecone 검색/rerank를 모두 건너뛰고 캐시된 청크 순서로 KBChunk만 조회합니다.
+          질문 임베딩도 캐시 항목에 저장된 값을 씁니다(답변 캐시 조회/저장용).
+        - 캐시 miss: 질문 임베딩(OpenAI)을 fan-out 스레드에서 시작하고,
+          그동안 요청 스레드에서 사용자 메시지를 저장한 뒤 Pinecone 검색 → 매핑 → rerank를 진행합니다.
+        - DB 작업은 모두 요청 스레드에서만 수행합니다(스레드별 커넥션을 만들지 않음).
+
+    Returns:
+        Tuple[WorkConversation, List[dict], bool, List[float] | None]:
+            (conversation, 후보 목록, 검색 캐시 hit 여부, 질문 임베딩(캐시 hit면 캐시에 저장된 값, 없으면 None))
+    """
+    # conversation 조회 + 소유권 검증(매우 중요)
+    with timer.step("db_conversation"):
+        conv = get_object_or_404(
+            WorkConversation.objects.select_related("project"),
+            id=int(conversation_id),
+            project__owner=request.user,
+        )
+
+    with timer.step("cache_lookup"):
+        cached_matches, cached_vec, cache_version = get_cached_ranking(
+            str(request.user.id), conv.project_id, user_text, reranker
+        )
+
+    embed_future = None
+    if cached_matches is None:
+        embed_future = get_fanout_pool().submit(timer.call, "embed", embed_query, user_text)
+
+    try:
+        # 사용자 메시지 저장
+        with timer.step("db_save_user"):
+            WorkMessage.objects.create(
+                conversation=conv,
+                role="user",
+                content=user_text,
+            )
+    except BaseException:
+        if embed_future is not None:
+            embed_future.cancel()
+        raise
+
+    if cached_matches is not None:
+        with timer.step("db_hydrate"):
+            candidates, missing_ids, stale_ids = hydrate_matches(
+                cached_matches,
+                project_id=conv.project_id,
+                owner_id=request.user.id,
+            )
+        return conv, candidates, True, cached_vec
+
+    with timer.step("wait_embed"):
+        query_vec = embed_future.result()
+
+    candidates = retrieve_candidates(
+        request, conv, user_text, reranker, query_vec=query_vec, timer=timer, cache_version=cache_version
     )
+    return conv, candidates, False, query_vec
+
+
+async def aprepare_turn(request, conversation_id: int, user_text: str, reranker: str, timer: StepTimer):
+    """
+    prepare_turn의 async 버전(캐시 miss면 임베딩과 사용자 메시지 저장을 겹침)
+    """
+    user = await request.auser()
+
+    with timer.step("db_conversation"):
+        conv = await aget_object_or_404(
+            WorkConversation.objects.select_related("project"),
+            id=int(conversation_id),
+            project__owner=user,
+        )
+
+    with timer.step("cache_lookup"):
+        cached_matches, cached_vec, cache_version = await aget_cached_ranking(
+            str(user.id), conv.project_id, user_text, reranker
+        )
+
+    async def timed_embed():
+        with timer.step("embed"):
+            return await aembed_query(user_text)
 
-    answer_text = resp.choices[0].message.content or ""
+    embed_task = None
+    if cached_matches is None:
+        embed_task = asyncio.ensure_future(timed_embed())
+
+    try:
+        with timer.step("db_save_user"):
+            await WorkMessage.objects.acreate(
+                conversation=conv,
+                role="user",
+                content=user_text,
+            )
+    except BaseException:
+        if embed_task is not None:
+            embed_task.cancel()
+        raise
+
+    if cached_matches is not None:
+        with timer.step("db_hydrate"):
+            candidates, missing_ids, stale_ids = await ahydrate_matches(
+                cached_matches,
+                project_id=conv.project_id,
+                owner_id=user.id,
+            )
+        return conv, candidates, True, cached_vec
 
-    # 11) assistant 메시지 저장
-    asst_msg = WorkMessage.objects.create(
-        conversation=conv,
-        role="assistant",
-        content=answer_text,
+    query_vec = await embed_task
+
+    candidates = await aretrieve_candidates(
+        request, conv, user_text, reranker, query_vec=query_vec, timer=timer, cache_version=cache_version
     )
+    return conv, candidates, False, query_vec
+
+
+class AnswerCacheTurn:
+    """
+    한 턴의 답변 캐시 조회/저장 상태
+
+    - 질문 임베딩은 검색 단계의 값(검색 캐시 hit면 캐시 항목에 저장된 값)을 그대로 씁니다.
+      그 값이 없을 때만(임베딩 저장 전 형식의 캐시 항목) 필요한 시점에 계산합니다.
+    """
+
+    def __init__(self, conv, user_text: str, use_reranker: bool, candidates, query_vec, timer: StepTimer):
+        self.conv = conv
+        self.user_text = user_text
+        self.use_reranker = use_reranker
+        self.query_vec = query_vec
+        self.timer = timer
+        self.evidence_ids, self.evidence_hash = answer_cache.evidence_signature(candidates)
+        self.enabled = answer_cache.is_enabled() and len(self.evidence_ids) > 0
+        self.entry = None
+        self.meta = answer_cache.cache_meta("off")
+
+    def get_query_vec(self):
+        if self.query_vec is None:
+            with self.timer.step("embed"):
+                self.query_vec = embed_query(self.user_text)
+        return self.query_vec
+
+    async def aget_query_vec(self):
+        if self.query_vec is None:
+            with self.timer.step("embed"):
+                self.query_vec = await aembed_query(self.user_text)
+        return self.query_vec
+
+    def lookup(self):
+        """
+        재사용할 답변이 있으면 답변 문자열, 없으면 None
+        """
+        if not self.enabled:
+            return None
+
+        self.entry, similarity = answer_cache.find_cached_answer(
+            self.conv.project_id,
+            self.use_reranker,
+            AGENT_CHAT_MODEL,
+            self.evidence_hash,
+            self.get_query_vec,
+        )
+        return self._after_lookup(similarity)
+
+    async def alookup(self):
+        if not self.enabled:
+            return None
+
+        self.entry, similarity = await answer_cache.afind_cached_answer(
+            self.conv.project_id,
+            self.use_reranker,
+            AGENT_CHAT_MODEL,
+            self.evidence_hash,
+            self.aget_query_vec,
+        )
+        return self._after_lookup(similarity)
+
+    def _after_lookup(self, similarity: float):
+        if self.entry is None:
+            self.meta = answer_cache.cache_meta("miss", similarity=similarity)
+            return None
+
+        self.meta = answer_cache.cache_meta("hit", self.entry, similarity)
+        return self.entry.answer
+
+    def remember(self, answer_text: str) -> None:
+        """
+        LLM이 새로 만든 답변을 저장합니다(캐시 miss였던 턴만).
+        """
+        if self.meta["answer_cache"] != "miss":
+            return
+
+        answer_cache.store_answer(
+            self.conv.project_id,
+            self.use_reranker,
+            AGENT_CHAT_MODEL,
+            self.user_text,
+            self.get_query_vec(),
+            self.evidence_ids,
+            self.evidence_hash,
+            answer_text,
+        )
+
+    async def aremember(self, answer_text: str) -> None:
+        if self.meta["answer_cache"] != "miss":
+            return
+
+        await answer_cache.astore_answer(
+            self.conv.project_id,
+            self.use_reranker,
+            AGENT_CHAT_MODEL,
+            self.user_text,
+            await self.aget_query_vec(),
+            self.evidence_ids,
+            self.evidence_hash,
+            answer_text,
+        )
+
+
+@login_required
+@require_http_methods(["POST"])
+def send_message(request, conversation_id: int):
+    """
+    Step6: RAG 연결된 메시지 전송 API
+    - URL의 conversation_id만 신뢰합니다.
+    - 프로젝트 스코프는 conv.project로 제한됩니다.
+    - namespace는 user_id로 분리되어 있으므로 user scope도 자연히 제한됩니다.
+    """
+
+    # 1) JSON 파싱
+    user_text, reranker, error_response = parse_send_payload(request)
+    if error_response is not None:
+        return error_response
+
+    timer = StepTimer()
+
+    # 2~8) conversation 조회 → 검색 캐시 확인 → (miss) 사용자 메시지 저장 ∥ 질문 임베딩 → 검색/매핑/rerank
+    conv, candidates, cache_hit, query_vec = prepare_turn(request, conversation_id, user_text, reranker, timer)
+
+    # 9) 의미 기반 답변 캐시(같은 근거 + 유사한 질문이면 LLM 생략)
+    turn = AnswerCacheTurn(conv, user_text, reranker != "off", candidates, query_vec, timer)
+    with timer.step("answer_cache"):
+        answer_text = turn.lookup()
+
+    # 10) 프롬프트 구성 + GPT 호출(프로세스 공용 클라이언트)
+    if answer_text is None:
+        messages = build_chat_messages(user_text, candidates)
+
+        with timer.step("llm"):
+            client = get_openai_client()
+            resp = client.chat.completions.create(
+                model=AGENT_CHAT_MODEL,
+                messages=messages,
+            )
+
+        answer_text = resp.choices[0].message.content or ""
+
+        with timer.step("answer_cache"):
+            turn.remember(answer_text)
+
+    # 11) assistant 메시지 저장(meta: 답변 캐시 결과 → hit rate 집계)
+    with timer.step("db_save_assistant"):
+        asst_msg = WorkMessage.objects.create(
+            conversation=conv,
+            role="assistant",
+            content=answer_text,
+            meta=turn.meta,
+        )
+
+    timings = timer.as_dict()
+    logger.info("send_message conversation=%s timings_ms=%s", conv.id, timings)
 
     # 12) Step7 대비: 근거 Top-5 반환
-    evidence = []
-    e = 0
-    while e < len(candidates) and e < 5:
-        ch = candidates[e]["kb_chunk"]
-        evidence.append(
+    return JsonResponse(
+        {
+            "message_id": asst_msg.id,
+            "answer": answer_text,
+            "evidence_top5": build_evidence(candidates),
+            "use_reranker": reranker != "off",
+            "reranker": reranker,
+            "retrieval_cache": "hit" if cache_hit else "miss",
+            "answer_cache": turn.meta["answer_cache"],
+            "timings_ms": timings,
+        }
+    )
+
+
+@login_required
+@require_http_methods(["POST"])
+def send_message_stream(request, conversation_id: int):
+    """
+    send_message의 스트리밍(SSE) 버전
+
+    이벤트 순서:
+        - evidence: {"evidence_top5": [...], "use_reranker": bool, "reranker": "off"|"hosted"|"local",
+                     "retrieval_cache": "hit"|"miss", "answer_cache": "hit"|"miss"|"off"}
+                    (검색 직후, 답변 생성 전)
+        - delta:    {"text": "..."}                                 (토큰이 도착하는 대로)
+        - done:     {"message_id": int}                             (assistant 메시지 저장 후)
+        - error:    {"error": "..."}                                (생성 중 오류)
+
+    - 검색/매핑 단계 오류는 스트림 시작 전이므로 일반 JSON 오류 응답으로 반환합니다.
+    - 답변 캐시 hit면 delta 1개로 전체 답변을 보냅니다.
+    - 클라이언트가 중간에 끊어도 그때까지 받은 답변은 WorkMessage로 저장합니다(캐시에는 저장하지 않음).
+    """
+    user_text, reranker, error_response = parse_send_payload(request)
+    if error_response is not None:
+        return error_response
+
+    timer = StepTimer()
+    conv, candidates, cache_hit, query_vec = prepare_turn(request, conversation_id, user_text, reranker, timer)
+
+    turn = AnswerCacheTurn(conv, user_text, reranker != "off", candidates, query_vec, timer)
+    with timer.step("answer_cache"):
+        cached_answer = turn.lookup()
+
+    messages = build_chat_messages(user_text, candidates)
+    evidence = build_evidence(candidates)
+
+    def event_stream():
+        yield sse_event(
+            "evidence",
             {
-                "kb_chunk_id": ch.id,
-                "pinecone_id": ch.pinecone_id,
-                "document_id": ch.document_id,
-                "doc_title": ch.document.title,
-                "chunk_index": ch.chunk_index,
-                "importance": ch.importance,
-                "tags": ch.tags,
-                "text_preview": (ch.chunk_text[:300] + "...") if len(ch.chunk_text) > 300 else ch.chunk_text,
-            }
+                "evidence_top5": evidence,
+                "use_reranker": reranker != "off",
+                "reranker": reranker,
+                "retrieval_cache": "hit" if cache_hit else "miss",
+                "answer_cache": turn.meta["answer_cache"],
+                "timings_ms": timer.as_dict(),
+            },
+        )
+
+        if cached_answer is not None:
+            yield sse_event("delta", {"text": cached_answer})
+            asst_msg = WorkMessage.objects.create(
+                conversation=conv,
+                role="assistant",
+                content=cached_answer,
+                meta=turn.meta,
+            )
+            yield sse_event("done", {"message_id": asst_msg.id, "timings_ms": timer.as_dict()})
+            return
+
+        parts = []
+        saved = False
+        try:
+            client = get_openai_client()
+            t_llm = time.perf_counter()
+            stream = client.chat.completions.create(
+                model=AGENT_CHAT_MODEL,
+                messages=messages,
+                stream=True,
+            )
+
+            for chunk in stream:
+                if not chunk.choices:
+                    continue
+                text = chunk.choices[0].delta.content or ""
+                if text == "":
+                    continue
+                if not parts:
+                    timer.add("llm_first_token", time.perf_counter() - t_llm)
+                parts.append(text)
+                yield sse_event("delta", {"text": text})
+
+            timer.add("llm", time.perf_counter() - t_llm)
+
+            answer_text = "".join(parts)
+            with timer.step("answer_cache"):
+                turn.remember(answer_text)
+
+            asst_msg = WorkMessage.objects.create(
+                conversation=conv,
+                role="assistant",
+                content=answer_text,
+                meta=turn.meta,
+            )
+            saved = True
+
+            timings = timer.as_dict()
+            logger.info("send_message_stream conversation=%s timings_ms=%s", conv.id, timings)
+            yield sse_event("done", {"message_id": asst_msg.id, "timings_ms": timings})
+
+        except Exception as e:
+            logger.exception("streaming reply failed (conversation %s)", conv.id)
+            yield sse_event("error", {"error": f"OpenAI API 호출 중 오류가 발생했습니다: {e}"})
+
+        finally:
+            # 연결이 끊겨 generator가 닫힌 경우에도 받은 부분까지는 저장
+            if not saved and parts:
+                WorkMessage.objects.create(
+                    conversation=conv,
+                    role="assistant",
+                    content="".join(parts),
+                    meta=turn.meta,
+                )
+
+    return sse_response(event_stream())
+
+
+@login_required
+@require_http_methods(["POST"])
+async def send_message_async(request, conversation_id: int):
+    """
+    send_message의 async 버전(ASGI에서 LLM 응답 대기 중에 워커 스레드를 점유하지 않음)
+
+    - OpenAI: AsyncOpenAI / Pinecone: PineconeAsyncio / DB: async ORM
+    - 요청/응답 형식은 send_message와 같습니다.
+    """
+    user_text, reranker, error_response = parse_send_payload(request)
+    if error_response is not None:
+        return error_response
+
+    timer = StepTimer()
+    conv, candidates, cache_hit, query_vec = await aprepare_turn(request, conversation_id, user_text, reranker, timer)
+
+    turn = AnswerCacheTurn(conv, user_text, reranker != "off", candidates, query_vec, timer)
+    with timer.step("answer_cache"):
+        answer_text = await turn.alookup()
+
+    if answer_text is None:
+        messages = build_chat_messages(user_text, candidates)
+
+        with timer.step("llm"):
+            client = get_async_openai_client()
+            resp = await client.chat.completions.create(
+                model=AGENT_CHAT_MODEL,
+                messages=messages,
+            )
+
+        answer_text = resp.choices[0].message.content or ""
+
+        with timer.step("answer_cache"):
+            await turn.aremember(answer_text)
+
+    with timer.step("db_save_assistant"):
+        asst_msg = await WorkMessage.objects.acreate(
+            conversation=conv,
+            role="assistant",
+            content=answer_text,
+            meta=turn.meta,
         )
-        e = e + 1
+
+    timings = timer.as_dict()
+    logger.info("send_message_async conversation=%s timings_ms=%s", conv.id, timings)
 
     return JsonResponse(
         {
             "message_id": asst_msg.id,
             "answer": answer_text,
-            "evidence_top5": evidence,
-            "use_reranker": use_reranker,
+            "evidence_top5": build_evidence(candidates),
+            "use_reranker": reranker != "off",
+            "reranker": reranker,
+            "retrieval_cache": "hit" if cache_hit else "miss",
+            "answer_cache": turn.meta["answer_cache"],
+            "timings_ms": timings,
         }
-    )
\ No newline at end of file
+    )
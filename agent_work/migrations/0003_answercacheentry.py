@@ -0,0 +1,35 @@
+# Generated by Django 5.2.10 on 2026-10-17 13:21
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agent_work', '0002_workconversation_workmessage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnswerCacheEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('use_reranker', models.BooleanField(default=False)),
+                ('model', models.CharField(max_length=50)),
+                ('question', models.TextField()),
+                ('query_vector', models.BinaryField(help_text='L2 정규화된 float32 packed 질문 임베딩')),
+                ('evidence_ids', models.JSONField(default=list)),
+                ('evidence_hash', models.CharField(max_length=64)),
+                ('answer', models.TextField()),
+                ('hit_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('last_used_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='answer_cache_entries', to='agent_work.project')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['project', 'evidence_hash'], name='agent_work__project_7405f6_idx'), models.Index(fields=['project', 'last_used_at'], name='agent_work__project_e88a41_idx')],
+            },
+        ),
+    ]
@@ -94,3 +94,48 @@ class WorkMessage(models.Model):
 
     def __str__(self):
         return f"{self.conversation_id}:{self.role}:{self.created_at}"
+
+
+class AnswerCacheEntry(models.Model):
+    """
+    의미 기반 답변 캐시 항목입니다(프로젝트 단위).
+
+    조회 규칙:
+        - 같은 프로젝트/rerank 여부/답변 모델에서
+        - 근거 청크 집합(evidence_hash)이 현재 검색 결과와 같고
+        - 질문 임베딩 코사인 유사도가 AGENT_ANSWER_CACHE_THRESHOLD 이상이면
+        → LLM을 호출하지 않고 answer를 그대로 사용합니다.
+
+    근거 청크가 바뀌면(문서 재업로드/삭제) evidence_hash가 달라지므로 자연히 hit되지 않습니다.
+    """
+
+    project = models.ForeignKey(
+        Project,
+        on_delete=models.CASCADE,
+        related_name="answer_cache_entries",
+    )
+
+    use_reranker = models.BooleanField(default=False)
+    model = models.CharField(max_length=50)
+
+    question = models.TextField()
+    # 단위 벡터(L2 정규화)로 저장 → 코사인 유사도 = 내적
+    query_vector = models.BinaryField(help_text="L2 정규화된 float32 packed 질문 임베딩")
+
+    evidence_ids = models.JSONField(default=list)
+    evidence_hash = models.CharField(max_length=64)
+
+    answer = models.TextField()
+
+    hit_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(default=timezone.now)
+    last_used_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["project", "evidence_hash"]),
+            models.Index(fields=["project", "last_used_at"]),
+        ]
+
+    def __str__(self):
+        return f"{self.project_id}:{self.question[:30]}"
@@ -1,3 +1,27 @@
 from django.test import TestCase
 
-# Create your tests here.
+from knowledge_base.services.candidate_set import CandidateSet
+
+from .api_views import apply_rerank_order
+
+
+def cand(chunk_id: int) -> dict:
+    return {"kb_chunk_id": chunk_id, "doc_title": f"문서{chunk_id}", "chunk_text": "본문"}
+
+
+class ApplyRerankOrderTests(TestCase):
+    """
+    rerank 결과(id = kb_chunk_id 문자열) 순서로 후보 재배열
+    """
+
+    def test_follows_rerank_order(self):
+        candidates = CandidateSet([cand(1), cand(2), cand(3)])
+        reranked = [{"id": "3", "score": 0.9}, {"id": "1", "score": 0.5}]
+
+        self.assertEqual(apply_rerank_order(candidates, reranked).ids(), [3, 1])
+
+    def test_empty_or_unknown_rerank_keeps_order(self):
+        candidates = CandidateSet([cand(1), cand(2)])
+
+        self.assertEqual(apply_rerank_order(candidates, []).ids(), [1, 2])
+        self.assertEqual(apply_rerank_order(candidates, [{"id": "9"}, {}]).ids(), [1, 2])
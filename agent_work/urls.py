@@ -8,6 +8,9 @@ urlpatterns = [
 
     # API
     path("api/project/<int:project_id>/conversations/", api_views.conversation_list_create, name="conversation_list_create"),
+    path("api/project/<int:project_id>/answer-cache/", api_views.answer_cache_stats, name="answer_cache_stats"),
     path("api/conversation/<int:conversation_id>/messages/", api_views.message_list, name="message_list"),
     path("api/conversation/<int:conversation_id>/send/", api_views.send_message, name="send_message"),
+    path("api/conversation/<int:conversation_id>/send/stream/", api_views.send_message_stream, name="send_message_stream"),
+    path("api/conversation/<int:conversation_id>/send/async/", api_views.send_message_async, name="send_message_async"),
 ]
\ No newline at end of file
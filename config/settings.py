@@ -20,15 +20,109 @@ if not OPENAI_API_KEY:
 
 OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-5.2")
 
+# OpenAI HTTP 커넥션 풀(프로세스 공용 클라이언트, keep-alive)
+OPENAI_HTTP_MAX_CONNECTIONS = int(os.getenv("OPENAI_HTTP_MAX_CONNECTIONS", "20"))
+OPENAI_HTTP_KEEPALIVE = int(os.getenv("OPENAI_HTTP_KEEPALIVE", "10"))
+OPENAI_HTTP_TIMEOUT = float(os.getenv("OPENAI_HTTP_TIMEOUT", "120"))
+
 
 PINECONE_API_KEY = os.getenv("PINECONE_API_KEY", "")
 PINECONE_INDEX_NAME = os.getenv("PINECONE_INDEX_NAME", "cj-demo")
 PINECONE_HOST = os.getenv("PINECONE_HOST", "")
+# pinecone[grpc]가 설치되어 있으면 gRPC 채널을 재사용(0이면 REST)
+PINECONE_USE_GRPC = os.getenv("PINECONE_USE_GRPC", "1") == "1"
 
 # Step 5: Embedding 설정(고정)
 OPENAI_EMBEDDING_MODEL = "text-embedding-3-large"
 OPENAI_EMBEDDING_DIM = 1024
 
+# 벡터 검색 백엔드: pinecone(기본) / local(프로젝트별 numpy 행렬 파일, 외부 서비스 없음) / local_ivf
+KB_VECTOR_BACKEND = os.getenv("KB_VECTOR_BACKEND", "pinecone")
+KB_LOCAL_INDEX_DIR = os.getenv("KB_LOCAL_INDEX_DIR", str(BASE_DIR / "var" / "vector_index"))
+#   local_ivf: local + IVF 근사 검색(학습 최소 행 수 / 목록 수(0이면 sqrt(n)) / 검색할 목록 수 / 재학습 배수)
+KB_IVF_MIN_TRAIN_ROWS = int(os.getenv("KB_IVF_MIN_TRAIN_ROWS", "20000"))
+KB_IVF_NLIST = int(os.getenv("KB_IVF_NLIST", "0"))
+KB_IVF_NPROBE = int(os.getenv("KB_IVF_NPROBE", "16"))
+KB_IVF_RETRAIN_GROWTH = float(os.getenv("KB_IVF_RETRAIN_GROWTH", "4"))
+
+# 하이브리드 검색: 벡터 검색 + 프로젝트별 BM25(문자 2-gram) 결과를 RRF로 결합(0이면 벡터 검색만)
+# - 역색인 segment 디렉터리 / 키워드 검색 후보 수 / RRF k
+# - 역색인은 프로세스마다 메모리에 올라가므로 기본은 꺼 둡니다.
+#   켜기 전에 `manage.py kb_lexical_index`로 기존 문서를 색인합니다.
+# - KB_LEXICAL_MAX_PROJECTS: 프로세스가 메모리에 유지하는 프로젝트 역색인 수(LRU)
+KB_HYBRID_SEARCH = os.getenv("KB_HYBRID_SEARCH", "0") == "1"
+KB_LEXICAL_INDEX_DIR = os.getenv("KB_LEXICAL_INDEX_DIR", str(BASE_DIR / "var" / "lexical_index"))
+KB_LEXICAL_MAX_PROJECTS = int(os.getenv("KB_LEXICAL_MAX_PROJECTS", "8"))
+KB_LEXICAL_TOP_K = int(os.getenv("KB_LEXICAL_TOP_K", "30"))
+KB_RRF_K = int(os.getenv("KB_RRF_K", "60"))
+
+# 임베딩 로컬 캐시(SQLite 파일, 빈 값이면 비활성화) / 최대 항목 수(LRU)
+KB_EMBEDDING_CACHE_PATH = os.getenv("KB_EMBEDDING_CACHE_PATH", str(BASE_DIR / "var" / "embedding_cache.sqlite3"))
+KB_EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("KB_EMBEDDING_CACHE_MAX_ENTRIES", "200000"))
+
+# Embeddings API 요청 한도(입력 1개 토큰 / 요청 1회 토큰 합계 / 요청 1회 입력 개수)
+KB_EMBED_MAX_INPUT_TOKENS = int(os.getenv("KB_EMBED_MAX_INPUT_TOKENS", "8191"))
+KB_EMBED_MAX_REQUEST_TOKENS = int(os.getenv("KB_EMBED_MAX_REQUEST_TOKENS", "300000"))
+KB_EMBED_MAX_BATCH_INPUTS = int(os.getenv("KB_EMBED_MAX_BATCH_INPUTS", "2048"))
+
+# 지식베이스 백그라운드 작업(kb_worker) 설정
+KB_JOB_WORKERS = int(os.getenv("KB_JOB_WORKERS", "2"))
+KB_JOB_POLL_SECONDS = float(os.getenv("KB_JOB_POLL_SECONDS", "1.0"))
+
+# running job 임대 시간(초): heartbeat가 이 시간 넘게 멈추면 worker가 죽은 것으로 보고 회수
+# heartbeat 갱신 주기(초)는 임대 시간보다 충분히 짧아야 합니다.
+KB_JOB_LEASE_SECONDS = int(os.getenv("KB_JOB_LEASE_SECONDS", "120"))
+KB_JOB_HEARTBEAT_SECONDS = float(os.getenv("KB_JOB_HEARTBEAT_SECONDS", "10"))
+
+# 프로세스 풀이 깨져(자식 프로세스 종료) 중단된 job을 다시 queued로 돌리는 최대 횟수
+# 넘으면 그 job이 원인으로 보고 failed 처리합니다.
+KB_JOB_MAX_REQUEUES = int(os.getenv("KB_JOB_MAX_REQUEUES", "3"))
+
+# KBChunk bulk_create 배치 크기(INSERT 1회당 행 수)
+KB_CHUNK_BULK_BATCH = int(os.getenv("KB_CHUNK_BULK_BATCH", "500"))
+
+# 인덱싱 파이프라인: 동시 임베딩 요청 수 / 단계 간 큐 크기(배치 수)
+KB_INDEX_EMBED_CONCURRENCY = int(os.getenv("KB_INDEX_EMBED_CONCURRENCY", "4"))
+KB_INDEX_QUEUE_SIZE = int(os.getenv("KB_INDEX_QUEUE_SIZE", "4"))
+
+# Pinecone metadata에 청크 본문 저장(검색 시 DB 조회 생략) / 본문 최대 바이트(UTF-8)
+# - Pinecone metadata는 벡터당 40KB 제한이 있어 다른 필드 여유분을 남겨 둡니다.
+KB_PINECONE_STORE_TEXT = os.getenv("KB_PINECONE_STORE_TEXT", "0") == "1"
+KB_PINECONE_TEXT_MAX_BYTES = int(os.getenv("KB_PINECONE_TEXT_MAX_BYTES", "30000"))
+
+# 에이전트 메시지 처리: 요청 내부 병렬 작업(임베딩 등)용 공용 스레드 수
+AGENT_FANOUT_WORKERS = int(os.getenv("AGENT_FANOUT_WORKERS", "16"))
+
+# rerank 기본 엔진(hosted: Pinecone bge-reranker-v2-m3 / local: CPU 글자 겹침 + 임베딩 코사인, 요청별 reranker로 변경 가능)
+# - hosted 응답 대기 한도(초, 넘으면 로컬 순위 사용) / hosted 전용 스레드 수(동시 호출 상한, 꽉 차면 로컬 순위 사용)
+#   / 로컬 점수의 글자 겹침 가중치(0~1)
+AGENT_RERANKER = os.getenv("AGENT_RERANKER", "hosted")
+AGENT_RERANK_TIMEOUT = float(os.getenv("AGENT_RERANK_TIMEOUT", "1.5"))
+AGENT_RERANK_WORKERS = int(os.getenv("AGENT_RERANK_WORKERS", "4"))
+KB_LOCAL_RERANK_LEXICAL_WEIGHT = float(os.getenv("KB_LOCAL_RERANK_LEXICAL_WEIGHT", "0.35"))
+
+# 질문 → 검색 결과(청크 순서) 캐시 유지 시간(초, 0이면 비활성화)
+# - 인덱싱/업로드로 프로젝트 청크가 바뀌면 자동 무효화됩니다(kb_worker와 공유되는 KB_CACHE_ALIAS 캐시 사용).
+KB_RETRIEVAL_CACHE_TTL = int(os.getenv("KB_RETRIEVAL_CACHE_TTL", "600"))
+KB_CACHE_ALIAS = "kb"
+
+# 의미 기반 답변 캐시(agent_work)
+# - 근거 청크 집합이 같고 질문 임베딩 코사인 유사도가 THRESHOLD 이상이면 이전 답변을 재사용(0이면 비활성화)
+# - 프로젝트당 최대 항목 수 / 조회 시 비교할 최근 항목 수
+AGENT_ANSWER_CACHE_THRESHOLD = float(os.getenv("AGENT_ANSWER_CACHE_THRESHOLD", "0.95"))
+AGENT_ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("AGENT_ANSWER_CACHE_MAX_ENTRIES", "1000"))
+AGENT_ANSWER_CACHE_SCAN_LIMIT = int(os.getenv("AGENT_ANSWER_CACHE_SCAN_LIMIT", "200"))
+
+# 백그라운드 재인덱싱: rate limit(429) 재시도 횟수 / backoff 기본 대기(초)
+KB_REINDEX_MAX_RETRIES = int(os.getenv("KB_REINDEX_MAX_RETRIES", "6"))
+KB_REINDEX_BACKOFF_BASE = float(os.getenv("KB_REINDEX_BACKOFF_BASE", "2.0"))
+
+# PDF 페이지 병렬 추출(1이면 직렬), 병렬 적용 최소 페이지 수
+# - 추출은 kb_worker의 job 프로세스(KB_JOB_WORKERS개) 안에서 돌므로, 기본값은 CPU를 job 수로 나눈 값입니다
+#   (job마다 CPU 수만큼 띄우면 job 수 × CPU 수 프로세스가 코어를 나눠 씁니다).
+KB_PDF_WORKERS = int(os.getenv("KB_PDF_WORKERS", str(max(1, min(4, (os.cpu_count() or 1) // max(1, KB_JOB_WORKERS))))))
+KB_PDF_PARALLEL_MIN_PAGES = int(os.getenv("KB_PDF_PARALLEL_MIN_PAGES", "32"))
+
 ALLOWED_HOSTS = [
     host.strip()
     for host in os.getenv("DJANGO_ALLOWED_HOSTS", "127.0.0.1,localhost").split(",")
@@ -152,6 +246,20 @@ DATABASES = {
     }
 }
 
+# 캐시
+# - default: 프로세스 로컬
+# - kb: 검색 결과 캐시/무효화 버전(웹 프로세스와 kb_worker가 공유해야 하므로 기본은 파일 캐시)
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "kb": {
+        "BACKEND": os.getenv("KB_CACHE_BACKEND", "django.core.cache.backends.filebased.FileBasedCache"),
+        "LOCATION": os.getenv("KB_CACHE_LOCATION", str(BASE_DIR / "var" / "kb_cache")),
+        "OPTIONS": {"MAX_ENTRIES": int(os.getenv("KB_CACHE_MAX_ENTRIES", "5000"))},
+    },
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -1,3 +1,4 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
 from django.shortcuts import redirect
 from django.urls import reverse
 
@@ -9,35 +10,64 @@ class ProfileCompletionMiddleware:
         - 로그인된 사용자가
         - affiliation/employee_no/full_name 중 하나라도 비어 있으면
         - /app/profile/complete/ 로 이동시킵니다.
+
+    sync/async 모두 지원합니다(ASGI에서 async view 앞에 sync 미들웨어가 끼면
+    요청마다 스레드 전환이 생기므로 async 경로를 따로 둡니다).
     """
 
+    sync_capable = True
+    async_capable = True
+
     def __init__(self, get_response):
         self.get_response = get_response
 
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
     def __call__(self, request):
-        if request.user.is_authenticated:
-            path = request.path
-
-            profile_url = reverse("profile_complete")
-
-            # 프로필 입력 페이지/로그아웃/관리자/정적 리소스 등은 제외합니다.
-            allow_prefixes = [
-                profile_url,
-                "/accounts/",
-                "/admin/",
-                "/static/",
-                "/media/",
-            ]
-
-            is_allowed = False
-            for prefix in allow_prefixes:
-                if path.startswith(prefix):
-                    is_allowed = True
-
-            if not is_allowed:
-                user = request.user
-                if (not user.affiliation) or (not user.employee_no) or (not user.full_name):
-                    return redirect(profile_url)
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        if self.needs_profile(request, request.user):
+            return redirect(reverse("profile_complete"))
 
         response = self.get_response(request)
         return response
+
+    async def __acall__(self, request):
+        user = await request.auser()
+
+        if self.needs_profile(request, user):
+            return redirect(reverse("profile_complete"))
+
+        response = await self.get_response(request)
+        return response
+
+    def needs_profile(self, request, user) -> bool:
+        """
+        프로필 입력 페이지로 보내야 하는 요청이면 True
+        """
+        if not user.is_authenticated:
+            return False
+
+        path = request.path
+
+        profile_url = reverse("profile_complete")
+
+        # 프로필 입력 페이지/로그아웃/관리자/정적 리소스 등은 제외합니다.
+        allow_prefixes = [
+            profile_url,
+            "/accounts/",
+            "/admin/",
+            "/static/",
+            "/media/",
+        ]
+
+        for prefix in allow_prefixes:
+            if path.startswith(prefix):
+                return False
+
+        if (not user.affiliation) or (not user.employee_no) or (not user.full_name):
+            return True
+
+        return False
@@ -0,0 +1,25 @@
+import json
+
+from django.http import StreamingHttpResponse
+
+# Server-Sent Events 공용 헬퍼(gpt_chat / agent_work 스트리밍 API)
+#
+# - 브라우저 쪽 파서는 templates/core/sse_reader.html(readSseEvents)을 include해서 씁니다.
+
+
+def sse_event(event: str, data) -> str:
+    """
+    Server-Sent Events 형식 문자열을 만듭니다(data는 JSON 1줄).
+    """
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def sse_response(stream) -> StreamingHttpResponse:
+    """
+    sse_event 문자열을 내는 generator를 SSE 응답으로 감쌉니다.
+    """
+    response = StreamingHttpResponse(stream, content_type="text/event-stream; charset=utf-8")
+    response["Cache-Control"] = "no-cache"
+    # nginx 등 프록시 버퍼링 방지(첫 바이트를 바로 전달)
+    response["X-Accel-Buffering"] = "no"
+    return response
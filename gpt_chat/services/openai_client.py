@@ -1,7 +1,7 @@
 import os 
-from typing import List, Dict
+from typing import Dict, Iterator, List
 
-from openai import OpenAI
+from knowledge_base.services.clients import get_async_openai_client, get_openai_client
 # 
 def generate_assistant_reply(
     *,
@@ -32,7 +32,8 @@ def generate_assistant_reply(
     if not api_key:
         raise ValueError("OPENAI_API_KEY가 환경변수에 없습니다. .env 로딩을 확인해 주세요.")
 
-    client = OpenAI(api_key=api_key)
+    # 프로세스 공용 클라이언트(keep-alive 커넥션 재사용)
+    client = get_openai_client()
 
     # Responses API 호출
     # - input 에 문자열을 넣을 수도 있고,
@@ -43,4 +44,75 @@ def generate_assistant_reply(
     )
 
     # Python 예시에서도 output_text로 결과 텍스트를 얻습니다. :contentReference[oaicite:10]{index=10}
-    return response.output_text
\ No newline at end of file
+    return response.output_text
+
+
+async def agenerate_assistant_reply(
+    *,
+    messages: List[Dict[str, str]],
+    model: str,
+) -> str:
+    """
+    generate_assistant_reply의 async 버전(AsyncOpenAI, 이벤트 루프별 공용 클라이언트)
+
+    Parameters / Returns: generate_assistant_reply와 동일
+    """
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        raise ValueError("OPENAI_API_KEY가 환경변수에 없습니다. .env 로딩을 확인해 주세요.")
+
+    client = get_async_openai_client()
+
+    response = await client.responses.create(
+        model=model,
+        input=messages,
+    )
+
+    return response.output_text
+
+
+def stream_assistant_reply(
+    *,
+    messages: List[Dict[str, str]],
+    model: str,
+) -> Iterator[str]:
+    """
+    OpenAI Responses API를 stream=True로 호출하고, 텍스트 조각(delta)을 도착하는 대로 반환합니다.
+
+    Parameters:
+        messages (List[Dict[str, str]]): 대화 메시지 목록(generate_assistant_reply와 동일)
+        model (str): 사용할 모델명
+
+    Returns:
+        Iterator[str]: response.output_text.delta 이벤트의 텍스트 조각
+
+    Raises:
+        RuntimeError: 스트림 도중 error / response.failed 이벤트를 받은 경우
+    """
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        raise ValueError("OPENAI_API_KEY가 환경변수에 없습니다. .env 로딩을 확인해 주세요.")
+
+    client = get_openai_client()
+
+    stream = client.responses.create(
+        model=model,
+        input=messages,
+        stream=True,
+    )
+
+    for event in stream:
+        event_type = getattr(event, "type", "")
+
+        if event_type == "response.output_text.delta":
+            delta = getattr(event, "delta", "") or ""
+            if delta:
+                yield delta
+
+        elif event_type == "error":
+            raise RuntimeError(getattr(event, "message", "") or "stream error")
+
+        elif event_type == "response.failed":
+            response = getattr(event, "response", None)
+            error = getattr(response, "error", None)
+            raise RuntimeError(getattr(error, "message", "") or "response failed")
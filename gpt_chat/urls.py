@@ -7,4 +7,6 @@ app_name = "gpt_chat"
 urlpatterns = [
     path("", views.chat_page, name="chat_page"),
     path("api/send/", views.send_message_api, name="send_message_api"),
+    path("api/send/stream/", views.send_message_stream_api, name="send_message_stream_api"),
+    path("api/send/async/", views.send_message_api_async, name="send_message_api_async"),
 ]
@@ -5,8 +5,10 @@ from django.http import JsonResponse, HttpResponseBadRequest
 from django.shortcuts import render
 from django.views.decorators.http import require_http_methods
 
+from core.sse import sse_event, sse_response
+
 from .models import Conversation, Message
-from .services.openai_client import generate_assistant_reply
+from .services.openai_client import agenerate_assistant_reply, generate_assistant_reply, stream_assistant_reply
 
 
 
@@ -142,3 +144,164 @@ def send_message_api(request):
             "reply": assistant_text,
         }
     )
+
+
+@require_http_methods(['POST'])
+def send_message_stream_api(request):
+    """
+    send_message_api의 스트리밍(SSE) 버전
+
+    이벤트:
+        - delta: {"text": "..."}  응답 텍스트 조각(도착하는 대로 전송)
+        - done:  {"message_id": int}  assistant 메시지 저장 완료
+        - error: {"error": "..."}
+
+    - 생성 중 오류가 나거나 클라이언트가 끊어도 그때까지 받은 응답은 assistant 메시지로 저장합니다.
+    """
+
+    conversation = _get_or_create_conversation(request=request)
+
+    try:
+        payload = json.loads(request.body.decode("utf-8"))
+    except json.JSONDecodeError:
+        return HttpResponseBadRequest("잘못된 JSON 형식입니다.")
+
+    user_text = payload.get("message", "")
+    user_text = user_text.strip()
+
+    if not user_text:
+        return HttpResponseBadRequest("Message 값이 비어 있습니다.")
+
+    # 1) user 메시지 저장 DB
+    Message.objects.create(
+        conversation=conversation,
+        role="user",
+        content=user_text,
+    )
+
+    # 2) 프롬프트 구성(스트림 시작 전에 DB 조회를 끝냄)
+    prompt_messages = _build_prompt_messages(conversation=conversation)
+
+    def event_stream():
+        parts = []
+        saved = False
+
+        try:
+            for delta in stream_assistant_reply(messages=prompt_messages, model=settings.OPENAI_MODEL):
+                parts.append(delta)
+                yield sse_event("delta", {"text": delta})
+
+            # 3) 스트림이 끝나면 assistant 응답 저장 DB
+            msg = Message.objects.create(
+                conversation=conversation,
+                role="assistant",
+                content="".join(parts),
+            )
+            saved = True
+            yield sse_event("done", {"message_id": msg.id})
+
+        except Exception as e:
+            yield sse_event("error", {"error": f"OpenAI API 호출 중 오류가 발생했습니다: {str(e)}"})
+
+        finally:
+            # 오류/연결 끊김으로 끝난 경우에도 받은 부분까지는 저장(다음 턴 대화 맥락 유지)
+            if not saved and parts:
+                Message.objects.create(
+                    conversation=conversation,
+                    role="assistant",
+                    content="".join(parts),
+                )
+
+    return sse_response(event_stream())
+
+
+async def _aget_or_create_conversation(request) -> Conversation:
+    """
+    _get_or_create_conversation의 async 버전(async 세션/ORM)
+    """
+    conversation_id = await request.session.aget("get_chat_conversation_id")
+
+    if conversation_id:
+        conversation = await Conversation.objects.filter(id=conversation_id).afirst()
+        if conversation:
+            return conversation
+
+    conversation = await Conversation.objects.acreate()
+    await request.session.aset("get_chat_conversation_id", conversation.id)
+
+    return conversation
+
+
+async def _abuild_prompt_messages(conversation: Conversation):
+    """
+    _build_prompt_messages의 async 버전(최근 20개, 시간순)
+    """
+    prompt_messages = [
+        {
+            "role": "developer",
+            "content": "You are a helpful assistant. Answer in polite Korean.",
+        }
+    ]
+
+    recent_messages = [m async for m in conversation.messages.all().order_by("-created_at")[:20]]
+
+    for msg in reversed(recent_messages):
+        prompt_messages.append(
+            {
+                "role": msg.role,
+                "content": msg.content,
+            }
+        )
+
+    return prompt_messages
+
+
+@require_http_methods(['POST'])
+async def send_message_api_async(request):
+    """
+    send_message_api의 async 버전
+
+    - OpenAI 응답을 기다리는 동안 워커 스레드를 점유하지 않습니다(ASGI 배포 기준).
+    - 요청/응답 형식은 send_message_api와 같습니다.
+    """
+
+    conversation = await _aget_or_create_conversation(request=request)
+
+    try:
+        payload = json.loads(request.body.decode("utf-8"))
+    except json.JSONDecodeError:
+        return HttpResponseBadRequest("잘못된 JSON 형식입니다.")
+
+    user_text = payload.get("message", "")
+    user_text = user_text.strip()
+
+    if not user_text:
+        return HttpResponseBadRequest("Message 값이 비어 있습니다.")
+
+    await Message.objects.acreate(
+        conversation=conversation,
+        role="user",
+        content=user_text,
+    )
+
+    prompt_messages = await _abuild_prompt_messages(conversation=conversation)
+
+    try:
+        assistant_text = await agenerate_assistant_reply(
+            messages=prompt_messages,
+            model=settings.OPENAI_MODEL,
+        )
+    except Exception as e:
+        return JsonResponse({"error": f"OpenAI API 호출 중 오류가 발생했습니다: {str(e)}"}, status=500)
+
+    await Message.objects.acreate(
+        conversation=conversation,
+        role="assistant",
+        content=assistant_text,
+    )
+
+    return JsonResponse(
+        {
+            "reply": assistant_text,
+        }
+    )
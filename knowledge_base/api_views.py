@@ -1,29 +1,29 @@
+import asyncio
+import hashlib
 import os
 import uuid
 
+from asgiref.sync import sync_to_async
 from django.conf import settings
 from django.contrib.auth.decorators import login_required
+from django.db import connections
 from django.http import JsonResponse
-from django.shortcuts import get_object_or_404
+from django.shortcuts import aget_object_or_404, get_object_or_404
 from django.views.decorators.http import require_http_methods
 
 from agent_work.models import Project
-from .models import KBDocument, KBChunk
-from .utils import (
-    extract_text_from_excel,
-    extract_text_from_pdf,
-    build_units_from_text,
-    chunk_with_context,
-    safe_get_extension,
-)
-from django.db.models import Q
-from django.db import transaction
+from .models import KBDocument, KBChunk, KBJob
+from .utils import EXTRACTORS, safe_get_extension
 
 from .services.openai_embeddings import OpenAIEmbeddingClient
-from .services.pinecone_indexer import PineconeIndexer
+from .services.vector_store import get_indexer
+from .services.index_pipeline import ProjectChunkIndexer, pending_chunks_queryset
+from .services.ingest import ignored_metadata_fields, job_status_payload
+from .services.job_queue import active_jobs, aenqueue_job, enqueue_job
 
 MAX_UPLOAD_BYTES = 30 * 1024 * 1024  # 30MB
-ALLOWED_EXTENSIONS = {".xlsx", ".xls", ".pdf"}
+# 추출기 레지스트리에 등록된 확장자(.xlsx/.xls/.pdf)
+ALLOWED_EXTENSIONS = set(EXTRACTORS.keys())
 
 
 def parse_tags(raw: str):
@@ -59,9 +59,10 @@ def upload_document(request, project_id):
         - title: 문서 제목(선택, 없으면 파일명)
     동작:
         - 30MB 제한
-        - 텍스트 추출
-        - 청킹 생성(window=1)
-        - KBDocument, KBChunk 저장
+        - 동일 파일(SHA-256)이 이미 있으면 기존 문서 반환(duplicate=true)
+        - 임시 파일 저장 후 ingest job 등록(202 + job 반환)
+        - 텍스트 추출/청킹/저장은 kb_worker가 수행합니다.
+        - 진행 상황은 job_status API로 조회합니다.
     """
     project = get_object_or_404(Project, id=project_id, owner=request.user)
 
@@ -93,6 +94,16 @@ def upload_document(request, project_id):
 
     tags = parse_tags(request.POST.get("tags", ""))
 
+    # 사용자가 직접 입력한 메타데이터(중복 업로드 시 무시 여부 안내용)
+    submitted = {"title": title, "importance": importance, "tags": tags}
+    submitted_fields = []
+    if request.POST.get("title", "").strip():
+        submitted_fields.append("title")
+    if "importance" in request.POST:
+        submitted_fields.append("importance")
+    if "tags" in request.POST:
+        submitted_fields.append("tags")
+
     # 임시 저장 경로
     tmp_dir = os.path.join(settings.MEDIA_ROOT, "tmp")
     os.makedirs(tmp_dir, exist_ok=True)
@@ -100,77 +111,108 @@ def upload_document(request, project_id):
     tmp_name = f"{uuid.uuid4().hex}{ext}"
     tmp_path = os.path.join(tmp_dir, tmp_name)
 
-    # 파일 저장
+    # 파일 저장(저장하면서 SHA-256 계산)
+    hasher = hashlib.sha256()
     with open(tmp_path, "wb") as fp:
         for chunk in f.chunks():
+            hasher.update(chunk)
             fp.write(chunk)
 
-    extracted_text = ""
-    source_type = "text"
+    content_hash = hasher.hexdigest()
 
-    try:
-        if ext in {".xlsx", ".xls"}:
-            extracted_text = extract_text_from_excel(tmp_path)
-            source_type = "excel"
-        elif ext == ".pdf":
-            extracted_text = extract_text_from_pdf(tmp_path)
-            source_type = "pdf"
-    finally:
-        # 원문 보관/다운로드는 보류 → 임시 파일 삭제
-        if os.path.exists(tmp_path):
-            os.remove(tmp_path)
+    # 동일 파일이 이미 문서로 저장되어 있으면 ingest를 생략합니다.
+    # - 새로 입력한 제목/중요도/태그는 기존 문서에 반영하지 않고 ignored_fields로 알려 줍니다.
+    existing_doc = (
+        KBDocument.objects.filter(project=project, owner=request.user, content_hash=content_hash)
+        .order_by("id")
+        .first()
+    )
+    if existing_doc is not None:
+        os.remove(tmp_path)
+        return JsonResponse(
+            {
+                "duplicate": True,
+                "document": {
+                    "id": existing_doc.id,
+                    "title": existing_doc.title,
+                    "source_type": existing_doc.source_type,
+                    "importance": existing_doc.importance,
+                    "tags": existing_doc.tags,
+                    "file_size": existing_doc.file_size,
+                },
+                "chunks_created": 0,
+                "ignored_fields": ignored_metadata_fields(submitted, submitted_fields, existing_doc),
+            }
+        )
 
-    extracted_text = (extracted_text or "").strip()
-    if not extracted_text:
-        return JsonResponse({"error": "no_text_extracted"}, status=400)
+    # 동일 파일이 처리 대기/진행 중이면 그 job을 그대로 돌려줍니다.
+    pending_job = (
+        KBJob.objects.filter(
+            project=project,
+            owner=request.user,
+            job_type="ingest",
+            status__in=["queued", "running"],
+            params__content_hash=content_hash,
+        )
+        .order_by("id")
+        .first()
+    )
+    if pending_job is not None:
+        os.remove(tmp_path)
+        return JsonResponse(
+            {
+                "duplicate": True,
+                "job": job_status_payload(pending_job),
+                "ignored_fields": ignored_metadata_fields(
+                    submitted, submitted_fields, pending_job.params or {}
+                ),
+            },
+            status=202,
+        )
 
-    # 문서 저장
-    doc = KBDocument.objects.create(
+    # 추출/청킹/저장은 kb_worker가 처리 → job id만 즉시 반환
+    job = enqueue_job(
         owner=request.user,
         project=project,
-        title=title,
-        source_type=source_type,
-        importance=importance,
-        tags=tags,
-        extracted_text=extracted_text,
-        original_filename=f.name,
-        file_size=f.size,
+        job_type="ingest",
+        params={
+            "file_path": tmp_path,
+            "ext": ext,
+            "title": title,
+            "importance": importance,
+            "tags": tags,
+            "original_filename": f.name,
+            "file_size": f.size,
+            "content_hash": content_hash,
+            "submitted_fields": submitted_fields,
+        },
     )
 
-    # 청킹
-    units = build_units_from_text(extracted_text)
-    chunks = chunk_with_context(units, window=1, max_chars=1200)
-
-    created_count = 0
-    idx = 0
-    while idx < len(chunks):
-        chunk_text = chunks[idx].strip()
-        if chunk_text:
-            KBChunk.objects.create(
-                document=doc,
-                chunk_index=idx,
-                chunk_text=chunk_text,
-                importance=importance,
-                tags=tags,
-            )
-            created_count = created_count + 1
-        idx = idx + 1
-
     return JsonResponse(
         {
-            "document": {
-                "id": doc.id,
-                "title": doc.title,
-                "source_type": doc.source_type,
-                "importance": doc.importance,
-                "tags": doc.tags,
-                "file_size": doc.file_size,
-            },
-            "chunks_created": created_count,
-        }
+            "job": job_status_payload(job),
+        },
+        status=202,
     )
 
 
+@login_required
+@require_http_methods(["GET"])
+def job_status(request, job_id):
+    """
+    백그라운드 작업 상태 조회
+
+    응답:
+        - status: queued/running/succeeded/failed
+        - stage: queued/extract/chunk/done
+        - progress: 현재 stage 처리량
+        - index: (문서 생성 후) 인덱싱 완료 청크 수/전체 청크 수
+    """
+    job = get_object_or_404(KBJob.objects.select_related("document"), id=job_id, owner=request.user)
+
+    return JsonResponse({"job": job_status_payload(job)})
+
+
 @login_required
 @require_http_methods(["GET"])
 def document_list(request, project_id):
@@ -179,7 +221,14 @@ def document_list(request, project_id):
     """
     project = get_object_or_404(Project, id=project_id, owner=request.user)
 
-    docs = KBDocument.objects.filter(project=project).order_by("-created_at")
+    # ingest 처리 중인 문서(청크가 배치별로 저장되는 중)는 완료될 때까지 숨깁니다.
+    in_progress = KBJob.objects.filter(
+        job_type="ingest",
+        status__in=["queued", "running"],
+        document__isnull=False,
+    ).values("document_id")
+
+    docs = KBDocument.objects.filter(project=project).exclude(id__in=in_progress).order_by("-created_at")
 
     items = []
     for d in docs:
@@ -235,17 +284,118 @@ def index_project_chunks(request, project_id: int):
         - embedding_model != 현재 모델
         - embedding_dim != 현재 dim
 
+    처리 방식:
+        - 임베딩/업서트/DB 갱신을 ProjectChunkIndexer 파이프라인으로 겹쳐서 수행합니다.
+        - 응답 metrics에 단계별 busy/wait 시간이 포함됩니다.
+
     Query params (선택):
         - limit: 이번 요청에서 처리할 최대 chunk 수(기본 300)
         - batch: 임베딩/업서트 배치 크기(기본 64)
         - force=1: 강제로 전체 재인덱싱(테스트용)
+        - background=1: limit 없이 남은 청크 전체를 reindex job으로 등록(202 + job 반환)
+        - store_text=1/0: Pinecone metadata에 청크 본문 저장 여부(기본 KB_PINECONE_STORE_TEXT)
+          (이미 인덱싱된 청크에 적용하려면 force=1과 함께 사용)
     """
     project = get_object_or_404(Project, id=project_id, owner=request.user)
 
-    # namespace = user_id (요구사항)
-    namespace = str(request.user.id)
+    params = parse_index_params(request)
+
+    # 전체 재인덱싱은 백그라운드 job으로(kb_worker가 체크포인트/backoff와 함께 처리)
+    if params["background"]:
+        # 이미 등록된 reindex job이 있으면 그대로 반환(worker가 죽어 임대가 끝난 running job은 제외)
+        job = (
+            active_jobs()
+            .filter(
+                project=project,
+                owner=request.user,
+                job_type="reindex",
+            )
+            .order_by("id")
+            .first()
+        )
+        if job is None:
+            job = enqueue_job(
+                owner=request.user,
+                project=project,
+                job_type="reindex",
+                params=reindex_job_params(params),
+            )
+
+        return JsonResponse({"job": job_status_payload(job)}, status=202)
+
+    # 넓은 필터 조건 + 과도한 처리 방지(limit)
+    targets = list(index_targets_queryset(project.id, request.user.id, params))
+
+    if len(targets) == 0:
+        return JsonResponse(
+            {
+                "indexed_count": 0,
+                "message": "처리 대상 청크가 없습니다.",
+            }
+        )
+
+    result = run_project_indexer(project.id, request.user.id, targets, params)
+    return JsonResponse(index_result_payload(result, params))
+
 
-    # 파라미터
+@login_required
+@require_http_methods(["POST"])
+async def index_project_chunks_async(request, project_id: int):
+    """
+    index_project_chunks의 async 버전(Query params/응답 형식 동일)
+
+    - 프로젝트/대상 청크 조회는 async ORM으로 수행합니다.
+    - 인덱싱 파이프라인(스레드 기반: 임베딩/업서트/DB 커밋)은 별도 스레드에서 실행해
+      이벤트 루프를 막지 않습니다.
+    """
+    user = await request.auser()
+    project = await aget_object_or_404(Project, id=project_id, owner=user)
+
+    params = parse_index_params(request)
+
+    if params["background"]:
+        job = await (
+            active_jobs()
+            .filter(
+                project=project,
+                owner=user,
+                job_type="reindex",
+            )
+            .order_by("id")
+            .afirst()
+        )
+        if job is None:
+            job = await aenqueue_job(
+                owner=user,
+                project=project,
+                job_type="reindex",
+                params=reindex_job_params(params),
+            )
+
+        payload = await sync_to_async(job_status_payload)(job)
+        return JsonResponse({"job": payload}, status=202)
+
+    targets = [ch async for ch in index_targets_queryset(project.id, user.id, params)]
+
+    if len(targets) == 0:
+        return JsonResponse(
+            {
+                "indexed_count": 0,
+                "message": "처리 대상 청크가 없습니다.",
+            }
+        )
+
+    result = await asyncio.to_thread(run_project_indexer, project.id, user.id, targets, params, True)
+    return JsonResponse(index_result_payload(result, params))
+
+
+def parse_index_params(request) -> dict:
+    """
+    인덱싱 API Query params를 파싱/보정합니다.
+
+    Returns:
+        dict: limit(1~2000), batch_size(1~256), force, store_text, background
+    """
     raw_limit = request.GET.get("limit", "300")
     raw_batch = request.GET.get("batch", "64")
     raw_force = request.GET.get("force", "0")
@@ -264,6 +414,11 @@ def index_project_chunks(request, project_id: int):
     if str(raw_force).strip() == "1":
         force = True
 
+    store_text = settings.KB_PINECONE_STORE_TEXT
+    raw_store_text = str(request.GET.get("store_text", "")).strip()
+    if raw_store_text != "":
+        store_text = raw_store_text == "1"
+
     if limit < 1:
         limit = 1
     if limit > 2000:
@@ -274,141 +429,70 @@ def index_project_chunks(request, project_id: int):
     if batch_size > 256:
         batch_size = 256
 
-    # 넓은 필터 조건
-    current_model = settings.OPENAI_EMBEDDING_MODEL
-    current_dim = settings.OPENAI_EMBEDDING_DIM
-
-    need_index_q = (
-        Q(pinecone_id__isnull=True)
-        | Q(pinecone_id__exact="")
-        | Q(indexed_at__isnull=True)
-        | Q(embedding_model__isnull=True)
-        | Q(embedding_dim__isnull=True)
-        | ~Q(embedding_model=current_model)
-        | ~Q(embedding_dim=current_dim)
-    )
+    return {
+        "limit": limit,
+        "batch_size": batch_size,
+        "force": force,
+        "store_text": store_text,
+        "background": str(request.GET.get("background", "0")).strip() == "1",
+    }
 
-    base_qs = KBChunk.objects.filter(
-        document__project=project,
-        document__owner=request.user,
-    )
 
-    if force:
-        target_qs = base_qs
-    else:
-        target_qs = base_qs.filter(need_index_q)
+def reindex_job_params(params: dict) -> dict:
+    return {"force": params["force"], "batch": params["batch_size"], "store_text": params["store_text"]}
 
-    # 과도한 처리 방지
-    target_qs = target_qs.order_by("document_id", "chunk_index")[:limit]
 
-    targets = []
-    for ch in target_qs:
-        targets.append(ch)
+def index_targets_queryset(project_id: int, owner_id: int, params: dict):
+    """
+    이번 요청에서 처리할 KBChunk queryset(limit 적용)
+    """
+    target_qs = pending_chunks_queryset(
+        project_id=project_id,
+        owner_id=owner_id,
+        model=settings.OPENAI_EMBEDDING_MODEL,
+        dim=settings.OPENAI_EMBEDDING_DIM,
+        force=params["force"],
+    )
 
-    if len(targets) == 0:
-        return JsonResponse(
-            {
-                "indexed_count": 0,
-                "message": "처리 대상 청크가 없습니다.",
-            }
-        )
+    return target_qs.select_related("document").order_by("document_id", "chunk_index")[: params["limit"]]
 
-    embedder = OpenAIEmbeddingClient()
-    pinecone = PineconeIndexer()
-
-    indexed_count = 0
-
-    start = 0
-    while start < len(targets):
-        end = start + batch_size
-        batch = targets[start:end]
-
-        # 1) 임베딩 입력 텍스트 준비
-        texts = []
-        for ch in batch:
-            texts.append(ch.chunk_text)
-
-        # 2) 임베딩 생성
-        vectors = embedder.embed_texts(texts)
-
-        # 3) Pinecone upsert items 구성
-        upsert_items = []
-        i = 0
-        while i < len(batch):
-            ch = batch[i]
-            vec = vectors[i]
-
-            # 이미 pinecone_id가 있으면 재사용(불완전 인덱싱 복구에 유리)
-            chosen_id = None
-            if ch.pinecone_id is not None:
-                pid = str(ch.pinecone_id).strip()
-                if pid != "":
-                    chosen_id = pid
-
-            if chosen_id is None:
-                # deterministic id: user/project/document/chunk 기반
-                chosen_id = f"u{request.user.id}-p{project.id}-d{ch.document_id}-c{ch.chunk_index}"
-
-            doc = ch.document
-
-            meta = {
-                "user_id": int(request.user.id),
-                "project_id": int(project.id),
-                "document_id": int(doc.id),
-                "chunk_index": int(ch.chunk_index),
-                "kb_chunk_id": int(ch.id),
-                "importance": int(ch.importance),
-            }
 
-            if doc.title:
-                meta["doc_title"] = str(doc.title)
-
-            if doc.source_type:
-                meta["source_type"] = str(doc.source_type)
-
-            # tags는 list[str] 형태로 보장
-            if doc.tags:
-                if isinstance(doc.tags, list):
-                    meta["tags"] = [str(x) for x in doc.tags]
-                else:
-                    meta["tags"] = [str(doc.tags)]
-
-            upsert_items.append((chosen_id, vec, meta))
-            i = i + 1
-
-        # 4) Pinecone upsert 실행
-        pinecone.upsert_vectors(namespace=namespace, vectors=upsert_items)
-
-        # 5) DB 갱신(트랜잭션)
-        with transaction.atomic():
-            j = 0
-            while j < len(batch):
-                ch = batch[j]
-                chosen_id = upsert_items[j][0]
-
-                ch.mark_indexed(
-                    pinecone_id=chosen_id,
-                    model=current_model,
-                    dim=current_dim,
-                )
-                ch.save(
-                    update_fields=[
-                        "pinecone_id",
-                        "indexed_at",
-                        "embedding_model",
-                        "embedding_dim",
-                    ]
-                )
-                j = j + 1
-
-        indexed_count = indexed_count + len(batch)
-        start = end
+def run_project_indexer(project_id: int, owner_id: int, targets, params: dict, close_connections: bool = False) -> dict:
+    """
+    ProjectChunkIndexer로 targets를 인덱싱합니다.
 
-    return JsonResponse(
-        {
-            "indexed_count": indexed_count,
-            "limit": limit,
-            "batch_size": batch_size,
-            "force": force,
-        }
-    )
\ No newline at end of file
+    Parameters:
+        close_connections (bool): 별도 스레드에서 실행할 때 True(끝나면 그 스레드의 DB 커넥션 정리)
+    """
+    try:
+        indexer = ProjectChunkIndexer(
+            owner_id=owner_id,
+            project_id=project_id,
+            # namespace = user_id (요구사항)
+            namespace=str(owner_id),
+            embedder=OpenAIEmbeddingClient(),
+            pinecone=get_indexer(),
+            model=settings.OPENAI_EMBEDDING_MODEL,
+            dim=settings.OPENAI_EMBEDDING_DIM,
+            embed_concurrency=settings.KB_INDEX_EMBED_CONCURRENCY,
+            queue_size=settings.KB_INDEX_QUEUE_SIZE,
+            store_text=params["store_text"],
+            text_max_bytes=settings.KB_PINECONE_TEXT_MAX_BYTES,
+        )
+        return indexer.run(targets, batch_size=params["batch_size"])
+    finally:
+        if close_connections:
+            connections.close_all()
+
+
+def index_result_payload(result: dict, params: dict) -> dict:
+    return {
+        "indexed_count": result["indexed_count"],
+        "embedded_count": result["embedded_count"],
+        "reused_count": result["reused_count"],
+        "limit": params["limit"],
+        "batch_size": params["batch_size"],
+        "force": params["force"],
+        "store_text": params["store_text"],
+        "metrics": result["metrics"],
+    }
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class KnowledgeBaseConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'knowledge_base'
+
+    def ready(self):
+        # 문서 삭제 시 벡터 삭제(signals.delete_document_vectors)
+        from . import signals  # noqa: F401
@@ -0,0 +1,133 @@
+import tempfile
+import time
+
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from knowledge_base.services.ivf_index import IVFVectorStore
+from knowledge_base.services.local_vector_index import LocalVectorStore
+
+
+def make_clustered_vectors(rng, centers: np.ndarray, n: int, noise: float) -> np.ndarray:
+    """
+    centers 주변에 흩어진 n개의 벡터를 만듭니다(실제 문서 임베딩처럼 주제별로 뭉친 분포).
+
+    - noise: 잡음 벡터 길이 / 중심 벡터 길이(차원과 무관)
+    """
+    labels = rng.integers(0, centers.shape[0], size=n)
+    jitter = rng.standard_normal((n, centers.shape[1])).astype(np.float32) * (noise / np.sqrt(centers.shape[1]))
+    return (centers[labels] + jitter).astype(np.float32)
+
+
+def percentile_ms(samples, p: float) -> float:
+    return float(np.percentile(np.asarray(samples) * 1000.0, p))
+
+
+class Command(BaseCommand):
+    """
+    로컬 벡터 저장소 정확 검색 vs IVF 근사 검색 벤치마크(recall@k / 지연시간)
+
+    사용 예:
+        python manage.py kb_bench_ann --rows 200000 --nprobe 4,8,16,32
+
+    - 임시 디렉터리에 합성 데이터(주제별 군집)로 저장소를 만들고 끝나면 삭제합니다.
+    - recall@k: 정확 검색 top_k 중 IVF 결과에 포함된 비율의 평균
+    """
+
+    help = "LocalVectorStore(정확 검색)와 IVFVectorStore(근사 검색)의 recall/지연시간을 비교합니다."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=100000)
+        parser.add_argument("--dim", type=int, default=settings.OPENAI_EMBEDDING_DIM)
+        parser.add_argument("--clusters", type=int, default=512)
+        parser.add_argument("--noise", type=float, default=1.5)
+        parser.add_argument("--queries", type=int, default=200)
+        parser.add_argument("--top-k", type=int, default=30)
+        parser.add_argument("--nlist", type=int, default=0)
+        parser.add_argument("--nprobe", type=str, default="4,8,16,32")
+        parser.add_argument("--batch", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        rows = max(1, int(options["rows"]))
+        dim = int(options["dim"])
+        top_k = int(options["top_k"])
+        batch = max(1, int(options["batch"]))
+        nprobes = [int(x) for x in str(options["nprobe"]).split(",") if x.strip()]
+
+        rng = np.random.default_rng(0)
+        centers = rng.standard_normal((int(options["clusters"]), dim)).astype(np.float32)
+        centers = centers / np.linalg.norm(centers, axis=1, keepdims=True)
+
+        with tempfile.TemporaryDirectory() as root:
+            store = IVFVectorStore(root, "bench", 1, dim)
+
+            # 1) 적재(KB_IVF_MIN_TRAIN_ROWS를 넘으면 적재 중 자동 학습 포함)
+            t0 = time.perf_counter()
+            start = 0
+            while start < rows:
+                n = min(batch, rows - start)
+                vecs = make_clustered_vectors(rng, centers, n, options["noise"])
+                items = []
+                i = 0
+                while i < n:
+                    items.append((f"v{start + i}", vecs[i], {"i": start + i}))
+                    i = i + 1
+                store.upsert(items)
+                start = start + n
+            load_sec = time.perf_counter() - t0
+            self.stdout.write(f"rows={rows:,} dim={dim} load: {load_sec:.2f}s ({rows / load_sec:,.0f} vectors/s)")
+
+            # 2) IVF (재)학습: 전체 행 기준 nlist
+            t0 = time.perf_counter()
+            store.train(nlist=int(options["nlist"]) or None)
+            train_sec = time.perf_counter() - t0
+            self.stdout.write(f"train: {train_sec:.2f}s (nlist={store.nlist})")
+
+            # 3) 학습 후 증분 삽입(가장 가까운 목록에 바로 배정)
+            extra = max(1, rows // 100)
+            vecs = make_clustered_vectors(rng, centers, extra, options["noise"])
+            items = [(f"x{i}", vecs[i], {"i": -1}) for i in range(extra)]
+            t0 = time.perf_counter()
+            store.upsert(items)
+            insert_sec = time.perf_counter() - t0
+            self.stdout.write(f"incremental insert: {extra:,} vectors in {insert_sec:.3f}s")
+
+            # 4) 질의: 기존 벡터 근처의 점(실제 질문이 문서 주변에 오는 상황)
+            exact = LocalVectorStore(root, "bench", 1, dim)
+            sample_ids = [f"v{r}" for r in rng.choice(rows, size=min(rows, int(options["queries"])), replace=False)]
+            fetched = exact.fetch(sample_ids)
+            queries = np.asarray([fetched[x] for x in sample_ids], dtype=np.float32)
+            queries = queries + rng.standard_normal(queries.shape).astype(np.float32) * (0.3 / np.sqrt(dim))
+
+            exact_ids = []
+            exact_lat = []
+            for q in queries:
+                t0 = time.perf_counter()
+                res = exact.search(q, top_k, include_metadata=False)
+                exact_lat.append(time.perf_counter() - t0)
+                exact_ids.append(set(m["id"] for m in res))
+
+            self.stdout.write("")
+            self.stdout.write(f"{'search':<14}{'recall@' + str(top_k):>12}{'p50 ms':>10}{'p95 ms':>10}")
+            self.stdout.write(
+                f"{'exact':<14}{1.0:>12.3f}{percentile_ms(exact_lat, 50):>10.2f}{percentile_ms(exact_lat, 95):>10.2f}"
+            )
+
+            for nprobe in nprobes:
+                lat = []
+                recall = []
+                j = 0
+                while j < len(queries):
+                    t0 = time.perf_counter()
+                    res = store.search(queries[j], top_k, include_metadata=False, nprobe=nprobe)
+                    lat.append(time.perf_counter() - t0)
+                    got = set(m["id"] for m in res)
+                    recall.append(len(got & exact_ids[j]) / max(1, len(exact_ids[j])))
+                    j = j + 1
+
+                label = f"ivf nprobe={nprobe}"
+                self.stdout.write(
+                    f"{label:<14}{float(np.mean(recall)):>12.3f}"
+                    f"{percentile_ms(lat, 50):>10.2f}{percentile_ms(lat, 95):>10.2f}"
+                )
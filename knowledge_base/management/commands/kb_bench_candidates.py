@@ -0,0 +1,151 @@
+import random
+import timeit
+
+from django.core.management.base import BaseCommand
+
+from knowledge_base.services.candidate_set import CandidateSet
+
+
+def make_candidates(n: int):
+    """
+    hydrate_matches() 결과와 같은 모양의 합성 후보(중복 청크 10% 포함)
+    """
+    out = []
+    i = 0
+    while i < n:
+        chunk_id = 100000 + i
+        out.append(
+            {
+                "pinecone_id": f"u1-p1-d{i // 20}-c{i % 20}",
+                "kb_chunk_id": chunk_id,
+                "document_id": i // 20,
+                "doc_title": f"문서{i // 20}",
+                "chunk_index": i % 20,
+                "importance": 1 + i % 5,
+                "tags": [],
+                "chunk_text": "인사 규정 본문",
+                "score": 1.0 - i / (n + 1),
+                "final_score": None,
+                "source": "db",
+            }
+        )
+        i = i + 1
+
+    dups = [dict(out[j]) for j in range(0, n, 10)]
+    return out + dups
+
+
+def list_dedup(matches):
+    # 기존 방식: seen 집합 + list append
+    out = []
+    seen = set()
+    for cand in matches:
+        if cand["kb_chunk_id"] in seen:
+            continue
+        seen.add(cand["kb_chunk_id"])
+        out.append(cand)
+    return out
+
+
+def list_reorder(candidates, reranked):
+    # 기존 apply_rerank_order: rerank id마다 후보 목록 전체를 훑음(O(n·m))
+    order = []
+    k = 0
+    while k < len(reranked):
+        rid = reranked[k].get("id")
+        if rid:
+            order.append(str(rid))
+        k = k + 1
+
+    new_candidates = []
+    k = 0
+    while k < len(order):
+        target_id = order[k]
+
+        t = 0
+        while t < len(candidates):
+            if str(candidates[t]["kb_chunk_id"]) == target_id:
+                new_candidates.append(candidates[t])
+                break
+            t = t + 1
+
+        k = k + 1
+
+    if len(new_candidates) > 0:
+        return new_candidates
+    return candidates
+
+
+class Command(BaseCommand):
+    """
+    검색 후보 처리 마이크로 벤치마크(list + 선형 탐색 vs CandidateSet)
+
+    사용 예:
+        python manage.py kb_bench_candidates
+        python manage.py kb_bench_candidates --sizes 30,200,1000,5000 --top-n 8
+
+    - dedup: 매칭 결과(중복 청크 포함) → 후보 목록
+    - rerank top_n / rerank all: rerank 결과(top_n개 / 전체 역순) 순서로 재배열
+    - evidence: 상위 5개 근거 선택
+    """
+
+    help = "후보 dedup/rerank 재배열/근거 선택을 기존 list 방식과 CandidateSet으로 비교합니다."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", type=str, default="30,200,1000")
+        parser.add_argument("--top-n", type=int, default=8)
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        sizes = [int(x) for x in str(options["sizes"]).split(",") if x.strip()]
+        top_n = int(options["top_n"])
+        repeat = max(1, int(options["repeat"]))
+
+        rng = random.Random(0)
+
+        self.stdout.write(f"{'n':>6}  {'step':<14}{'list us':>12}{'set us':>12}{'speedup':>10}")
+
+        for n in sizes:
+            matches = make_candidates(n)
+            as_list = list_dedup(matches)
+            as_set = CandidateSet(matches)
+
+            shuffled = list(as_list)
+            rng.shuffle(shuffled)
+            reranked_top = [{"id": str(c["kb_chunk_id"])} for c in shuffled[:top_n]]
+            reranked_all = [{"id": str(c["kb_chunk_id"])} for c in reversed(as_list)]
+
+            # 결과가 같은지 먼저 확인
+            assert [c["kb_chunk_id"] for c in list_reorder(as_list, reranked_all)] == as_set.reorder(
+                r["id"] for r in reranked_all
+            ).ids()
+
+            cases = [
+                ("dedup", lambda: list_dedup(matches), lambda: CandidateSet(matches)),
+                (
+                    f"rerank top{top_n}",
+                    lambda: list_reorder(as_list, reranked_top),
+                    lambda: as_set.reorder(r["id"] for r in reranked_top),
+                ),
+                (
+                    "rerank all",
+                    lambda: list_reorder(as_list, reranked_all),
+                    lambda: as_set.reorder(r["id"] for r in reranked_all),
+                ),
+                ("evidence", lambda: as_list[:5], lambda: as_set.top(5)),
+            ]
+
+            for name, old_fn, new_fn in cases:
+                old_us = self.measure(old_fn, repeat)
+                new_us = self.measure(new_fn, repeat)
+                self.stdout.write(
+                    f"{n:>6}  {name:<14}{old_us:>12.1f}{new_us:>12.1f}{old_us / max(new_us, 1e-9):>9.1f}x"
+                )
+
+    def measure(self, fn, repeat: int) -> float:
+        """
+        1회 실행 시간(us, repeat번 측정 중 최소)
+        """
+        timer = timeit.Timer(fn)
+        number, _ = timer.autorange()
+        return min(timer.repeat(repeat=repeat, number=number)) / number * 1e6
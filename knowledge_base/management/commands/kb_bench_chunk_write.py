@@ -0,0 +1,92 @@
+import os
+import tempfile
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from openpyxl import Workbook
+
+from agent_work.models import Project
+from core.models import User
+from knowledge_base.models import KBChunk, KBDocument
+from knowledge_base.services.chunk_writer import bulk_save_chunks, iter_chunk_objects
+from knowledge_base.utils import build_units_from_text, chunk_with_context, extract_text_from_excel
+
+
+class Command(BaseCommand):
+    """
+    청크 저장 방식 벤치마크(행 단위 create vs bulk_create 배치)
+
+    사용 예:
+        python manage.py kb_bench_chunk_write --rows 50000
+
+    주의:
+        - 현재 설정된 DB에 임시 사용자/프로젝트/문서를 만들고 끝나면 삭제합니다.
+        - 운영 DB가 아닌 개발 DB에서 실행해 주십시오.
+    """
+
+    help = "행 단위 KBChunk.create 와 bulk_save_chunks 의 저장 시간을 비교합니다."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=50000)
+        parser.add_argument("--batch", type=int, default=None)
+
+    def handle(self, *args, **options):
+        rows = max(1, int(options["rows"]))
+        batch_size = options["batch"]
+
+        # 1) 벤치마크용 워크북 생성 → 실제 업로드 경로와 같은 추출/청킹
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "bench.xlsx")
+
+            wb = Workbook()
+            ws = wb.active
+            ws.title = "인사기록"
+            ws.append(["사번", "이름", "직급", "부서", "비고"])
+            i = 0
+            while i < rows:
+                ws.append([f"E{i:06d}", f"직원{i}", f"G{i % 7}", f"부서{i % 40}", "인사 정책 적용 대상"])
+                i = i + 1
+            wb.save(path)
+
+            text = extract_text_from_excel(path)
+
+        chunks = chunk_with_context(build_units_from_text(text), window=1, max_chars=1200)
+        self.stdout.write(f"rows={rows}, chunks={len(chunks)}")
+
+        tag = uuid.uuid4().hex[:8]
+        user = User.objects.create(login_id=f"bench:{tag}")
+        project = Project.objects.create(owner=user, name=f"bench-{tag}")
+
+        try:
+            # 2) 기존 방식: 청크마다 autocommit INSERT
+            doc_a = KBDocument.objects.create(owner=user, project=project, title="row", source_type="excel")
+            t0 = time.perf_counter()
+            for obj in iter_chunk_objects(doc_a, chunks, importance=3, tags=[]):
+                KBChunk.objects.create(
+                    document=obj.document,
+                    chunk_index=obj.chunk_index,
+                    chunk_text=obj.chunk_text,
+                    importance=obj.importance,
+                    tags=obj.tags,
+                )
+            row_sec = time.perf_counter() - t0
+
+            # 3) bulk_create 배치(배치마다 커밋)
+            doc_b = KBDocument.objects.create(owner=user, project=project, title="bulk", source_type="excel")
+            t0 = time.perf_counter()
+            saved = bulk_save_chunks(
+                iter_chunk_objects(doc_b, chunks, importance=3, tags=[]),
+                batch_size=batch_size,
+            )
+            bulk_sec = time.perf_counter() - t0
+        finally:
+            with transaction.atomic():
+                user.delete()
+
+        speedup = row_sec / bulk_sec if bulk_sec > 0 else 0.0
+
+        self.stdout.write(f"row-by-row create : {row_sec:8.3f}s ({len(chunks) / row_sec:,.0f} chunks/s)")
+        self.stdout.write(f"bulk_save_chunks  : {bulk_sec:8.3f}s ({saved / bulk_sec:,.0f} chunks/s)")
+        self.stdout.write(f"speedup           : x{speedup:.1f}")
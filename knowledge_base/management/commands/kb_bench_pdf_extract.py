@@ -0,0 +1,119 @@
+import os
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from knowledge_base.utils import iter_pdf_lines
+
+
+def build_text_pdf(path: str, pages: int, lines_per_page: int) -> None:
+    """
+    텍스트 페이지로만 구성된 PDF fixture를 생성합니다(외부 라이브러리 없이 직접 작성).
+
+    각 페이지에는 Helvetica로 lines_per_page 줄의 정책 문구가 들어갑니다.
+    """
+    objects = []
+
+    # 1: catalog, 2: pages, 3: font, 이후 (page, content) 쌍
+    kids = []
+    page_objs = []
+    obj_no = 4
+    p = 0
+    while p < pages:
+        kids.append(f"{obj_no} 0 R")
+
+        rows = ["BT", "/F1 9 Tf", "11 TL", "40 800 Td"]
+        i = 0
+        while i < lines_per_page:
+            rows.append(f"(Policy {p + 1}-{i + 1}: grade G{i % 7} employees follow article {p * 10 + i} of the HR rulebook.) '")
+            i = i + 1
+        rows.append("ET")
+        stream = "\n".join(rows).encode("latin-1")
+
+        page_objs.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {obj_no + 1} 0 R >>".encode("latin-1")
+        )
+        page_objs.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+
+        obj_no = obj_no + 2
+        p = p + 1
+
+    objects.append(b"<< /Type /Catalog /Pages 2 0 R >>")
+    objects.append(f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {pages} >>".encode("latin-1"))
+    objects.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    objects.extend(page_objs)
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    n = 0
+    while n < len(objects):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % (n + 1) + objects[n] + b"\nendobj\n"
+        n = n + 1
+
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for off in offsets:
+        out += b"%010d 00000 n \n" % off
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+
+    with open(path, "wb") as fp:
+        fp.write(out)
+
+
+class Command(BaseCommand):
+    """
+    PDF 텍스트 추출 벤치마크(직렬 vs 페이지 샤딩 병렬)
+
+    사용 예:
+        python manage.py kb_bench_pdf_extract --pages 300 --workers 4
+    """
+
+    help = "300페이지 PDF fixture로 직렬/병렬 PDF 추출 시간을 비교합니다."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--pages", type=int, default=300)
+        parser.add_argument("--lines", type=int, default=60, help="페이지당 텍스트 줄 수")
+        parser.add_argument("--workers", type=int, default=settings.KB_PDF_WORKERS)
+        parser.add_argument("--repeat", type=int, default=3)
+
+    def handle(self, *args, **options):
+        pages = max(1, int(options["pages"]))
+        workers = max(2, int(options["workers"]))
+        repeat = max(1, int(options["repeat"]))
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "bench.pdf")
+            build_text_pdf(path, pages=pages, lines_per_page=int(options["lines"]))
+            self.stdout.write(f"fixture: pages={pages}, size={os.path.getsize(path) / 1024:,.0f}KB, workers={workers}")
+
+            serial_best = None
+            parallel_best = None
+            serial_lines = []
+            parallel_lines = []
+
+            r = 0
+            while r < repeat:
+                t0 = time.perf_counter()
+                serial_lines = list(iter_pdf_lines(path, workers=1))
+                sec = time.perf_counter() - t0
+                if serial_best is None or sec < serial_best:
+                    serial_best = sec
+
+                t0 = time.perf_counter()
+                parallel_lines = list(iter_pdf_lines(path, workers=workers))
+                sec = time.perf_counter() - t0
+                if parallel_best is None or sec < parallel_best:
+                    parallel_best = sec
+
+                r = r + 1
+
+        if serial_lines != parallel_lines:
+            self.stderr.write("경고: 직렬/병렬 추출 결과가 다릅니다.")
+
+        self.stdout.write(f"serial   : {serial_best:8.3f}s ({pages / serial_best:,.0f} pages/s)")
+        self.stdout.write(f"parallel : {parallel_best:8.3f}s ({pages / parallel_best:,.0f} pages/s)")
+        self.stdout.write(f"speedup  : x{serial_best / parallel_best:.2f} (same output: {serial_lines == parallel_lines})")
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+
+from knowledge_base.services.embedding_cache import get_embedding_cache
+
+
+class Command(BaseCommand):
+    """
+    임베딩 로컬 캐시 상태 조회/초기화
+
+    사용 예:
+        python manage.py kb_embedding_cache          # hit/miss/항목 수 출력
+        python manage.py kb_embedding_cache --clear  # 캐시 비우기
+    """
+
+    help = "임베딩 캐시 통계를 출력하거나 캐시를 비웁니다."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--clear", action="store_true")
+
+    def handle(self, *args, **options):
+        cache = get_embedding_cache()
+        if cache is None:
+            self.stdout.write("임베딩 캐시가 비활성화되어 있습니다(KB_EMBEDDING_CACHE_PATH).")
+            return
+
+        if options["clear"]:
+            cache.clear()
+            self.stdout.write(f"캐시를 비웠습니다: {cache.path}")
+            return
+
+        stats = cache.stats()
+        self.stdout.write(f"path      : {cache.path}")
+        self.stdout.write(f"entries   : {stats['entries']:,} / {cache.max_entries:,}")
+        self.stdout.write(f"hits      : {stats['hits']:,}")
+        self.stdout.write(f"misses    : {stats['misses']:,}")
+        self.stdout.write(f"evictions : {stats['evictions']:,}")
+        self.stdout.write(f"hit_rate  : {stats['hit_rate']:.2%}")
@@ -0,0 +1,63 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from agent_work.models import Project
+from knowledge_base.models import KBChunk
+from knowledge_base.services.lexical_index import get_lexical_index, rebuild_project
+from knowledge_base.services.retrieval_cache import bump_project_version
+
+
+class Command(BaseCommand):
+    """
+    키워드 검색(BM25) 역색인 재생성/조회
+
+    사용 예:
+        python manage.py kb_lexical_index                       # 모든 프로젝트 segment 재생성
+        python manage.py kb_lexical_index --project 3           # 프로젝트 1개
+        python manage.py kb_lexical_index --project 3 --query "G3 직급 승진 규정"   # 검색 결과 확인
+
+    - 업로드 처리(ingest)는 문서 segment를 자동으로 씁니다.
+      이 명령은 하이브리드 검색 도입 이전에 올린 문서를 색인하거나 파일을 잃었을 때 사용합니다.
+    """
+
+    help = "프로젝트 청크의 BM25 역색인 segment를 다시 만들거나 검색 결과를 출력합니다."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--project", type=int, default=None)
+        parser.add_argument("--query", type=str, default="")
+        parser.add_argument("--top-k", type=int, default=10)
+
+    def handle(self, *args, **options):
+        if options["query"]:
+            if options["project"] is None:
+                raise CommandError("--query 는 --project 와 함께 사용합니다.")
+            self.search(options["project"], options["query"], options["top_k"])
+            return
+
+        projects = Project.objects.order_by("id")
+        if options["project"] is not None:
+            projects = projects.filter(id=options["project"])
+            if not projects.exists():
+                raise CommandError(f"project {options['project']} 가 없습니다.")
+
+        for project_id in projects.values_list("id", flat=True):
+            t0 = time.perf_counter()
+            doc_count, chunk_count = rebuild_project(project_id)
+            bump_project_version(project_id)
+            self.stdout.write(
+                f"project {project_id}: {doc_count:,} documents / {chunk_count:,} chunks "
+                f"({time.perf_counter() - t0:.2f}s)"
+            )
+
+    def search(self, project_id: int, query: str, top_k: int) -> None:
+        t0 = time.perf_counter()
+        hits = get_lexical_index(project_id).search(query, top_k)
+        elapsed_ms = (time.perf_counter() - t0) * 1000.0
+
+        texts = dict(KBChunk.objects.filter(id__in=[chunk_id for chunk_id, _ in hits]).values_list("id", "chunk_text"))
+
+        self.stdout.write(f"{len(hits)} hits ({elapsed_ms:.1f} ms, 첫 조회는 segment 로드 포함)")
+        for chunk_id, score in hits:
+            preview = " ".join(str(texts.get(chunk_id, "")).split())[:80]
+            self.stdout.write(f"  {score:8.3f}  chunk {chunk_id}: {preview}")
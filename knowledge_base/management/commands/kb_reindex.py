@@ -0,0 +1,118 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from agent_work.models import Project
+from knowledge_base.models import KBJob
+from knowledge_base.services.ingest import mark_job_finished
+from knowledge_base.services.job_queue import active_jobs, enqueue_job, keep_alive, start_job
+from knowledge_base.services.reindex import run_reindex_job
+
+# --resume로 이어받는 이전 job 설정(force 기준 시각 포함)
+RESUME_PARAM_KEYS = ("force", "batch", "store_text", "force_before")
+
+
+class Command(BaseCommand):
+    """
+    프로젝트 전체 재인덱싱(중단 후 재실행하면 남은 청크부터 이어서 처리)
+
+    사용 예:
+        python manage.py kb_reindex --project 3
+        python manage.py kb_reindex --project 3 --force        # 임베딩 모델 변경 후 전체 재인덱싱
+        python manage.py kb_reindex --project 3 --background   # kb_worker에 job으로 등록만
+        python manage.py kb_reindex --project 3 --resume 42    # 중단된 job 42의 설정(--force 기준 시각)으로 이어서
+
+    - 같은 프로젝트에 등록/실행 중인 reindex job이 있으면 새로 시작하지 않습니다.
+    - --force는 job 시작 시각 이전에 인덱싱된 청크를 다시 처리하므로,
+      중단 후 새로 실행하면 처음부터 다시 임베딩합니다. 이어서 하려면 --resume을 씁니다.
+    """
+
+    help = "프로젝트의 미인덱싱 청크를 모두 임베딩/업서트합니다."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--project", type=int, required=True)
+        parser.add_argument("--force", action="store_true", help="이미 인덱싱된 청크도 다시 처리합니다.")
+        parser.add_argument("--batch", type=int, default=64)
+        parser.add_argument("--background", action="store_true", help="job만 등록하고 종료합니다.")
+        parser.add_argument(
+            "--store-text",
+            choices=["0", "1"],
+            default=None,
+            help="Pinecone metadata에 청크 본문 저장 여부(기본 KB_PINECONE_STORE_TEXT)",
+        )
+        parser.add_argument(
+            "--resume",
+            type=int,
+            default=None,
+            metavar="JOB_ID",
+            help="중단된 reindex job의 설정(--force 기준 시각 포함)을 이어받아 실행합니다.",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            project = Project.objects.select_related("owner").get(id=options["project"])
+        except Project.DoesNotExist:
+            raise CommandError(f"project {options['project']} 가 없습니다.")
+
+        params = {"force": bool(options["force"]), "batch": int(options["batch"])}
+        if options["store_text"] is not None:
+            params["store_text"] = options["store_text"] == "1"
+
+        if options["resume"] is not None:
+            params = self.resume_params(project, options["resume"])
+
+        # kb_worker나 다른 명령이 이미 처리 중이면 함께 돌리지 않습니다.
+        existing = (
+            active_jobs()
+            .filter(project=project, owner=project.owner, job_type="reindex")
+            .order_by("id")
+            .first()
+        )
+        if existing is not None:
+            if options["background"]:
+                self.stdout.write(f"reindex job {existing.id} 가 이미 등록되어 있습니다({existing.status}).")
+                return
+            raise CommandError(f"reindex job {existing.id} 가 이미 {existing.status} 상태입니다.")
+
+        if options["background"]:
+            job = enqueue_job(owner=project.owner, project=project, job_type="reindex", params=params)
+            self.stdout.write(f"reindex job {job.id} 등록(kb_worker가 처리합니다)")
+            return
+
+        # 포그라운드 실행: running 상태로 바로 만들어 kb_worker가 선점하지 않게 하고,
+        # 실행하는 동안 heartbeat를 갱신해 임대 만료 job으로 회수되지 않도록 합니다.
+        job = start_job(owner=project.owner, project=project, job_type="reindex", params=params)
+
+        def report(j: KBJob) -> None:
+            self.stdout.write(f"  {j.progress_done:,}/{j.progress_total:,}")
+
+        try:
+            with keep_alive(job.id):
+                run_reindex_job(job, on_progress=report)
+        except KeyboardInterrupt:
+            mark_job_finished(job, error="interrupted")
+            self.stdout.write(
+                "중단되었습니다. 이어서 처리하려면 다음을 실행하세요:\n"
+                f"  python manage.py kb_reindex --project {project.id} --resume {job.id}"
+            )
+            return
+        except Exception as e:
+            mark_job_finished(job, error=f"{type(e).__name__}: {e}")
+            raise CommandError(str(e))
+
+        mark_job_finished(job)
+        self.stdout.write(
+            f"완료: {job.progress_total:,}개 "
+            f"(embedded={job.params.get('embedded_count', 0)}, reused={job.params.get('reused_count', 0)})"
+        )
+
+    def resume_params(self, project: Project, job_id: int) -> dict:
+        """
+        이어받을 reindex job의 설정을 가져옵니다(같은 프로젝트의 끝난 job만).
+        """
+        prev = KBJob.objects.filter(id=job_id, project=project, job_type="reindex").first()
+        if prev is None:
+            raise CommandError(f"project {project.id} 의 reindex job {job_id} 가 없습니다.")
+        if prev.status in ("queued", "running"):
+            raise CommandError(f"reindex job {job_id} 는 아직 {prev.status} 상태입니다.")
+
+        prev_params = prev.params or {}
+        return {key: prev_params[key] for key in RESUME_PARAM_KEYS if key in prev_params}
@@ -0,0 +1,161 @@
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from knowledge_base.models import KBJob
+from knowledge_base.services.job_queue import (
+    abandon_job,
+    claim_next_job,
+    init_worker_process,
+    reclaim_expired_jobs,
+    requeue_job,
+    run_job,
+    touch_jobs,
+)
+
+
+class Command(BaseCommand):
+    """
+    지식베이스 백그라운드 작업 worker
+
+    사용 예:
+        python manage.py kb_worker
+        python manage.py kb_worker --workers 4
+        python manage.py kb_worker --once   # 쌓인 job만 처리하고 종료
+
+    - 실행 중인 job의 heartbeat를 KB_JOB_HEARTBEAT_SECONDS마다 갱신합니다.
+    - 시작할 때와 heartbeat 주기마다 임대 시간이 지난 running job(죽은 worker의 job)을 회수합니다.
+    - 자식 프로세스가 죽으면 풀 전체가 깨지므로(BrokenProcessPool), 중단된 job을 queued로 되돌리고
+      새 풀을 만들어 계속 처리합니다. 여러 job이 함께 중단되면 원인을 가리기 위해
+      다음에는 각 job을 단독으로 실행합니다(params["isolate"]).
+    """
+
+    help = "DB 큐(KBJob)의 queued 작업을 프로세스 풀로 처리합니다."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=settings.KB_JOB_WORKERS)
+        parser.add_argument("--poll", type=float, default=settings.KB_JOB_POLL_SECONDS)
+        parser.add_argument("--once", action="store_true", help="대기 job이 없으면 종료합니다.")
+
+    def handle(self, *args, **options):
+        workers = max(1, int(options["workers"]))
+        poll = max(0.1, float(options["poll"]))
+        once = bool(options["once"])
+
+        # fork 전에 부모 커넥션을 닫아 자식과 공유되지 않도록 합니다.
+        connections.close_all()
+
+        self.stdout.write(f"kb_worker 시작: workers={workers}, poll={poll}s")
+
+        reclaimed = reclaim_expired_jobs()
+        if reclaimed:
+            self.stdout.write(f"임대 만료 job {reclaimed}건 회수")
+
+        heartbeat_every = max(poll, float(settings.KB_JOB_HEARTBEAT_SECONDS))
+        last_heartbeat = time.monotonic()
+
+        running = {}
+        # params["isolate"] job을 단독 실행하는 동안에는 다른 job을 선점하지 않습니다.
+        isolated = set()
+        pool = self.new_pool(workers)
+
+        try:
+            while True:
+                # 1) 끝난 job 정리
+                broken = False
+                in_flight = len(running)
+                for job_id in list(running.keys()):
+                    future = running[job_id]
+                    if future.done():
+                        del running[job_id]
+                        isolated.discard(job_id)
+                        try:
+                            status = future.result()
+                        except BrokenProcessPool:
+                            # 같은 풀의 job이 모두 중단되므로 실패 처리하지 않고 다시 실행합니다.
+                            broken = True
+                            status = self.requeue(job_id, alone=in_flight == 1)
+                        except Exception as e:
+                            # 자식 프로세스가 죽으면 job이 running으로 남으므로 바로 정리
+                            status = f"crashed ({e})"
+                            job = KBJob.objects.filter(id=job_id, status="running").first()
+                            if job is not None:
+                                abandon_job(job, error=f"worker_crashed: {e}")
+                        self.stdout.write(f"job {job_id}: {status}")
+
+                if broken:
+                    pool = self.replace_pool(pool, workers, running, in_flight)
+                    isolated.clear()
+
+                # 2) heartbeat 갱신 + 다른 worker가 남긴 임대 만료 job 회수
+                if time.monotonic() - last_heartbeat >= heartbeat_every:
+                    touch_jobs(list(running.keys()))
+                    reclaim_expired_jobs()
+                    last_heartbeat = time.monotonic()
+
+                # 3) 빈 슬롯만큼 선점
+                claimed = 0
+                while len(running) < workers and not isolated:
+                    job = claim_next_job()
+                    if job is None:
+                        break
+                    if (job.params or {}).get("isolate") and running:
+                        # 단독 실행할 job: 실행 중인 job이 끝날 때까지 queued로 돌려 둡니다.
+                        requeue_job(job.id, count_attempt=False)
+                        break
+                    try:
+                        running[job.id] = pool.submit(run_job, job.id)
+                    except (BrokenProcessPool, RuntimeError):
+                        # 선점한 job이 running으로 남지 않도록 되돌리고 다음 주기에 새 풀로 다시 선점
+                        requeue_job(job.id, count_attempt=False)
+                        pool = self.replace_pool(pool, workers, running, len(running) + 1)
+                        isolated.clear()
+                        break
+                    if (job.params or {}).get("isolate"):
+                        isolated.add(job.id)
+                    claimed = claimed + 1
+                    self.stdout.write(f"job {job.id} ({job.job_type}) 시작")
+
+                if once and claimed == 0 and len(running) == 0:
+                    break
+
+                time.sleep(poll)
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def new_pool(self, workers: int) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(max_workers=workers, initializer=init_worker_process)
+
+    def requeue(self, job_id: int, alone: bool) -> str:
+        """
+        깨진 풀에서 중단된 job을 되돌립니다.
+
+        - 단독으로 돌던 job이면 원인이 분명하므로 재시도 횟수를 셉니다.
+        - 여러 job이 함께 중단되었으면 횟수를 세지 않고, 다음에 단독 실행하도록 표시합니다.
+        """
+        if alone:
+            status = requeue_job(job_id)
+        else:
+            status = requeue_job(job_id, count_attempt=False, isolate=True)
+        return f"interrupted ({status or 'finished'})"
+
+    def replace_pool(
+        self, pool: ProcessPoolExecutor, workers: int, running: dict, in_flight: int
+    ) -> ProcessPoolExecutor:
+        """
+        깨진 풀을 버리고 새 풀을 만듭니다.
+
+        - 깨진 풀의 나머지 job(아직 결과를 확인하지 않은 future)도 queued로 되돌립니다.
+        """
+        for job_id in list(running.keys()):
+            del running[job_id]
+            self.stdout.write(f"job {job_id}: {self.requeue(job_id, alone=in_flight == 1)}")
+
+        pool.shutdown(wait=False, cancel_futures=True)
+        connections.close_all()
+        self.stdout.write("프로세스 풀이 깨져 새로 시작합니다.")
+        return self.new_pool(workers)
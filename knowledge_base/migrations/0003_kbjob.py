@@ -0,0 +1,37 @@
+# Generated by Django 5.2.10 on 2026-10-17 12:50
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agent_work', '0002_workconversation_workmessage'),
+        ('knowledge_base', '0002_kbchunk_embedding_dim_kbchunk_embedding_model_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='KBJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('job_type', models.CharField(choices=[('ingest', 'ingest')], default='ingest', max_length=20)),
+                ('status', models.CharField(choices=[('queued', 'queued'), ('running', 'running'), ('succeeded', 'succeeded'), ('failed', 'failed')], db_index=True, default='queued', max_length=20)),
+                ('stage', models.CharField(choices=[('queued', 'queued'), ('extract', 'extract'), ('chunk', 'chunk'), ('done', 'done')], default='queued', max_length=20)),
+                ('params', models.JSONField(blank=True, default=dict)),
+                ('progress_done', models.IntegerField(default=0)),
+                ('progress_total', models.IntegerField(default=0)),
+                ('error', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('document', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='jobs', to='knowledge_base.kbdocument')),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='kb_jobs', to=settings.AUTH_USER_MODEL)),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='kb_jobs', to='agent_work.project')),
+            ],
+        ),
+    ]
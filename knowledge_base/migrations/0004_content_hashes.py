@@ -0,0 +1,45 @@
+# Generated by Django 5.2.10 on 2026-10-17 12:57
+
+import hashlib
+
+from django.db import migrations, models
+
+
+def backfill_text_hash(apps, schema_editor):
+    """
+    기존 청크의 text_hash를 채웁니다(임베딩 재사용 대상이 되도록).
+    """
+    KBChunk = apps.get_model("knowledge_base", "KBChunk")
+
+    batch = []
+    for ch in KBChunk.objects.filter(text_hash="").only("id", "chunk_text").iterator(chunk_size=1000):
+        ch.text_hash = hashlib.sha256(ch.chunk_text.encode("utf-8")).hexdigest()
+        batch.append(ch)
+
+        if len(batch) >= 1000:
+            KBChunk.objects.bulk_update(batch, ["text_hash"])
+            batch = []
+
+    if batch:
+        KBChunk.objects.bulk_update(batch, ["text_hash"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('knowledge_base', '0003_kbjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='kbchunk',
+            name='text_hash',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='kbdocument',
+            name='content_hash',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=64),
+        ),
+        migrations.RunPython(backfill_text_hash, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.10 on 2026-10-17 12:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('knowledge_base', '0004_content_hashes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='kbchunk',
+            name='embedding_vector',
+            field=models.BinaryField(blank=True, help_text='float32 packed 임베딩 벡터', null=True),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.10 on 2026-10-17 13:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('knowledge_base', '0005_kbchunk_embedding_vector'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='kbjob',
+            name='job_type',
+            field=models.CharField(choices=[('ingest', 'ingest'), ('reindex', 'reindex')], default='ingest', max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='kbjob',
+            name='stage',
+            field=models.CharField(choices=[('queued', 'queued'), ('extract', 'extract'), ('chunk', 'chunk'), ('index', 'index'), ('done', 'done')], default='queued', max_length=20),
+        ),
+    ]
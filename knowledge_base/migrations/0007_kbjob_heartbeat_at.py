@@ -0,0 +1,18 @@
+# Generated by Django 5.2.10 on 2026-10-17 13:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('knowledge_base', '0006_kbjob_reindex'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='kbjob',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
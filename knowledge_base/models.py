@@ -1,8 +1,11 @@
+from typing import List, Optional
+
 from django.conf import settings
 from django.db import models
 from django.utils import timezone
 
 from agent_work.models import Project
+from .utils import pack_float32, unpack_float32
 
 
 class KBDocument(models.Model):
@@ -57,6 +60,9 @@ class KBDocument(models.Model):
     original_filename = models.CharField(max_length=255, blank=True, default="")
     file_size = models.IntegerField(default=0)
 
+    # 업로드 원본 파일 SHA-256(동일 파일 재업로드 시 ingest 생략)
+    content_hash = models.CharField(max_length=64, blank=True, default="", db_index=True)
+
     created_at = models.DateTimeField(default=timezone.now)
 
     def __str__(self):
@@ -83,6 +89,9 @@ class KBChunk(models.Model):
     chunk_index = models.IntegerField(default=0)
     chunk_text = models.TextField()
 
+    # chunk_text SHA-256(동일 텍스트 청크의 임베딩 재사용)
+    text_hash = models.CharField(max_length=64, blank=True, default="", db_index=True)
+
     # 문서 중요도 상속(검색/프롬프트 가중치에 사용)
     importance = models.IntegerField(default=3)
 
@@ -116,6 +125,14 @@ class KBChunk(models.Model):
         null=True,
         help_text="임베딩 차원(예: 1024)",
     )
+
+    # 임베딩 벡터 로컬 보관(float32 packed, 1024차원 = 4KB)
+    # Pinecone namespace 초기화 후 재업서트/로컬 검색 시 재임베딩 없이 사용합니다.
+    embedding_vector = models.BinaryField(
+        blank=True,
+        null=True,
+        help_text="float32 packed 임베딩 벡터",
+    )
     
     created_at = models.DateTimeField(default=timezone.now)
     
@@ -127,7 +144,7 @@ class KBChunk(models.Model):
             )
         ]
 
-    def mark_indexed(self, pinecone_id: str, model: str, dim: int) -> None:
+    def mark_indexed(self, pinecone_id: str, model: str, dim: int, vector: Optional[List[float]] = None) -> None:
         """
         upsert 완료 표기를 수행합니다.
 
@@ -135,6 +152,7 @@ class KBChunk(models.Model):
             pinecone_id (str): Pinecone에 저장된 벡터 ID
             model (str): 임베딩 모델명
             dim (int): 임베딩 차원수
+            vector (List[float] | None): upsert한 벡터(주면 float32로 함께 보관)
 
         Returns:
             None: DB 필드만 갱신합니다.
@@ -144,5 +162,98 @@ class KBChunk(models.Model):
         self.embedding_model = model
         self.embedding_dim = dim
 
+        if vector is not None:
+            self.embedding_vector = pack_float32(vector)
+
+    def get_embedding(self, model: str, dim: int) -> Optional[List[float]]:
+        """
+        보관된 벡터가 (model, dim)과 일치하면 float 리스트로 반환합니다(아니면 None).
+        """
+        if not self.embedding_vector:
+            return None
+        if self.embedding_model != model or self.embedding_dim != dim:
+            return None
+
+        vector = unpack_float32(self.embedding_vector)
+        if len(vector) != dim:
+            return None
+        return vector
+
     def __str__(self):
         return f"{self.document_id}:{self.chunk_index}"
+
+
+class KBJob(models.Model):
+    """
+    지식베이스 백그라운드 작업(DB 기반 큐)
+
+    사용 의도:
+        - 업로드 요청은 파일만 임시 저장하고 job을 queued로 등록합니다.
+        - 실제 추출/청킹/저장은 `manage.py kb_worker` 프로세스가 수행합니다.
+        - reindex job은 프로젝트의 미인덱싱 청크를 끝까지 인덱싱합니다(indexed_at 체크포인트).
+        - 상태 API는 stage/progress 필드를 그대로 노출합니다.
+    """
+
+    JOB_TYPE_CHOICES = (
+        ("ingest", "ingest"),
+        ("reindex", "reindex"),
+    )
+
+    STATUS_CHOICES = (
+        ("queued", "queued"),
+        ("running", "running"),
+        ("succeeded", "succeeded"),
+        ("failed", "failed"),
+    )
+
+    STAGE_CHOICES = (
+        ("queued", "queued"),
+        ("extract", "extract"),
+        ("chunk", "chunk"),
+        ("index", "index"),
+        ("done", "done"),
+    )
+
+    owner = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="kb_jobs",
+    )
+
+    project = models.ForeignKey(
+        Project,
+        on_delete=models.CASCADE,
+        related_name="kb_jobs",
+    )
+
+    # ingest 완료 시 생성된 문서
+    document = models.ForeignKey(
+        KBDocument,
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        related_name="jobs",
+    )
+
+    job_type = models.CharField(max_length=20, choices=JOB_TYPE_CHOICES, default="ingest")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="queued", db_index=True)
+    stage = models.CharField(max_length=20, choices=STAGE_CHOICES, default="queued")
+
+    # 작업 입력값(임시 파일 경로, 제목, 중요도, 태그 등)
+    params = models.JSONField(blank=True, default=dict)
+
+    # 진행률(현재 stage 기준 처리량)
+    progress_done = models.IntegerField(default=0)
+    progress_total = models.IntegerField(default=0)
+
+    error = models.TextField(blank=True, default="")
+
+    created_at = models.DateTimeField(default=timezone.now)
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    # running job 생존 신호(kb_worker가 주기적으로 갱신, 오래 멈추면 다른 worker가 회수)
+    heartbeat_at = models.DateTimeField(blank=True, null=True)
+
+    def __str__(self):
+        return f"{self.job_type}:{self.id}:{self.status}"
@@ -0,0 +1,92 @@
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+# 검색 후보 집합
+#
+# - hydrate_matches()가 만들고, rerank 재배열 / 프롬프트 / 근거 표시 / 캐시 저장이 그대로 사용합니다.
+# - kb_chunk_id → 후보 dict + 순서(id 목록)를 함께 들고 있어
+#   id 조회·중복 확인은 O(1), 재배열은 O(n)입니다(목록을 매번 훑지 않음).
+# - len / 반복 / 정수 인덱스 / slice는 순서대로의 후보 dict 목록처럼 동작합니다.
+
+
+class CandidateSet:
+    """
+    kb_chunk_id 기준으로 중복 없는 순서 있는 후보 목록
+
+    - 후보의 kb_chunk_id는 int입니다(hydrate_matches가 보장). 조회/재배열 id는 문자열도 받습니다.
+    """
+
+    def __init__(self, candidates: Iterable[Dict[str, Any]] = ()):
+        self._by_id: Dict[int, Dict[str, Any]] = {}
+        self._order: List[int] = []
+
+        by_id = self._by_id
+        order = self._order
+        for cand in candidates:
+            chunk_id = cand["kb_chunk_id"]
+            if chunk_id not in by_id:
+                by_id[chunk_id] = cand
+                order.append(chunk_id)
+
+    def add(self, cand: Dict[str, Any]) -> bool:
+        """
+        후보를 맨 뒤에 추가합니다(같은 청크가 이미 있으면 추가하지 않고 False).
+
+        - 검색 결과는 점수 순으로 들어오므로 먼저 들어온(점수가 높은) 후보가 남습니다.
+        """
+        chunk_id = cand["kb_chunk_id"]
+        if chunk_id in self._by_id:
+            return False
+
+        self._by_id[chunk_id] = cand
+        self._order.append(chunk_id)
+        return True
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for chunk_id in self._order:
+            yield self._by_id[chunk_id]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._by_id[chunk_id] for chunk_id in self._order[index]]
+        return self._by_id[self._order[index]]
+
+    def __contains__(self, chunk_id) -> bool:
+        return int(chunk_id) in self._by_id
+
+    def get(self, chunk_id) -> Optional[Dict[str, Any]]:
+        return self._by_id.get(int(chunk_id))
+
+    def ids(self) -> List[int]:
+        """
+        순서대로의 kb_chunk_id 목록
+        """
+        return list(self._order)
+
+    def top(self, n: int) -> List[Dict[str, Any]]:
+        """
+        앞에서 n개 후보(프롬프트 근거 / 화면 근거 Top-N)
+        """
+        return self[: max(0, int(n))]
+
+    def reorder(self, chunk_ids: Iterable[Any]) -> "CandidateSet":
+        """
+        주어진 id 순서의 새 후보 집합을 만듭니다(rerank 결과 반영, O(n)).
+
+        - 없는 id와 중복 id는 건너뜁니다.
+        - 주어진 id 중 하나도 없으면 기존 순서를 그대로 반환합니다.
+        """
+        out = CandidateSet()
+        for chunk_id in chunk_ids:
+            try:
+                cand = self._by_id.get(int(chunk_id))
+            except (TypeError, ValueError):
+                continue
+            if cand is not None:
+                out.add(cand)
+
+        if len(out) == 0:
+            return self
+        return out
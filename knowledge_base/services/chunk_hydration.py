@@ -0,0 +1,236 @@
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from ..models import KBChunk
+from .candidate_set import CandidateSet
+
+# 후보 dict에 담는 KBChunk 필드(values()로 한 번에 조회)
+_FIELDS = (
+    "id",
+    "pinecone_id",
+    "document_id",
+    "document__title",
+    "chunk_index",
+    "importance",
+    "tags",
+    "chunk_text",
+)
+
+
+def _to_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def candidate_from_metadata(m: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    store_text 모드로 인덱싱된 match면 metadata만으로 후보를 만듭니다.
+
+    - chunk_text가 없거나 잘린(text_truncated) 경우, kb_chunk_id가 없는 경우는 None(DB 조회 필요)
+    - 청크가 아직 DB에 있는지는 확인하지 않습니다(hydrate_matches가 id만 한 번에 확인).
+    """
+    meta = m.get("metadata", {}) or {}
+
+    text = meta.get("chunk_text")
+    kb_chunk_id = _to_int(meta.get("kb_chunk_id"))
+    if text is None or meta.get("text_truncated") or not kb_chunk_id:
+        return None
+
+    tags = meta.get("tags", [])
+    if not isinstance(tags, list):
+        tags = [str(tags)]
+
+    return {
+        "pinecone_id": str(m.get("id") or ""),
+        "kb_chunk_id": kb_chunk_id,
+        "document_id": _to_int(meta.get("document_id")),
+        "doc_title": str(meta.get("doc_title", "")),
+        "chunk_index": _to_int(meta.get("chunk_index")),
+        "importance": _to_int(meta.get("importance")) or 3,
+        "tags": tags,
+        "chunk_text": str(text),
+        "score": m.get("score"),
+        "final_score": m.get("final_score"),
+        "source": "metadata",
+    }
+
+
+def hydrate_matches(
+    matches: List[Dict[str, Any]],
+    project_id: int,
+    owner_id: int,
+) -> Tuple[CandidateSet, List[str], List[str]]:
+    """
+    Pinecone match 목록을 KBChunk 후보(dict) 목록으로 변환합니다.
+
+    조회:
+        - metadata에 잘리지 않은 chunk_text가 있으면 본문은 metadata를 쓰고,
+          청크가 남아 있는지만 values_list("id") 1회로 확인합니다(store_text 모드, 삭제된 문서 제외).
+        - metadata.kb_chunk_id가 있으면 id__in 1회(키워드 검색 match는 id 없이 kb_chunk_id만 있음)
+        - 없으면 match id로 pinecone_id__in 1회
+        - match 수와 무관하게 쿼리는 최대 3회입니다.
+
+    Parameters:
+        matches: sort_matches_with_importance() 결과(이 순서를 유지합니다)
+        project_id / owner_id: 조회 범위(다른 프로젝트/사용자 청크는 제외)
+
+    Returns:
+        Tuple[candidates, missing, stale]
+            - candidates: CandidateSet([{"pinecone_id", "kb_chunk_id", "document_id", "doc_title",
+                                         "chunk_index", "importance", "tags", "chunk_text",
+                                         "score", "final_score", "source"}, ...])
+              (source: "metadata" 또는 "db", kb_chunk_id 기준 중복 제거)
+            - missing: DB에서 찾지 못한 match id(삭제된 문서 등, metadata 후보 포함)
+            - stale: kb_chunk_id로 찾았지만 DB의 pinecone_id가 match id와 다른 경우
+    """
+    from_meta, by_chunk_id, by_pinecone_id = _split_matches(matches)
+    scope = _scope(project_id, owner_id)
+
+    live_meta_ids = set()
+    if from_meta:
+        meta_ids = [cand["kb_chunk_id"] for cand in from_meta.values()]
+        live_meta_ids = set(scope.filter(id__in=meta_ids).values_list("id", flat=True))
+
+    rows_by_id: Dict[int, Dict[str, Any]] = {}
+    if by_chunk_id:
+        for row in scope.filter(id__in=by_chunk_id).values(*_FIELDS):
+            rows_by_id[row["id"]] = row
+
+    rows_by_pid: Dict[str, Dict[str, Any]] = {}
+    if by_pinecone_id:
+        for row in scope.filter(pinecone_id__in=by_pinecone_id).values(*_FIELDS):
+            rows_by_pid[row["pinecone_id"]] = row
+
+    return _assemble(matches, from_meta, live_meta_ids, rows_by_id, rows_by_pid)
+
+
+async def ahydrate_matches(
+    matches: List[Dict[str, Any]],
+    project_id: int,
+    owner_id: int,
+) -> Tuple[CandidateSet, List[str], List[str]]:
+    """
+    hydrate_matches의 async 버전(async ORM 사용, 쿼리/결과 동일)
+    """
+    from_meta, by_chunk_id, by_pinecone_id = _split_matches(matches)
+    scope = _scope(project_id, owner_id)
+
+    live_meta_ids = set()
+    if from_meta:
+        meta_ids = [cand["kb_chunk_id"] for cand in from_meta.values()]
+        async for chunk_id in scope.filter(id__in=meta_ids).values_list("id", flat=True):
+            live_meta_ids.add(chunk_id)
+
+    rows_by_id: Dict[int, Dict[str, Any]] = {}
+    if by_chunk_id:
+        async for row in scope.filter(id__in=by_chunk_id).values(*_FIELDS):
+            rows_by_id[row["id"]] = row
+
+    rows_by_pid: Dict[str, Dict[str, Any]] = {}
+    if by_pinecone_id:
+        async for row in scope.filter(pinecone_id__in=by_pinecone_id).values(*_FIELDS):
+            rows_by_pid[row["pinecone_id"]] = row
+
+    return _assemble(matches, from_meta, live_meta_ids, rows_by_id, rows_by_pid)
+
+
+def _scope(project_id: int, owner_id: int):
+    return KBChunk.objects.filter(
+        document__project_id=project_id,
+        document__owner_id=owner_id,
+    )
+
+
+def _split_matches(matches: List[Dict[str, Any]]):
+    """
+    metadata만으로 만들 수 있는 후보와 DB 조회가 필요한 id(kb_chunk_id / pinecone_id)를 나눕니다.
+    """
+    by_chunk_id: List[int] = []
+    by_pinecone_id: List[str] = []
+    from_meta: Dict[int, Dict[str, Any]] = {}
+
+    i = 0
+    while i < len(matches):
+        m = matches[i]
+        cand = candidate_from_metadata(m)
+        if cand is not None:
+            from_meta[i] = cand
+            i = i + 1
+            continue
+
+        meta = m.get("metadata", {}) or {}
+        kb_chunk_id = _to_int(meta.get("kb_chunk_id"))
+        if kb_chunk_id:
+            by_chunk_id.append(kb_chunk_id)
+        elif m.get("id"):
+            by_pinecone_id.append(str(m.get("id")))
+        i = i + 1
+
+    return from_meta, by_chunk_id, by_pinecone_id
+
+
+def _assemble(
+    matches: List[Dict[str, Any]],
+    from_meta: Dict[int, Dict[str, Any]],
+    live_meta_ids: Set[int],
+    rows_by_id: Dict[int, Dict[str, Any]],
+    rows_by_pid: Dict[str, Dict[str, Any]],
+) -> Tuple[CandidateSet, List[str], List[str]]:
+    """
+    match 순서대로 후보를 만들고 missing/stale id를 모읍니다.
+    """
+    candidates = CandidateSet()
+    missing: List[str] = []
+    stale: List[str] = []
+
+    for i, m in enumerate(matches):
+        cand = from_meta.get(i)
+        if cand is not None:
+            # metadata에 본문이 있어도 DB에서 지워진 청크는 근거로 쓰지 않음
+            if cand["kb_chunk_id"] not in live_meta_ids:
+                missing.append(cand["pinecone_id"] or f"kb_chunk:{cand['kb_chunk_id']}")
+                continue
+            candidates.add(cand)
+            continue
+
+        pinecone_id = str(m.get("id") or "")
+        meta = m.get("metadata", {}) or {}
+        kb_chunk_id = _to_int(meta.get("kb_chunk_id"))
+
+        if kb_chunk_id:
+            row = rows_by_id.get(kb_chunk_id)
+            if row is not None and pinecone_id and row["pinecone_id"] and row["pinecone_id"] != pinecone_id:
+                stale.append(pinecone_id)
+        else:
+            row = rows_by_pid.get(pinecone_id)
+
+        if row is None:
+            missing.append(pinecone_id or f"kb_chunk:{kb_chunk_id}")
+            continue
+
+        # 키워드 검색으로만 찾은 청크(match id 없음)는 DB의 벡터 id를 사용(미인덱싱이면 "")
+        if not pinecone_id:
+            pinecone_id = row["pinecone_id"] or ""
+
+        # 같은 청크가 여러 벡터로 걸리면 점수가 높은 첫 번째만 사용
+        if row["id"] in candidates:
+            continue
+
+        candidates.add(
+            {
+                "pinecone_id": pinecone_id,
+                "kb_chunk_id": row["id"],
+                "document_id": row["document_id"],
+                "doc_title": row["document__title"],
+                "chunk_index": row["chunk_index"],
+                "importance": row["importance"],
+                "tags": row["tags"],
+                "chunk_text": row["chunk_text"],
+                "score": m.get("score"),
+                "final_score": m.get("final_score"),
+                "source": "db",
+            }
+        )
+
+    return candidates, missing, stale
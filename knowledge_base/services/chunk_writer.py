@@ -0,0 +1,81 @@
+from itertools import islice
+from typing import Callable, Iterable, Iterator, List, Optional
+
+from django.conf import settings
+from django.db import transaction
+
+from ..models import KBChunk, KBDocument
+from ..utils import text_sha256
+
+
+def iter_chunk_objects(
+    doc: KBDocument,
+    chunks: Iterable[str],
+    importance: int,
+    tags: List[str],
+) -> Iterator[KBChunk]:
+    """
+    청크 텍스트를 (저장 전) KBChunk 인스턴스로 변환하는 generator
+
+    주의:
+        - chunk_index는 빈 청크를 건너뛰어도 원래 위치(idx)를 유지합니다.
+          (기존 create 루프와 동일한 번호 체계)
+    """
+    idx = 0
+    for text in chunks:
+        chunk_text = text.strip()
+        if chunk_text:
+            yield KBChunk(
+                document=doc,
+                chunk_index=idx,
+                chunk_text=chunk_text,
+                text_hash=text_sha256(chunk_text),
+                importance=importance,
+                tags=tags,
+            )
+        idx = idx + 1
+
+
+def bulk_save_chunks(
+    objs: Iterable[KBChunk],
+    batch_size: Optional[int] = None,
+    on_batch: Optional[Callable[[int], None]] = None,
+) -> int:
+    """
+    KBChunk를 bulk_create로 배치 저장합니다(배치마다 따로 커밋).
+
+    - 전체를 하나의 트랜잭션으로 묶지 않습니다(SQLite 쓰기 잠금을 추출/청킹 내내 잡지 않도록).
+      중간에 실패하면 이미 커밋된 배치의 정리는 호출자가 담당합니다(예: 문서 삭제).
+
+    Parameters:
+        objs (Iterable[KBChunk]):
+            저장할 청크(generator 권장: 전체를 리스트로 만들지 않음)
+        batch_size (int | None):
+            INSERT 1회당 행 수(None이면 settings.KB_CHUNK_BULK_BATCH)
+        on_batch (Callable[[int], None] | None):
+            배치 커밋마다 지금까지 저장한 청크 수로 호출(job 진행률 갱신용)
+
+    Returns:
+        int: 저장된 청크 수
+    """
+    if batch_size is None:
+        batch_size = settings.KB_CHUNK_BULK_BATCH
+    if batch_size < 1:
+        batch_size = 1
+
+    it = iter(objs)
+    saved = 0
+
+    while True:
+        batch = list(islice(it, batch_size))
+        if not batch:
+            break
+
+        with transaction.atomic():
+            KBChunk.objects.bulk_create(batch, batch_size=batch_size)
+        saved = saved + len(batch)
+
+        if on_batch is not None:
+            on_batch(saved)
+
+    return saved
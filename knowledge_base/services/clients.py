@@ -0,0 +1,238 @@
+import asyncio
+import importlib.util
+import os
+import threading
+import weakref
+from typing import Any, Dict
+
+from django.conf import settings
+
+# 프로세스 공용 API 클라이언트 레지스트리
+#
+# - OpenAI: httpx 커넥션 풀(keep-alive)을 공유해 요청마다 TLS handshake를 하지 않습니다.
+# - Pinecone: gRPC 클라이언트(pinecone[grpc])가 있으면 채널을 재사용하고, 없으면 REST 클라이언트를 씁니다.
+# - 처음 필요할 때 생성(lazy)하고, fork된 자식 프로세스에서는 부모의 소켓/채널을 쓰지 않도록 비웁니다.
+
+_lock = threading.Lock()
+_clients: Dict[str, Any] = {}
+_pid = os.getpid()
+
+# async 클라이언트는 이벤트 루프에 묶이므로 루프별로 보관합니다.
+# - ASGI 서버(uvicorn 등)에서는 프로세스당 루프가 하나라 계속 재사용됩니다.
+# - WSGI에서 async view를 돌리면 요청마다 루프가 달라 새로 만들어집니다.
+# - 루프가 끝날 때(asyncio.run 종료 시 shutdown_asyncgens) 그 루프의 클라이언트를 닫습니다.
+#   닫지 않으면 httpx/aiohttp 세션과 소켓이 요청마다 쌓입니다.
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, Any]]" = weakref.WeakKeyDictionary()
+_closers: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Any]" = weakref.WeakKeyDictionary()
+
+
+def reset_clients() -> None:
+    """
+    레지스트리를 비웁니다(fork 직후 자식 프로세스, 설정 변경 후 재생성용).
+
+    - 부모에서 만든 커넥션은 자식에서 닫지 않고 버립니다(부모 소켓을 건드리지 않기 위해).
+    """
+    global _lock, _pid
+
+    # fork 시점에 다른 스레드가 lock을 잡고 있었을 수 있으므로 lock도 새로 만듭니다.
+    _lock = threading.Lock()
+    _clients.clear()
+    _async_clients.clear()
+    _closers.clear()
+    _pid = os.getpid()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=reset_clients)
+
+
+def _get_or_create(key: str, factory):
+    if _pid != os.getpid():
+        reset_clients()
+
+    client = _clients.get(key)
+    if client is not None:
+        return client
+
+    with _lock:
+        client = _clients.get(key)
+        if client is None:
+            client = factory()
+            _clients[key] = client
+
+    return client
+
+
+def get_openai_client():
+    """
+    공용 OpenAI 클라이언트를 반환합니다.
+
+    - 커넥션 풀 크기/keep-alive는 OPENAI_HTTP_MAX_CONNECTIONS / OPENAI_HTTP_KEEPALIVE 로 조정합니다.
+    """
+    if not settings.OPENAI_API_KEY:
+        raise ValueError("OPENAI_API_KEY 가 설정되어 있지 않습니다.")
+
+    def factory():
+        import httpx
+        from openai import DefaultHttpxClient, OpenAI
+
+        http_client = DefaultHttpxClient(
+            limits=httpx.Limits(
+                max_connections=settings.OPENAI_HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.OPENAI_HTTP_KEEPALIVE,
+                keepalive_expiry=60.0,
+            ),
+            timeout=httpx.Timeout(settings.OPENAI_HTTP_TIMEOUT, connect=10.0),
+        )
+        return OpenAI(api_key=settings.OPENAI_API_KEY, http_client=http_client)
+
+    return _get_or_create("openai", factory)
+
+
+def get_pinecone_client():
+    """
+    공용 Pinecone 클라이언트를 반환합니다(PINECONE_USE_GRPC=1이고 grpc extra가 있으면 PineconeGRPC).
+    """
+    if not settings.PINECONE_API_KEY:
+        raise ValueError("PINECONE_API_KEY 가 설정되어 있지 않습니다.")
+
+    def factory():
+        if settings.PINECONE_USE_GRPC:
+            try:
+                from pinecone.grpc import PineconeGRPC
+                return PineconeGRPC(api_key=settings.PINECONE_API_KEY)
+            except ImportError:
+                pass
+
+        from pinecone import Pinecone
+        return Pinecone(api_key=settings.PINECONE_API_KEY)
+
+    return _get_or_create("pinecone", factory)
+
+
+def get_pinecone_index():
+    """
+    공용 Pinecone Index(host=PINECONE_HOST) 핸들을 반환합니다.
+    """
+    if not settings.PINECONE_HOST:
+        raise ValueError("PINECONE_HOST 가 설정되어 있지 않습니다.")
+
+    pc = get_pinecone_client()
+    return _get_or_create(f"pinecone_index:{settings.PINECONE_HOST}", lambda: pc.Index(host=settings.PINECONE_HOST))
+
+
+async def _close_at_loop_shutdown(per_loop: Dict[str, Any]):
+    """
+    루프 종료 시 정리용 async generator
+
+    - 첫 yield에서 멈춰 있다가, 루프가 끝날 때 shutdown_asyncgens()가 aclose()를 호출하면
+      finally에서 그 루프의 클라이언트를 나중에 만든 것부터 닫습니다(index → client).
+    """
+    try:
+        yield
+    finally:
+        # generator가 루프를 참조하므로(finalizer) 레지스트리에서 먼저 빼야 루프가 해제됩니다.
+        loop = asyncio.get_running_loop()
+        _closers.pop(loop, None)
+        _async_clients.pop(loop, None)
+
+        for key in reversed(list(per_loop.keys())):
+            client = per_loop.pop(key)
+            close = getattr(client, "close", None)
+            if close is None:
+                continue
+            try:
+                result = close()
+                if asyncio.iscoroutine(result):
+                    await result
+            except Exception:
+                pass
+
+
+def _get_or_create_async(key: str, factory):
+    if _pid != os.getpid():
+        reset_clients()
+
+    loop = asyncio.get_running_loop()
+
+    with _lock:
+        per_loop = _async_clients.get(loop)
+        if per_loop is None:
+            per_loop = {}
+            _async_clients[loop] = per_loop
+
+            # 정리용 generator를 첫 yield까지 바로 진행시켜 루프의 async generator 목록에 등록
+            # (루프는 약한 참조로만 들고 있으므로 _closers에서 강한 참조를 유지)
+            closer = _close_at_loop_shutdown(per_loop)
+            _closers[loop] = closer
+            try:
+                closer.__anext__().send(None)
+            except StopIteration:
+                pass
+
+        client = per_loop.get(key)
+        if client is None:
+            client = factory()
+            per_loop[key] = client
+
+    return client
+
+
+def get_async_openai_client():
+    """
+    현재 이벤트 루프용 AsyncOpenAI 클라이언트를 반환합니다(커넥션 풀 설정은 동기 클라이언트와 동일).
+    """
+    if not settings.OPENAI_API_KEY:
+        raise ValueError("OPENAI_API_KEY 가 설정되어 있지 않습니다.")
+
+    def factory():
+        import httpx
+        from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+
+        http_client = DefaultAsyncHttpxClient(
+            limits=httpx.Limits(
+                max_connections=settings.OPENAI_HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.OPENAI_HTTP_KEEPALIVE,
+                keepalive_expiry=60.0,
+            ),
+            timeout=httpx.Timeout(settings.OPENAI_HTTP_TIMEOUT, connect=10.0),
+        )
+        return AsyncOpenAI(api_key=settings.OPENAI_API_KEY, http_client=http_client)
+
+    return _get_or_create_async("openai", factory)
+
+
+def get_async_pinecone_client():
+    """
+    현재 이벤트 루프용 PineconeAsyncio 클라이언트를 반환합니다.
+
+    - pinecone[asyncio](aiohttp)가 없으면 None을 반환합니다.
+      호출 측은 None이면 동기 클라이언트를 스레드에서 실행합니다.
+    """
+    if not settings.PINECONE_API_KEY:
+        raise ValueError("PINECONE_API_KEY 가 설정되어 있지 않습니다.")
+
+    # PineconeAsyncio는 aiohttp가 있어야 동작합니다.
+    if importlib.util.find_spec("aiohttp") is None:
+        return None
+
+    from pinecone import PineconeAsyncio
+
+    return _get_or_create_async("pinecone", lambda: PineconeAsyncio(api_key=settings.PINECONE_API_KEY))
+
+
+def get_async_pinecone_index():
+    """
+    현재 이벤트 루프용 Pinecone IndexAsyncio 핸들을 반환합니다(asyncio extra가 없으면 None).
+    """
+    if not settings.PINECONE_HOST:
+        raise ValueError("PINECONE_HOST 가 설정되어 있지 않습니다.")
+
+    pc = get_async_pinecone_client()
+    if pc is None:
+        return None
+
+    return _get_or_create_async(
+        f"pinecone_index:{settings.PINECONE_HOST}",
+        lambda: pc.IndexAsyncio(host=settings.PINECONE_HOST),
+    )
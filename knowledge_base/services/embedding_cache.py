@@ -0,0 +1,207 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+from django.conf import settings
+
+from ..utils import pack_float32, unpack_float32
+
+
+class EmbeddingCache:
+    """
+    임베딩 벡터 로컬 캐시(SQLite 파일)
+
+    - key: (model, dim, 정규화 텍스트 SHA-256)
+    - value: float32 packed blob(1024차원 = 4KB)
+    - LRU: 조회/저장 시 last_used를 갱신하고, max_entries 초과분을 오래된 순으로 삭제합니다.
+    - hit/miss 카운터는 stats 테이블에 누적되어 프로세스 간에 공유됩니다.
+    - 현재 항목 수도 stats("entries")에 저장/삭제할 때마다 갱신합니다(저장마다 COUNT(*)로 전체를 훑지 않음).
+
+    주의:
+        - 웹 프로세스/kb_worker가 같은 파일을 함께 쓰므로 WAL 모드로 엽니다.
+        - 커넥션은 프로세스(pid)별로 만들고, 스레드 간에는 lock으로 직렬화합니다.
+    """
+
+    def __init__(self, path: str, max_entries: int):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid = None
+
+    def _connect(self) -> sqlite3.Connection:
+        # fork된 자식 프로세스는 부모 커넥션을 쓰지 않고 새로 엽니다.
+        if self._conn is not None and self._pid == os.getpid():
+            return self._conn
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " model TEXT NOT NULL,"
+            " dim INTEGER NOT NULL,"
+            " text_hash TEXT NOT NULL,"
+            " vector BLOB NOT NULL,"
+            " last_used REAL NOT NULL,"
+            " PRIMARY KEY (model, dim, text_hash))"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_embeddings_last_used ON embeddings (last_used)")
+        conn.execute("CREATE TABLE IF NOT EXISTS stats (key TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        # 항목 수 카운터가 없는 캐시 파일(이전 버전)은 한 번만 세어 둡니다.
+        conn.execute("INSERT OR IGNORE INTO stats (key, value) SELECT 'entries', COUNT(*) FROM embeddings")
+
+        self._conn = conn
+        self._pid = os.getpid()
+        return conn
+
+    def _bump(self, conn: sqlite3.Connection, key: str, n: int) -> None:
+        if n == 0:
+            return
+        conn.execute(
+            "INSERT INTO stats (key, value) VALUES (?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = value + excluded.value",
+            (key, n),
+        )
+
+    def get_many(self, model: str, dim: int, hashes: Iterable[str]) -> Dict[str, List[float]]:
+        """
+        캐시에 있는 벡터를 {text_hash: vector}로 반환하고 hit/miss를 기록합니다.
+        """
+        keys = list(dict.fromkeys(hashes))
+        if not keys:
+            return {}
+
+        out: Dict[str, List[float]] = {}
+
+        with self._lock:
+            conn = self._connect()
+
+            start = 0
+            while start < len(keys):
+                part = keys[start : start + 500]
+                marks = ",".join(["?"] * len(part))
+                rows = conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND dim = ? AND text_hash IN ({marks})",
+                    [model, dim, *part],
+                ).fetchall()
+
+                for h, blob in rows:
+                    out[h] = unpack_float32(blob)
+
+                if rows:
+                    hit_marks = ",".join(["?"] * len(rows))
+                    conn.execute(
+                        f"UPDATE embeddings SET last_used = ? WHERE model = ? AND dim = ? AND text_hash IN ({hit_marks})",
+                        [time.time(), model, dim, *[r[0] for r in rows]],
+                    )
+
+                start = start + 500
+
+            self._bump(conn, "hits", len(out))
+            self._bump(conn, "misses", len(keys) - len(out))
+
+        return out
+
+    def put_many(self, model: str, dim: int, vectors: Dict[str, List[float]]) -> None:
+        """
+        {text_hash: vector}를 저장하고, 최대 개수를 넘으면 LRU로 정리합니다.
+        """
+        if not vectors:
+            return
+
+        now = time.time()
+        rows = [(model, dim, h, pack_float32(v), now) for h, v in vectors.items()]
+
+        with self._lock:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # 새로 추가되는 항목 수(이미 있는 키는 덮어쓰기라 항목 수가 늘지 않음, PK 조회)
+                keys = list(vectors.keys())
+                existing = 0
+                start = 0
+                while start < len(keys):
+                    part = keys[start : start + 500]
+                    marks = ",".join(["?"] * len(part))
+                    existing = existing + conn.execute(
+                        f"SELECT COUNT(*) FROM embeddings WHERE model = ? AND dim = ? AND text_hash IN ({marks})",
+                        [model, dim, *part],
+                    ).fetchone()[0]
+                    start = start + 500
+
+                conn.executemany(
+                    "INSERT OR REPLACE INTO embeddings (model, dim, text_hash, vector, last_used) VALUES (?, ?, ?, ?, ?)",
+                    rows,
+                )
+                self._bump(conn, "entries", len(rows) - existing)
+
+                count = conn.execute("SELECT value FROM stats WHERE key = 'entries'").fetchone()[0]
+                if count > self.max_entries:
+                    # 매번 1건씩 지우지 않도록 10% 여유를 두고 정리합니다.
+                    overflow = count - int(self.max_entries * 0.9)
+                    deleted = conn.execute(
+                        "DELETE FROM embeddings WHERE rowid IN "
+                        "(SELECT rowid FROM embeddings ORDER BY last_used ASC LIMIT ?)",
+                        (overflow,),
+                    ).rowcount
+                    self._bump(conn, "evictions", deleted)
+                    self._bump(conn, "entries", -deleted)
+
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def stats(self) -> Dict[str, int]:
+        """
+        누적 hit/miss/eviction 카운터와 현재 항목 수를 반환합니다.
+        """
+        with self._lock:
+            conn = self._connect()
+            out = {"hits": 0, "misses": 0, "evictions": 0, "entries": 0}
+            for key, value in conn.execute("SELECT key, value FROM stats").fetchall():
+                out[key] = int(value)
+
+        lookups = out["hits"] + out["misses"]
+        out["hit_rate"] = round(out["hits"] / lookups, 4) if lookups else 0.0
+        return out
+
+    def clear(self) -> None:
+        """
+        캐시 항목과 카운터를 모두 삭제합니다.
+        """
+        with self._lock:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DELETE FROM embeddings")
+            conn.execute("DELETE FROM stats")
+            conn.execute("INSERT INTO stats (key, value) VALUES ('entries', 0)")
+            conn.execute("COMMIT")
+
+
+_cache: Optional[EmbeddingCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    """
+    프로세스 공용 EmbeddingCache를 반환합니다(KB_EMBEDDING_CACHE_PATH가 비어 있으면 None).
+    """
+    global _cache
+
+    path = str(settings.KB_EMBEDDING_CACHE_PATH or "")
+    if not path:
+        return None
+
+    with _cache_lock:
+        if _cache is None or _cache.path != path:
+            _cache = EmbeddingCache(path=path, max_entries=settings.KB_EMBEDDING_CACHE_MAX_ENTRIES)
+
+    return _cache
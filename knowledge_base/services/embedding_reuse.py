@@ -0,0 +1,129 @@
+import logging
+from typing import Dict, List, Tuple
+
+from ..models import KBChunk
+from ..utils import text_sha256
+
+logger = logging.getLogger(__name__)
+
+
+def embed_chunks_with_reuse(
+    batch: List[KBChunk],
+    embedder,
+    pinecone,
+    namespace: str,
+    owner_id: int,
+    model: str,
+    dim: int,
+) -> Tuple[List[List[float]], int, int]:
+    """
+    청크 배치의 임베딩을 만들되, 이미 있는 벡터는 재사용하고 같은 텍스트는 한 번만 임베딩합니다.
+
+    재사용 순서:
+        0) 청크 자신이 보관 중인 벡터(embedding_vector, 현재 model/dim과 일치할 때)
+           → namespace 초기화 후 재업서트(force=1)도 재임베딩 없이 처리됩니다.
+        1) 같은 namespace(user)에서 이미 현재 model/dim으로 인덱싱된 동일 텍스트 청크
+           → DB 보관 벡터를 우선 사용하고, 없으면 Pinecone fetch로 가져옵니다(OpenAI 호출 없음).
+        2) 배치 안의 중복 텍스트 → 대표 1개만 임베딩합니다.
+
+    Returns:
+        Tuple[List[List[float]], int, int]:
+            (batch 순서와 같은 벡터 목록, 새로 임베딩한 텍스트 수, 재사용한 청크 수)
+    """
+    hashes: List[str] = []
+    for ch in batch:
+        hashes.append(ch.text_hash or text_sha256(ch.chunk_text))
+
+    vec_by_hash: Dict[str, List[float]] = {}
+
+    # 0) 청크 자신이 보관한 벡터
+    own_vectors: Dict[int, List[float]] = {}
+    for ch in batch:
+        vec = ch.get_embedding(model, dim)
+        if vec is not None:
+            own_vectors[ch.id] = vec
+
+    # 1) 이미 인덱싱된 동일 텍스트 청크(donor)의 벡터 재사용
+    need_hashes = set()
+    i = 0
+    while i < len(batch):
+        if batch[i].id not in own_vectors:
+            need_hashes.add(hashes[i])
+        i = i + 1
+
+    donors = []
+    if need_hashes:
+        donors = (
+            KBChunk.objects.filter(
+                document__owner_id=owner_id,
+                text_hash__in=need_hashes,
+                indexed_at__isnull=False,
+                embedding_model=model,
+                embedding_dim=dim,
+                pinecone_id__isnull=False,
+            )
+            .exclude(pinecone_id="")
+            .exclude(id__in=[ch.id for ch in batch])
+            .only("id", "text_hash", "pinecone_id", "embedding_model", "embedding_dim", "embedding_vector")
+        )
+
+    donor_by_hash: Dict[str, str] = {}
+    for donor in donors:
+        h = donor.text_hash
+        if h in vec_by_hash:
+            continue
+
+        vec = donor.get_embedding(model, dim)
+        if vec is not None:
+            vec_by_hash[h] = vec
+            donor_by_hash.pop(h, None)
+        elif h not in donor_by_hash:
+            donor_by_hash[h] = donor.pinecone_id
+
+    if donor_by_hash:
+        try:
+            fetched = pinecone.fetch_vectors(namespace=namespace, ids=list(donor_by_hash.values()))
+        except Exception:
+            # 재사용은 최적화일 뿐이므로 실패하면 임베딩으로 진행합니다.
+            logger.warning("pinecone fetch for embedding reuse failed", exc_info=True)
+            fetched = {}
+
+        for h, pid in donor_by_hash.items():
+            values = fetched.get(pid)
+            if values is not None and len(values) == dim:
+                vec_by_hash[h] = values
+
+    # 2) 남은 텍스트는 hash 기준으로 중복 제거 후 임베딩
+    embed_hashes: List[str] = []
+    embed_texts: List[str] = []
+    i = 0
+    while i < len(batch):
+        h = hashes[i]
+        if batch[i].id in own_vectors:
+            i = i + 1
+            continue
+        if h not in vec_by_hash and h not in embed_hashes:
+            embed_hashes.append(h)
+            embed_texts.append(batch[i].chunk_text)
+        i = i + 1
+
+    if embed_texts:
+        new_vectors = embedder.embed_texts(embed_texts)
+        j = 0
+        while j < len(embed_hashes):
+            vec_by_hash[embed_hashes[j]] = new_vectors[j]
+            j = j + 1
+
+    vectors: List[List[float]] = []
+    i = 0
+    while i < len(batch):
+        own = own_vectors.get(batch[i].id)
+        if own is not None:
+            vectors.append(own)
+        else:
+            vectors.append(vec_by_hash[hashes[i]])
+        i = i + 1
+
+    reused_count = len(batch) - len(embed_texts)
+
+    return vectors, len(embed_texts), reused_count
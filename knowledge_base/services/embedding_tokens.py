@@ -0,0 +1,143 @@
+import math
+import threading
+from typing import List, Optional
+
+# tiktoken은 선택 의존성입니다(없으면 문자 종류 기반 추정치를 사용).
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+# text-embedding-3-* 모델의 토크나이저
+EMBEDDING_ENCODING = "cl100k_base"
+
+_encoding = None
+_encoding_lock = threading.Lock()
+
+
+def get_encoding():
+    """
+    tiktoken 인코딩을 반환합니다(미설치/로드 실패 시 None).
+
+    - 인코딩 로드는 BPE 파일을 읽으므로 프로세스당 1회만 수행합니다.
+    """
+    global _encoding
+
+    if tiktoken is None:
+        return None
+
+    with _encoding_lock:
+        if _encoding is None:
+            try:
+                _encoding = tiktoken.get_encoding(EMBEDDING_ENCODING)
+            except Exception:
+                # 오프라인 환경에서 BPE 파일을 받지 못하면 추정치로 대체
+                _encoding = False
+
+    return _encoding or None
+
+
+def _char_tokens(ch: str) -> float:
+    """
+    tiktoken이 없을 때 쓰는 문자별 토큰 추정치
+
+    - ASCII: 영문 평균 약 4자/토큰 → 0.25
+    - 그 외(한글/한자 등): cl100k에서 글자당 1토큰 이상인 경우가 많아 보수적으로 1.0
+    """
+    if ord(ch) < 128:
+        return 0.25
+    return 1.0
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    텍스트의 토큰 수를 계산(tiktoken) 또는 추정합니다.
+    """
+    if not text:
+        return 0
+
+    enc = get_encoding()
+    if enc is not None:
+        return len(enc.encode(text, disallowed_special=()))
+
+    ascii_count = 0
+    for ch in text:
+        if ord(ch) < 128:
+            ascii_count = ascii_count + 1
+
+    return int(math.ceil(ascii_count / 4)) + (len(text) - ascii_count)
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """
+    텍스트를 max_tokens 이하가 되도록 앞에서부터 자릅니다.
+    """
+    if not text or max_tokens <= 0:
+        return ""
+
+    enc = get_encoding()
+    if enc is not None:
+        tokens = enc.encode(text, disallowed_special=())
+        if len(tokens) <= max_tokens:
+            return text
+        # 잘린 위치의 불완전한 멀티바이트 문자는 decode에서 대체 문자로 바뀌므로 제거
+        return enc.decode(tokens[:max_tokens]).rstrip("�")
+
+    used = 0.0
+    i = 0
+    while i < len(text):
+        cost = _char_tokens(text[i])
+        if math.ceil(used + cost) > max_tokens:
+            break
+        used = used + cost
+        i = i + 1
+
+    return text[:i]
+
+
+def pack_token_batches(
+    token_counts: List[int],
+    max_request_tokens: int,
+    max_inputs: int,
+    max_input_tokens: Optional[int] = None,
+) -> List[List[int]]:
+    """
+    입력별 토큰 수를 보고 요청 단위(입력 인덱스 목록)로 묶습니다.
+
+    - 순서를 유지한 채 앞에서부터 채우고(greedy), 토큰 합계나 입력 개수 한도를
+      넘기 직전에 다음 요청으로 넘깁니다.
+    - 입력 하나가 max_input_tokens를 넘는 경우는 호출 측에서 미리 잘라야 합니다.
+
+    Parameters:
+        token_counts (List[int]): 입력별 토큰 수
+        max_request_tokens (int): 요청 1회의 토큰 합계 한도
+        max_inputs (int): 요청 1회의 입력 개수 한도
+        max_input_tokens (int | None): 입력 1개 한도(검증용)
+
+    Returns:
+        List[List[int]]: 요청별 입력 인덱스
+    """
+    batches: List[List[int]] = []
+    current: List[int] = []
+    current_tokens = 0
+
+    i = 0
+    while i < len(token_counts):
+        n = token_counts[i]
+
+        if max_input_tokens is not None and n > max_input_tokens:
+            raise ValueError(f"input {i} has {n} tokens (limit={max_input_tokens})")
+
+        if current and (current_tokens + n > max_request_tokens or len(current) >= max_inputs):
+            batches.append(current)
+            current = []
+            current_tokens = 0
+
+        current.append(i)
+        current_tokens = current_tokens + n
+        i = i + 1
+
+    if current:
+        batches.append(current)
+
+    return batches
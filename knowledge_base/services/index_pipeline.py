@@ -0,0 +1,378 @@
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Tuple
+
+from django.db import connections, transaction
+from django.db.models import Q, QuerySet
+
+from ..models import KBChunk
+from ..utils import truncate_utf8
+from .embedding_reuse import embed_chunks_with_reuse
+from .retrieval_cache import bump_project_version
+
+# 파이프라인 종료 표식
+_DONE = object()
+
+
+def pending_chunks_queryset(
+    project_id: int,
+    owner_id: int,
+    model: str,
+    dim: int,
+    force: bool = False,
+    indexed_before=None,
+) -> QuerySet:
+    """
+    인덱싱 대상 KBChunk queryset을 반환합니다.
+
+    필터(넓게 커버):
+        - pinecone_id is NULL / ""
+        - indexed_at is NULL
+        - embedding_model/dim is NULL 또는 현재 값과 다름
+
+    Parameters:
+        force (bool): True면 위 조건과 무관하게 전체 청크
+        indexed_before (datetime | None):
+            force와 함께 쓰면 이 시각 이전에 인덱싱된 청크만(재개용 체크포인트)
+    """
+    need_index_q = (
+        Q(pinecone_id__isnull=True)
+        | Q(pinecone_id__exact="")
+        | Q(indexed_at__isnull=True)
+        | Q(embedding_model__isnull=True)
+        | Q(embedding_dim__isnull=True)
+        | ~Q(embedding_model=model)
+        | ~Q(embedding_dim=dim)
+    )
+
+    base_qs = KBChunk.objects.filter(
+        document__project_id=project_id,
+        document__owner_id=owner_id,
+    )
+
+    if force:
+        if indexed_before is not None:
+            return base_qs.filter(need_index_q | Q(indexed_at__lt=indexed_before))
+        return base_qs
+
+    return base_qs.filter(need_index_q)
+
+
+class ProjectChunkIndexer:
+    """
+    KBChunk 임베딩 → Pinecone upsert → DB 갱신을 파이프라인으로 처리합니다.
+
+    구조:
+        [embed stage]  N개 스레드가 배치별로 임베딩(OpenAI)을 동시에 요청
+              │ upsert_q (bounded)
+        [upsert stage] 스레드 1개가 Pinecone upsert
+              │ commit_q (bounded)
+        [commit stage] 호출 스레드에서 DB 갱신(트랜잭션)
+
+    - 큐 크기를 제한해 앞 단계가 과도하게 앞서 나가지 않도록 합니다(backpressure).
+    - 처리량은 두 서비스 지연의 합이 아니라 가장 느린 단계에 맞춰집니다.
+    - 단계별 busy/wait 시간을 metrics로 기록합니다.
+    - store_text=True면 metadata에 chunk_text(UTF-8 text_max_bytes 이하)를 함께 저장합니다.
+        - busy: 실제 작업 시간
+        - wait: 큐가 비어서(입력 대기) 또는 가득 차서(출력 대기) 멈춘 시간
+    """
+
+    def __init__(
+        self,
+        owner_id: int,
+        project_id: int,
+        namespace: str,
+        embedder,
+        pinecone,
+        model: str,
+        dim: int,
+        embed_concurrency: int = 4,
+        queue_size: int = 4,
+        store_text: bool = False,
+        text_max_bytes: int = 30000,
+    ):
+        self.owner_id = owner_id
+        self.project_id = project_id
+        self.namespace = namespace
+        self.embedder = embedder
+        self.pinecone = pinecone
+        self.model = model
+        self.dim = dim
+        self.embed_concurrency = max(1, embed_concurrency)
+        self.queue_size = max(1, queue_size)
+        self.store_text = store_text
+        self.text_max_bytes = text_max_bytes
+
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._errors: List[BaseException] = []
+        self.metrics: Dict[str, Dict[str, float]] = {}
+
+    def build_upsert_items(
+        self,
+        batch: List[KBChunk],
+        vectors: List[List[float]],
+    ) -> List[Tuple[str, List[float], Dict[str, Any]]]:
+        """
+        Pinecone upsert items((id, values, metadata))를 구성합니다.
+        """
+        upsert_items = []
+        i = 0
+        while i < len(batch):
+            ch = batch[i]
+            vec = vectors[i]
+
+            # 이미 pinecone_id가 있으면 재사용(불완전 인덱싱 복구에 유리)
+            chosen_id = None
+            if ch.pinecone_id is not None:
+                pid = str(ch.pinecone_id).strip()
+                if pid != "":
+                    chosen_id = pid
+
+            if chosen_id is None:
+                # deterministic id: user/project/document/chunk 기반
+                chosen_id = f"u{self.owner_id}-p{self.project_id}-d{ch.document_id}-c{ch.chunk_index}"
+
+            doc = ch.document
+
+            meta = {
+                "user_id": int(self.owner_id),
+                "project_id": int(self.project_id),
+                "document_id": int(doc.id),
+                "chunk_index": int(ch.chunk_index),
+                "kb_chunk_id": int(ch.id),
+                "importance": int(ch.importance),
+            }
+
+            if doc.title:
+                meta["doc_title"] = str(doc.title)
+
+            if doc.source_type:
+                meta["source_type"] = str(doc.source_type)
+
+            # tags는 list[str] 형태로 보장
+            if doc.tags:
+                if isinstance(doc.tags, list):
+                    meta["tags"] = [str(x) for x in doc.tags]
+                else:
+                    meta["tags"] = [str(doc.tags)]
+
+            # 검색 시 DB 조회 없이 컨텍스트를 만들 수 있도록 본문 저장(선택)
+            if self.store_text:
+                text, truncated = truncate_utf8(ch.chunk_text, self.text_max_bytes)
+                meta["chunk_text"] = text
+                meta["text_truncated"] = truncated
+
+            upsert_items.append((chosen_id, vec, meta))
+            i = i + 1
+
+        return upsert_items
+
+    def commit_batch(
+        self,
+        batch: List[KBChunk],
+        vectors: List[List[float]],
+        upsert_items: List[Tuple[str, List[float], Dict[str, Any]]],
+    ) -> None:
+        """
+        upsert 완료된 배치를 DB에 기록합니다(트랜잭션).
+        """
+        with transaction.atomic():
+            j = 0
+            while j < len(batch):
+                ch = batch[j]
+                chosen_id = upsert_items[j][0]
+
+                ch.mark_indexed(
+                    pinecone_id=chosen_id,
+                    model=self.model,
+                    dim=self.dim,
+                    vector=vectors[j],
+                )
+                ch.save(
+                    update_fields=[
+                        "pinecone_id",
+                        "indexed_at",
+                        "embedding_model",
+                        "embedding_dim",
+                        "embedding_vector",
+                    ]
+                )
+                j = j + 1
+
+    def run(self, targets: List[KBChunk], batch_size: int) -> Dict[str, Any]:
+        """
+        targets를 batch_size 단위로 파이프라인 처리합니다.
+
+        Returns:
+            Dict[str, Any]: indexed_count, embedded_count, reused_count, metrics
+        """
+        batches: List[List[KBChunk]] = []
+        start = 0
+        while start < len(targets):
+            batches.append(targets[start : start + batch_size])
+            start = start + batch_size
+
+        # 같은 indexer로 run()을 반복 호출할 수 있도록 상태 초기화
+        self._stop.clear()
+        self._errors = []
+
+        self.metrics = {
+            "embed": {"busy_sec": 0.0, "wait_sec": 0.0, "batches": 0},
+            "upsert": {"busy_sec": 0.0, "wait_sec": 0.0, "batches": 0},
+            "commit": {"busy_sec": 0.0, "wait_sec": 0.0, "batches": 0},
+        }
+
+        upsert_q: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        commit_q: queue.Queue = queue.Queue(maxsize=self.queue_size)
+
+        totals = {"indexed_count": 0, "embedded_count": 0, "reused_count": 0}
+
+        t_start = time.perf_counter()
+
+        embed_thread = threading.Thread(
+            target=self._embed_stage,
+            args=(batches, upsert_q),
+            name="kb-index-embed",
+            daemon=True,
+        )
+        upsert_thread = threading.Thread(
+            target=self._upsert_stage,
+            args=(upsert_q, commit_q),
+            name="kb-index-upsert",
+            daemon=True,
+        )
+        embed_thread.start()
+        upsert_thread.start()
+
+        # commit stage(호출 스레드: 요청 트랜잭션/커넥션을 그대로 사용)
+        while True:
+            item = self._get(commit_q, "commit")
+            if item is _DONE:
+                break
+            if self._stop.is_set():
+                continue
+
+            batch, vectors, upsert_items, embedded, reused = item
+
+            t0 = time.perf_counter()
+            try:
+                self.commit_batch(batch, vectors, upsert_items)
+            except BaseException as e:
+                self._fail(e)
+                continue
+            self._add("commit", "busy_sec", time.perf_counter() - t0)
+            self._add("commit", "batches", 1)
+
+            totals["indexed_count"] = totals["indexed_count"] + len(batch)
+            totals["embedded_count"] = totals["embedded_count"] + embedded
+            totals["reused_count"] = totals["reused_count"] + reused
+
+        embed_thread.join()
+        upsert_thread.join()
+
+        # 커밋된 배치가 있으면(중간 실패 포함) 프로젝트 검색 캐시 무효화
+        if totals["indexed_count"] > 0:
+            bump_project_version(self.project_id)
+
+        if self._errors:
+            raise self._errors[0]
+
+        for stage in self.metrics.values():
+            stage["busy_sec"] = round(stage["busy_sec"], 4)
+            stage["wait_sec"] = round(stage["wait_sec"], 4)
+
+        totals["metrics"] = dict(
+            self.metrics,
+            total_sec=round(time.perf_counter() - t_start, 4),
+            embed_concurrency=self.embed_concurrency,
+        )
+        return totals
+
+    # ---- stages ----
+
+    def _embed_stage(self, batches: List[List[KBChunk]], upsert_q: queue.Queue) -> None:
+        try:
+            with ThreadPoolExecutor(max_workers=self.embed_concurrency, thread_name_prefix="kb-embed") as pool:
+                list(pool.map(lambda b: self._embed_one(b, upsert_q), batches))
+        finally:
+            upsert_q.put(_DONE)
+
+    def _embed_one(self, batch: List[KBChunk], upsert_q: queue.Queue) -> None:
+        if self._stop.is_set():
+            return
+
+        try:
+            t0 = time.perf_counter()
+            vectors, embedded, reused = embed_chunks_with_reuse(
+                batch,
+                embedder=self.embedder,
+                pinecone=self.pinecone,
+                namespace=self.namespace,
+                owner_id=self.owner_id,
+                model=self.model,
+                dim=self.dim,
+            )
+            upsert_items = self.build_upsert_items(batch, vectors)
+            self._add("embed", "busy_sec", time.perf_counter() - t0)
+            self._add("embed", "batches", 1)
+
+            self._put(upsert_q, (batch, vectors, upsert_items, embedded, reused), "embed")
+        except BaseException as e:
+            self._fail(e)
+        finally:
+            # 워커 스레드에서 열린 DB 커넥션 정리(스레드별 커넥션)
+            connections.close_all()
+
+    def _upsert_stage(self, upsert_q: queue.Queue, commit_q: queue.Queue) -> None:
+        try:
+            while True:
+                item = self._get(upsert_q, "upsert")
+                if item is _DONE:
+                    break
+                if self._stop.is_set():
+                    continue
+
+                upsert_items = item[2]
+
+                t0 = time.perf_counter()
+                try:
+                    self.pinecone.upsert_vectors(namespace=self.namespace, vectors=upsert_items)
+                except BaseException as e:
+                    self._fail(e)
+                    continue
+                self._add("upsert", "busy_sec", time.perf_counter() - t0)
+                self._add("upsert", "batches", 1)
+
+                self._put(commit_q, item, "upsert")
+        finally:
+            commit_q.put(_DONE)
+
+    # ---- helpers ----
+
+    def _get(self, q: queue.Queue, stage: str):
+        t0 = time.perf_counter()
+        item = q.get()
+        self._add(stage, "wait_sec", time.perf_counter() - t0)
+        return item
+
+    def _put(self, q: queue.Queue, item, stage: str) -> None:
+        t0 = time.perf_counter()
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                break
+            except queue.Full:
+                continue
+        self._add(stage, "wait_sec", time.perf_counter() - t0)
+
+    def _add(self, stage: str, key: str, value: float) -> None:
+        with self._lock:
+            self.metrics[stage][key] = self.metrics[stage][key] + value
+
+    def _fail(self, error: BaseException) -> None:
+        with self._lock:
+            self._errors.append(error)
+        self._stop.set()
@@ -0,0 +1,280 @@
+import logging
+import os
+import tempfile
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from ..models import KBDocument, KBJob
+from ..utils import get_extractor, iter_chunks_with_context, iter_units
+from .chunk_writer import bulk_save_chunks, iter_chunk_objects
+from .lexical_index import write_document_segment
+from .retrieval_cache import bump_project_version
+
+logger = logging.getLogger(__name__)
+
+
+# 원문 임시 버퍼를 메모리에 두는 최대 크기(넘으면 임시 파일로 옮김)
+_TEXT_SPOOL_BYTES = 1024 * 1024
+
+
+class IngestError(Exception):
+    """
+    사용자에게 그대로 노출해도 되는 ingest 실패 사유(예: no_text_extracted)
+    """
+
+
+def set_job_stage(job: KBJob, stage: str, total: int = 0) -> None:
+    """
+    job의 stage를 전환하고 진행률을 초기화합니다.
+    """
+    job.stage = stage
+    job.progress_done = 0
+    job.progress_total = total
+    job.save(update_fields=["stage", "progress_done", "progress_total"])
+
+
+def run_ingest_job(job: KBJob) -> None:
+    """
+    업로드된 임시 파일을 추출 → 청킹 → KBDocument/KBChunk 저장까지 스트리밍으로 처리합니다.
+
+    트랜잭션:
+        - 문서 행을 먼저 만들고, 청크는 bulk_create 배치마다 따로 커밋합니다.
+          (SQLite는 첫 INSERT부터 커밋까지 쓰기 잠금을 잡으므로, CPU를 쓰는 추출/청킹 전체를
+          하나의 트랜잭션으로 감싸면 다른 worker/웹 요청의 쓰기가 "database is locked"로 실패합니다.)
+        - 실패하면 만들던 문서를 지웁니다(청크는 cascade).
+        - 원문과 content_hash는 마지막 짧은 트랜잭션에서 채웁니다
+          (처리 중인 문서가 중복 업로드 결과로 반환되지 않도록).
+
+    진행률:
+        - 단위는 청크입니다. stage=chunk 동안 progress_done은 저장된 청크 수(배치마다 UPDATE 1회)이고,
+          전체 청크 수는 스트리밍이 끝나야 알 수 있어 progress_total은 0입니다.
+        - 완료 시 progress_done = progress_total = 생성된 청크 수
+
+    Parameters:
+        job (KBJob):
+            status=running으로 선점된 ingest job
+            params 예: {"file_path": "...", "ext": ".pdf", "title": "...",
+                        "importance": 3, "tags": [...], "original_filename": "...",
+                        "file_size": 123}
+
+    Returns:
+        None: 성공 시 job.document를 채웁니다. 실패 시 예외를 올립니다.
+    """
+    params = job.params or {}
+    file_path = params.get("file_path", "")
+    ext = params.get("ext", "")
+    importance = int(params.get("importance", 3))
+    tags = params.get("tags", [])
+    content_hash = params.get("content_hash", "")
+
+    # 대기 중에 같은 파일이 먼저 처리되었으면 기존 문서를 결과로 사용합니다.
+    if content_hash:
+        existing_doc = (
+            KBDocument.objects.filter(
+                project_id=job.project_id,
+                owner_id=job.owner_id,
+                content_hash=content_hash,
+            )
+            .order_by("id")
+            .first()
+        )
+        if existing_doc is not None:
+            if file_path and os.path.exists(file_path):
+                os.remove(file_path)
+
+            job.document = existing_doc
+            job.stage = "done"
+            job.params = dict(
+                params,
+                chunks_created=0,
+                duplicate=True,
+                ignored_fields=ignored_metadata_fields(
+                    params, params.get("submitted_fields", []), existing_doc
+                ),
+            )
+            job.save(update_fields=["document", "stage", "params"])
+            return
+
+    # 1) 추출 라인 스트림(파일은 chunk 저장이 끝날 때까지 열려 있어야 함)
+    set_job_stage(job, "extract")
+
+    extractor = get_extractor(ext)
+    if extractor is None:
+        if file_path and os.path.exists(file_path):
+            os.remove(file_path)
+        raise IngestError("invalid_extension")
+
+    source_type, iter_lines = extractor
+
+    # 문서 원문(extracted_text)은 임시 파일에 이어 쓰고 마지막 저장 때 한 번만 읽습니다.
+    # - 유닛 목록 + join으로 모으면 원문이 처리 내내 메모리에 남고 join 시점에 두 벌이 됩니다.
+    # - 작은 문서는 메모리에서 끝나고, _TEXT_SPOOL_BYTES를 넘으면 디스크로 옮겨집니다.
+    spool = tempfile.SpooledTemporaryFile(max_size=_TEXT_SPOOL_BYTES, mode="w+", encoding="utf-8")
+    unit_count = 0
+
+    def collect(units):
+        nonlocal unit_count
+        for u in units:
+            if unit_count > 0:
+                spool.write("\n")
+            spool.write(u)
+            unit_count = unit_count + 1
+            yield u
+
+    # 2) 문서 행 생성(autocommit) → 추출/유닛/청킹/bulk_create가 generator로 이어지고 배치마다 커밋
+    doc = KBDocument.objects.create(
+        owner_id=job.owner_id,
+        project_id=job.project_id,
+        title=params.get("title", "") or params.get("original_filename", ""),
+        source_type=source_type,
+        importance=importance,
+        tags=tags,
+        original_filename=params.get("original_filename", ""),
+        file_size=int(params.get("file_size", 0)),
+    )
+
+    job.document = doc
+    job.save(update_fields=["document"])
+    set_job_stage(job, "chunk")
+
+    try:
+        lines = iter_lines(file_path)
+        chunks = iter_chunks_with_context(collect(iter_units(lines)), window=1, max_chars=1200)
+
+        def report(saved: int) -> None:
+            KBJob.objects.filter(id=job.id).update(progress_done=saved)
+
+        created_count = bulk_save_chunks(
+            iter_chunk_objects(doc, chunks, importance=importance, tags=tags),
+            on_batch=report,
+        )
+
+        if unit_count == 0:
+            raise IngestError("no_text_extracted")
+
+        spool.seek(0)
+        extracted_text = spool.read()
+        spool.close()
+
+        # 3) 마지막 커밋(짧은 트랜잭션): 원문 + content_hash + job 완료 표시
+        with transaction.atomic():
+            doc.extracted_text = extracted_text
+            doc.content_hash = content_hash
+            doc.save(update_fields=["extracted_text", "content_hash"])
+
+            job.stage = "done"
+            job.progress_done = created_count
+            job.progress_total = created_count
+            job.params = dict(params, chunks_created=created_count)
+            job.save(update_fields=["stage", "progress_done", "progress_total", "params"])
+    except BaseException:
+        # 배치별로 커밋된 청크가 남지 않도록 문서째 정리(정리 실패가 원래 오류를 가리지 않도록)
+        job.document = None
+        try:
+            doc.delete()
+        except Exception:
+            logger.exception("failed to clean up partial document %s", doc.id)
+        raise
+    finally:
+        spool.close()
+
+        # 원문 보관/다운로드는 보류 → 임시 파일 삭제
+        if file_path and os.path.exists(file_path):
+            os.remove(file_path)
+
+    # 키워드 검색 역색인에 문서 segment 추가(실패해도 문서는 벡터 검색으로 찾을 수 있음)
+    if settings.KB_HYBRID_SEARCH:
+        try:
+            write_document_segment(doc.id)
+        except Exception:
+            logger.warning("lexical segment write failed for document %s", doc.id, exc_info=True)
+
+    # 프로젝트 청크가 바뀌었으므로 검색 캐시 무효화
+    bump_project_version(doc.project_id)
+
+
+def ignored_metadata_fields(submitted: dict, fields: list, existing) -> list:
+    """
+    중복 업로드에서 반영되지 않은 메타데이터 필드 이름을 구합니다.
+
+    Parameters:
+        submitted (dict): 이번 업로드의 {"title", "importance", "tags"} 값
+        fields (list): 사용자가 실제로 입력한 필드 이름(입력하지 않은 기본값은 제외)
+        existing (KBDocument | dict): 기존 문서 또는 처리 중인 job의 params
+
+    Returns:
+        list: 기존 값과 달라 무시된 필드 이름 목록
+    """
+    out = []
+    for name in fields:
+        if isinstance(existing, dict):
+            current = existing.get(name)
+        else:
+            current = getattr(existing, name, None)
+
+        if submitted.get(name) != current:
+            out.append(name)
+    return out
+
+
+def job_status_payload(job: KBJob) -> dict:
+    """
+    상태 API 응답(dict)을 구성합니다.
+
+    index 진행률은 job 자체가 아니라 생성된 문서의 청크 중
+    indexed_at이 채워진 비율로 계산합니다(인덱싱은 별도 API에서 수행).
+    """
+    payload = {
+        "id": job.id,
+        "job_type": job.job_type,
+        "status": job.status,
+        "stage": job.stage,
+        "progress": {
+            "done": job.progress_done,
+            "total": job.progress_total,
+        },
+        "error": job.error,
+        "created_at": job.created_at.isoformat(),
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+        "document": None,
+    }
+
+    if job.document_id:
+        doc = job.document
+        total = doc.chunks.count()
+        indexed = doc.chunks.filter(indexed_at__isnull=False).count()
+
+        payload["document"] = {
+            "id": doc.id,
+            "title": doc.title,
+            "source_type": doc.source_type,
+            "importance": doc.importance,
+            "tags": doc.tags,
+            "file_size": doc.file_size,
+        }
+        payload["chunks_created"] = (job.params or {}).get("chunks_created", total)
+        payload["duplicate"] = bool((job.params or {}).get("duplicate", False))
+        payload["ignored_fields"] = (job.params or {}).get("ignored_fields", [])
+        payload["index"] = {
+            "done": indexed,
+            "total": total,
+        }
+
+    if job.job_type == "reindex":
+        payload["embedded_count"] = int((job.params or {}).get("embedded_count", 0))
+        payload["reused_count"] = int((job.params or {}).get("reused_count", 0))
+
+    return payload
+
+
+def mark_job_finished(job: KBJob, error: str = "") -> None:
+    """
+    job 종료 상태를 기록합니다.
+    """
+    job.status = "failed" if error else "succeeded"
+    job.error = error
+    job.finished_at = timezone.now()
+    job.save(update_fields=["status", "error", "finished_at"])
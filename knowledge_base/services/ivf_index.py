@@ -0,0 +1,278 @@
+import math
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from django.conf import settings
+
+from .local_vector_index import (
+    LocalIndexer,
+    LocalRetriever,
+    LocalVectorStore,
+    _SEARCH_BLOCK_ROWS,
+    _unit_rows,
+)
+
+# IVF(Inverted File) 근사 검색 저장소
+#
+# - 벡터/로그/header는 LocalVectorStore와 같은 파일을 쓰고, 다음을 더합니다.
+#     ivf-<gen>.npz : centroids(nlist, dim) + trained_count
+#     로그 각 줄의 "c": 행이 속한 클러스터 번호
+# - 검색: 질문과 가까운 centroid nprobe개의 목록만 내적 → 전체 행렬을 훑지 않습니다.
+# - 학습 전(행 수 < KB_IVF_MIN_TRAIN_ROWS)에는 정확 검색을 그대로 사용합니다.
+# - 새 행은 upsert 시 가장 가까운 centroid에 바로 배정(증분 삽입)하고,
+#   행 수가 학습 당시의 KB_IVF_RETRAIN_GROWTH배를 넘으면 다시 학습합니다(목록 불균형 방지).
+
+_KMEANS_ITERATIONS = 10
+_KMEANS_SAMPLE_PER_LIST = 64
+
+
+def default_nlist(n: int) -> int:
+    """
+    목록 수 기본값(sqrt(n), 최소 8 / 최대 4096)
+    """
+    if settings.KB_IVF_NLIST > 0:
+        return settings.KB_IVF_NLIST
+    return max(8, min(4096, int(math.sqrt(max(n, 1)))))
+
+
+def _nearest(mat: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """
+    각 행과 내적이 가장 큰 centroid 번호(블록 단위 계산)
+    """
+    out = np.empty(mat.shape[0], dtype=np.int32)
+    start = 0
+    while start < mat.shape[0]:
+        end = min(start + _SEARCH_BLOCK_ROWS, mat.shape[0])
+        out[start:end] = np.argmax(np.asarray(mat[start:end]) @ centroids.T, axis=1)
+        start = end
+    return out
+
+
+def train_centroids(sample: np.ndarray, nlist: int, seed: int = 0) -> np.ndarray:
+    """
+    단위 벡터 sample로 spherical k-means centroid를 학습합니다.
+    """
+    rng = np.random.default_rng(seed)
+    nlist = min(nlist, sample.shape[0])
+
+    centroids = sample[rng.choice(sample.shape[0], size=nlist, replace=False)].copy()
+
+    it = 0
+    while it < _KMEANS_ITERATIONS:
+        labels = _nearest(sample, centroids)
+
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, sample)
+        counts = np.bincount(labels, minlength=nlist)
+
+        # 빈 클러스터는 임의의 sample로 다시 시작
+        empty = np.flatnonzero(counts == 0)
+        if len(empty) > 0:
+            sums[empty] = sample[rng.choice(sample.shape[0], size=len(empty), replace=False)]
+
+        centroids = _unit_rows(sums, sample.shape[1])
+        it = it + 1
+
+    return centroids.astype(np.float32)
+
+
+class IVFVectorStore(LocalVectorStore):
+    """
+    LocalVectorStore + IVF 목록(증분 삽입/삭제, 근사 top-k)
+    """
+
+    def _reset_state(self) -> None:
+        super()._reset_state()
+        self._centroids: Optional[np.ndarray] = None
+        self._trained_count = 0
+        self._assign = np.zeros(0, dtype=np.int32)
+        self._lists: List[List[int]] = []
+        self._list_arrays: Dict[int, np.ndarray] = {}
+
+    def __init__(self, root: str, namespace: str, project_id: int, dim: int):
+        super().__init__(root, namespace, project_id, dim)
+        self._reset_state()
+
+    # ---- gen별 부가 파일 ----
+
+    def _ivf_path(self, gen: int) -> Path:
+        return self.dir / f"ivf-{gen}.npz"
+
+    def _write_gen_extras(self, gen: int) -> None:
+        if self._centroids is None:
+            return
+
+        tmp = self.dir / f"ivf-{gen}.tmp.npz"
+        np.savez(tmp, centroids=self._centroids, trained_count=np.int64(self._trained_count))
+        tmp.replace(self._ivf_path(gen))
+
+    def _load_gen_extras(self) -> None:
+        self._assign = np.full(self.capacity, -1, dtype=np.int32)
+
+        path = self._ivf_path(self.gen)
+        if not path.exists():
+            return
+
+        with np.load(path) as data:
+            self._centroids = data["centroids"].astype(np.float32)
+            self._trained_count = int(data["trained_count"])
+        self._lists = [[] for _ in range(self._centroids.shape[0])]
+        self._list_arrays = {}
+
+    # ---- 로그 ----
+
+    def _apply_record(self, rec: Dict[str, Any]) -> None:
+        super()._apply_record(rec)
+
+        row = int(rec["r"])
+        c = int(rec.get("c", -1)) if rec.get("id") is not None else -1
+        self._assign[row] = c
+
+        # 목록에서는 지우지 않고, 검색 시 assign과 다른 행을 걸러냅니다(삭제/재배정).
+        if c >= 0 and self._centroids is not None:
+            self._lists[c].append(row)
+            self._list_arrays.pop(c, None)
+
+    def _upsert_lines(self, items, rows: List[int], rows_in: np.ndarray) -> List[Dict[str, Any]]:
+        lines = super()._upsert_lines(items, rows, rows_in)
+        if self._centroids is not None:
+            labels = _nearest(rows_in, self._centroids)
+            i = 0
+            while i < len(lines):
+                lines[i]["c"] = int(labels[i])
+                i = i + 1
+        return lines
+
+    def _state_line(self, row: int) -> Dict[str, Any]:
+        line = super()._state_line(row)
+        if self._assign[row] >= 0:
+            line["c"] = int(self._assign[row])
+        return line
+
+    # ---- 학습 ----
+
+    @property
+    def nlist(self) -> int:
+        return 0 if self._centroids is None else int(self._centroids.shape[0])
+
+    def alive_count(self) -> int:
+        return int(self._alive[: self.count].sum())
+
+    def needs_training(self) -> bool:
+        n = self.alive_count()
+        if self._centroids is None:
+            return n >= settings.KB_IVF_MIN_TRAIN_ROWS
+        return n >= self._trained_count * settings.KB_IVF_RETRAIN_GROWTH
+
+    def upsert(self, items) -> int:
+        upserted = super().upsert(items)
+
+        self.refresh()
+        if self.needs_training():
+            self.train(force=False)
+        return upserted
+
+    def train(self, nlist: Optional[int] = None, force: bool = True) -> None:
+        """
+        centroid를 (다시) 학습하고 모든 행을 배정한 새 gen을 만듭니다.
+
+        Parameters:
+            force (bool): False면 잠금을 잡은 뒤 다시 확인해 다른 프로세스가 이미 학습했으면 건너뜁니다.
+        """
+        with self._write_lock():
+            self.refresh()
+            if self._mat is None:
+                return
+            if not force and not self.needs_training():
+                return
+
+            alive_rows = np.flatnonzero(self._alive[: self.count])
+            if len(alive_rows) == 0:
+                return
+
+            nlist = nlist or default_nlist(len(alive_rows))
+
+            rng = np.random.default_rng(len(alive_rows))
+            sample_size = min(len(alive_rows), nlist * _KMEANS_SAMPLE_PER_LIST)
+            sample_rows = np.sort(rng.choice(alive_rows, size=sample_size, replace=False))
+            sample = np.asarray(self._mat[sample_rows])
+
+            centroids = train_centroids(sample, nlist)
+
+            # 새 gen의 로그(_state_line)에 쓰일 배정 결과
+            self._assign[:] = -1
+            self._assign[alive_rows] = _nearest(self._mat[: self.count], centroids)[alive_rows]
+            self._centroids = centroids
+            self._trained_count = len(alive_rows)
+
+            self._rewrite(self.capacity)
+
+    # ---- 조회 ----
+
+    def _list_rows(self, c: int) -> np.ndarray:
+        arr = self._list_arrays.get(c)
+        if arr is None:
+            arr = np.asarray(self._lists[c], dtype=np.int64)
+            self._list_arrays[c] = arr
+        return arr
+
+    def search(
+        self,
+        vector: List[float],
+        top_k: int,
+        include_metadata: bool = True,
+        nprobe: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        가까운 목록 nprobe개(기본 KB_IVF_NPROBE)만 검색합니다(학습 전에는 정확 검색).
+        """
+        self.refresh()
+        with self._lock:
+            centroids = self._centroids
+            if centroids is None:
+                return super().search(vector, top_k, include_metadata)
+
+            q = _unit_rows([vector], self.dim)[0]
+            nprobe = min(int(nprobe or settings.KB_IVF_NPROBE), centroids.shape[0])
+
+            cs = centroids @ q
+            probe = np.argpartition(-cs, nprobe - 1)[:nprobe]
+
+            parts = []
+            labels = []
+            for c in probe:
+                rows = self._list_rows(int(c))
+                parts.append(rows)
+                labels.append(np.full(len(rows), c, dtype=np.int32))
+
+            mat = self._mat
+            alive = self._alive
+            assign = self._assign
+            ids = self._ids
+            metas = self._meta
+
+        if not parts or top_k <= 0:
+            return []
+
+        rows = np.concatenate(parts)
+        valid = alive[rows] & (assign[rows] == np.concatenate(labels))
+        rows = np.unique(rows[valid])
+        if len(rows) == 0:
+            return []
+
+        scores = np.asarray(mat[rows]) @ q
+
+        k = min(int(top_k), len(rows))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+
+        return self._matches(rows[top], scores[top], ids, metas, include_metadata)
+
+
+class IVFRetriever(LocalRetriever):
+    store_class = IVFVectorStore
+
+
+class IVFIndexer(LocalIndexer):
+    store_class = IVFVectorStore
@@ -0,0 +1,294 @@
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from datetime import timedelta
+from typing import List, Optional
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from ..models import KBDocument, KBJob
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue_job(owner, project, job_type: str, params: dict) -> KBJob:
+    """
+    job을 queued 상태로 등록합니다(실행은 kb_worker가 담당).
+    """
+    return KBJob.objects.create(
+        owner=owner,
+        project=project,
+        job_type=job_type,
+        params=params,
+    )
+
+
+async def aenqueue_job(owner, project, job_type: str, params: dict) -> KBJob:
+    """
+    enqueue_job의 async 버전(등록 로직은 enqueue_job 한 곳에만 둡니다)
+    """
+    return await sync_to_async(enqueue_job)(owner=owner, project=project, job_type=job_type, params=params)
+
+
+def start_job(owner, project, job_type: str, params: dict) -> KBJob:
+    """
+    job을 바로 running 상태로 등록합니다(관리 명령의 포그라운드 실행).
+
+    - queued를 거치지 않으므로 kb_worker가 같은 job을 선점하지 않습니다.
+    """
+    now = timezone.now()
+    return KBJob.objects.create(
+        owner=owner,
+        project=project,
+        job_type=job_type,
+        params=params,
+        status="running",
+        started_at=now,
+        heartbeat_at=now,
+    )
+
+
+@contextmanager
+def keep_alive(job_id: int):
+    """
+    블록이 끝날 때까지 별도 스레드에서 KB_JOB_HEARTBEAT_SECONDS마다 heartbeat를 갱신합니다.
+
+    - kb_worker 밖에서 도는 job(관리 명령)이 backoff 대기나 느린 라운드 중에도
+      임대 만료로 회수되지 않도록 합니다.
+    """
+    from django.db import connections
+
+    stop = threading.Event()
+
+    def beat():
+        try:
+            while not stop.wait(settings.KB_JOB_HEARTBEAT_SECONDS):
+                try:
+                    touch_jobs([job_id])
+                except Exception:
+                    logger.warning("kb job %s heartbeat failed", job_id, exc_info=True)
+        finally:
+            connections.close_all()
+
+    thread = threading.Thread(target=beat, name=f"kb-job-{job_id}-heartbeat", daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def claim_next_job() -> Optional[KBJob]:
+    """
+    가장 오래된 queued job 1건을 running으로 선점합니다.
+
+    주의:
+        - 여러 worker가 동시에 돌 수 있으므로 status=queued 조건부 UPDATE로 선점합니다.
+        - UPDATE 결과가 0이면 다른 worker가 먼저 가져간 것이므로 None을 반환합니다.
+    """
+    with transaction.atomic():
+        job = KBJob.objects.filter(status="queued").order_by("id").first()
+        if job is None:
+            return None
+
+        now = timezone.now()
+        updated = KBJob.objects.filter(id=job.id, status="queued").update(
+            status="running",
+            started_at=now,
+            heartbeat_at=now,
+        )
+
+    if updated == 0:
+        return None
+
+    job.refresh_from_db()
+    return job
+
+
+def touch_jobs(job_ids: List[int]) -> None:
+    """
+    kb_worker가 실행 중인 job의 heartbeat를 갱신합니다(UPDATE 1회).
+    """
+    if job_ids:
+        KBJob.objects.filter(id__in=job_ids, status="running").update(heartbeat_at=timezone.now())
+
+
+def expired_running_jobs():
+    """
+    heartbeat가 임대 시간(KB_JOB_LEASE_SECONDS) 넘게 멈춘 running job
+
+    - heartbeat가 없는 job(필드 추가 전에 시작된 job)은 started_at으로 판단합니다.
+    """
+    cutoff = timezone.now() - timedelta(seconds=settings.KB_JOB_LEASE_SECONDS)
+    return KBJob.objects.filter(status="running").filter(
+        Q(heartbeat_at__lt=cutoff) | Q(heartbeat_at__isnull=True, started_at__lt=cutoff)
+    )
+
+
+def active_jobs():
+    """
+    queued job + 임대가 살아 있는 running job(이미 도는 job이 있는지 확인할 때 사용)
+    """
+    return KBJob.objects.filter(status__in=["queued", "running"]).exclude(
+        id__in=expired_running_jobs().values("id")
+    )
+
+
+def abandon_job(job: KBJob, error: str) -> bool:
+    """
+    worker가 끝내지 못한 running job을 정리합니다.
+
+    - reindex: queued로 되돌립니다(indexed_at 체크포인트부터 다시 이어서 처리).
+    - ingest: failed로 기록하고 만들던 문서(배치별로 커밋된 청크)와 임시 파일을 지웁니다.
+      마지막 커밋까지 끝난 job(stage=done)은 succeeded로 기록합니다.
+    - 상태/heartbeat가 그대로일 때만 바꾸는 조건부 UPDATE라, 그 사이 heartbeat가 갱신되면 건드리지 않습니다.
+
+    Returns:
+        bool: 이 호출이 job을 정리했으면 True
+    """
+    current = KBJob.objects.filter(id=job.id, status="running", heartbeat_at=job.heartbeat_at)
+
+    if job.job_type == "reindex":
+        updated = current.update(status="queued", stage="queued", started_at=None, heartbeat_at=None)
+        return updated == 1
+
+    if job.stage == "done":
+        updated = current.update(status="succeeded", finished_at=timezone.now())
+        return updated == 1
+
+    updated = current.update(status="failed", error=error, finished_at=timezone.now())
+    if updated == 0:
+        return False
+
+    if job.job_type == "ingest":
+        if job.document_id:
+            KBDocument.objects.filter(id=job.document_id).delete()
+
+        file_path = (job.params or {}).get("file_path", "")
+        if file_path and os.path.exists(file_path):
+            os.remove(file_path)
+
+    return True
+
+
+def requeue_job(job_id: int, count_attempt: bool = True, isolate: bool = False) -> str:
+    """
+    kb_worker 프로세스 풀이 깨져 중단된 running job을 queued로 되돌립니다.
+
+    - 풀이 깨지면 어느 자식이 죽었는지 알 수 없고 같은 풀의 다른 job도 함께 중단되므로,
+      실패 처리하지 않고 다시 실행하게 합니다.
+    - ingest: 만들던 문서(배치별로 커밋된 청크)는 지우고 진행률을 초기화합니다(임시 파일은 유지).
+    - 같은 job이 KB_JOB_MAX_REQUEUES번 넘게 중단되면 그 job이 원인으로 보고 abandon_job으로 정리합니다.
+
+    Parameters:
+        count_attempt (bool): False면 재시도 횟수에 넣지 않습니다
+                              (여러 job이 함께 중단되었거나 submit 자체가 실패한 경우).
+        isolate (bool): True면 params["isolate"]를 남겨 kb_worker가 다음에 이 job만 단독으로 실행합니다
+                        (단독 실행 중 중단되면 원인이 분명하므로 그때 횟수를 셉니다).
+
+    Returns:
+        str: 바뀐 상태(queued/failed/succeeded), 이미 끝난 job이면 빈 문자열
+    """
+    job = KBJob.objects.filter(id=job_id, status="running").first()
+    if job is None:
+        return ""
+
+    params = dict(job.params or {})
+    if count_attempt:
+        params["requeues"] = int(params.get("requeues", 0)) + 1
+    if isolate:
+        params["isolate"] = True
+
+    if job.stage == "done" or int(params.get("requeues", 0)) > settings.KB_JOB_MAX_REQUEUES:
+        abandon_job(job, error="worker_crashed")
+        job.refresh_from_db()
+        return job.status
+
+    fields = {
+        "status": "queued",
+        "stage": "queued",
+        "started_at": None,
+        "heartbeat_at": None,
+        "params": params,
+    }
+    if job.job_type == "ingest":
+        fields.update(document=None, progress_done=0, progress_total=0)
+
+    current = KBJob.objects.filter(id=job.id, status="running", heartbeat_at=job.heartbeat_at)
+    if current.update(**fields) == 0:
+        return ""
+
+    if job.job_type == "ingest" and job.document_id:
+        KBDocument.objects.filter(id=job.document_id).delete()
+
+    return "queued"
+
+
+def reclaim_expired_jobs() -> int:
+    """
+    임대 시간이 지난 running job을 회수합니다(kb_worker 시작 시 + heartbeat 주기마다).
+
+    Returns:
+        int: 정리한 job 수
+    """
+    count = 0
+    for job in expired_running_jobs().order_by("id"):
+        if abandon_job(job, error="worker_lost"):
+            logger.warning("kb job %s (%s) lease expired; reclaimed", job.id, job.job_type)
+            count = count + 1
+    return count
+
+
+def init_worker_process() -> None:
+    """
+    ProcessPoolExecutor 자식 프로세스 초기화
+
+    - spawn 방식일 때를 대비해 Django를 세팅합니다.
+    - fork 방식이면 부모의 DB 커넥션을 물려받으므로 닫고 새로 엽니다.
+    """
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+
+    import django
+    django.setup()
+
+    from django.db import connections
+    connections.close_all()
+
+
+def run_job(job_id: int) -> str:
+    """
+    worker 프로세스에서 job 1건을 실행합니다.
+
+    Returns:
+        str: 최종 status(succeeded/failed)
+    """
+    from django.db import connections
+
+    from .ingest import IngestError, mark_job_finished, run_ingest_job
+    from .reindex import run_reindex_job
+
+    job = KBJob.objects.get(id=job_id)
+
+    try:
+        if job.job_type == "ingest":
+            run_ingest_job(job)
+        elif job.job_type == "reindex":
+            run_reindex_job(job)
+        else:
+            raise IngestError(f"unknown_job_type:{job.job_type}")
+        mark_job_finished(job)
+    except IngestError as e:
+        mark_job_finished(job, error=str(e))
+    except Exception as e:
+        logger.exception("kb job %s failed", job_id)
+        mark_job_finished(job, error=f"{type(e).__name__}: {e}")
+    finally:
+        connections.close_all()
+
+    return job.status
@@ -0,0 +1,318 @@
+import heapq
+import json
+import logging
+import math
+import os
+import re
+import threading
+import unicodedata
+from collections import Counter, OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.conf import settings
+
+from ..models import KBChunk, KBDocument
+
+logger = logging.getLogger(__name__)
+
+# 프로젝트별 BM25 역색인(KBChunk.chunk_text)
+#
+# - 토큰: 단어(공백/문장부호 기준) 안의 문자 2-gram
+#   한국어는 조사/어미가 붙어도("직급코드는", "직급코드를") 2-gram이 대부분 겹치고,
+#   직급 코드·규정 번호 같은 영문/숫자 표기도 그대로 매칭됩니다.
+# - 파일: KB_LEXICAL_INDEX_DIR/<project_id>/doc-<document_id>.json(문서 1개 = segment 1개)
+#   업로드 처리(ingest) 후 문서 segment만 쓰고, 문서 삭제 시 파일만 지웁니다(증분 유지).
+# - 프로세스는 segment 목록(mtime/size)을 비교해 바뀐 파일만 postings에 더하고 뺍니다.
+# - 프로세스당 최근 사용한 프로젝트 KB_LEXICAL_MAX_PROJECTS개만 메모리에 유지합니다(LRU).
+
+_WORD_RE = re.compile(r"\w+")
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    문자 2-gram 토큰 목록(1글자 단어는 그대로)
+
+    - NFKC 정규화 + casefold로 전각/반각, 대소문자 차이를 없앱니다.
+    """
+    s = unicodedata.normalize("NFKC", str(text or "")).casefold()
+
+    tokens = []
+    for word in _WORD_RE.findall(s):
+        if len(word) == 1:
+            tokens.append(word)
+            continue
+
+        i = 0
+        while i < len(word) - 1:
+            tokens.append(word[i : i + 2])
+            i = i + 1
+    return tokens
+
+
+def project_dir(project_id: int) -> Path:
+    return Path(settings.KB_LEXICAL_INDEX_DIR) / str(int(project_id))
+
+
+def _segment_path(project_id: int, document_id: int) -> Path:
+    return project_dir(project_id) / f"doc-{int(document_id)}.json"
+
+
+def write_document_segment(document_id: int) -> int:
+    """
+    문서의 청크를 토큰화해 segment 파일로 씁니다(같은 문서면 덮어씀).
+
+    Returns:
+        int: segment에 담긴 청크 수(문서가 없으면 0)
+    """
+    doc = KBDocument.objects.filter(id=document_id).values("project_id", "importance").first()
+    if doc is None:
+        return 0
+
+    chunks = []
+    rows = (
+        KBChunk.objects.filter(document_id=document_id)
+        .order_by("chunk_index")
+        .values_list("id", "chunk_index", "importance", "chunk_text")
+    )
+    for chunk_id, chunk_index, importance, text in rows.iterator():
+        tokens = tokenize(text)
+        chunks.append([chunk_id, chunk_index, importance, len(tokens), dict(Counter(tokens))])
+
+    path = _segment_path(doc["project_id"], document_id)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    # 다른 프로세스가 반쯤 쓴 파일을 읽지 않도록 임시 파일 → replace
+    tmp = path.with_name(path.name + f".{os.getpid()}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"document_id": int(document_id), "chunks": chunks}, f, ensure_ascii=False)
+    tmp.replace(path)
+
+    return len(chunks)
+
+
+def delete_document_segment(project_id: int, document_id: int) -> None:
+    try:
+        _segment_path(project_id, document_id).unlink()
+    except FileNotFoundError:
+        pass
+
+
+def rebuild_project(project_id: int) -> Tuple[int, int]:
+    """
+    프로젝트의 모든 문서 segment를 다시 쓰고, DB에 없는 문서의 segment는 지웁니다.
+
+    Returns:
+        Tuple[int, int]: (문서 수, 청크 수)
+    """
+    doc_ids = list(KBDocument.objects.filter(project_id=project_id).values_list("id", flat=True))
+
+    chunk_count = 0
+    for doc_id in doc_ids:
+        chunk_count = chunk_count + write_document_segment(doc_id)
+
+    keep = set(f"doc-{doc_id}.json" for doc_id in doc_ids)
+    d = project_dir(project_id)
+    if d.exists():
+        for path in d.glob("doc-*.json"):
+            if path.name not in keep:
+                path.unlink()
+
+    return len(doc_ids), chunk_count
+
+
+class LexicalIndex:
+    """
+    프로젝트 1개의 메모리 역색인(segment 파일에서 증분 로드)
+    """
+
+    def __init__(self, project_id: int):
+        self.project_id = int(project_id)
+        self.dir = project_dir(project_id)
+
+        self._lock = threading.Lock()
+        self._stamps: Dict[str, Tuple[int, int]] = {}
+        # segment → (청크 id 목록, segment에 나온 term 목록)
+        # 청크별 term 목록은 두지 않습니다(postings와 중복). 빼낼 때는 segment term × 청크 id로 지웁니다.
+        self._segments: Dict[str, Tuple[List[int], List[str]]] = {}
+
+        # term → {chunk_id: tf}
+        self._postings: Dict[str, Dict[int, int]] = {}
+        # chunk_id → (문서 토큰 수, document_id, chunk_index, importance)
+        self._chunks: Dict[int, Tuple[int, int, int, int]] = {}
+        self._total_len = 0
+
+    def _scan(self) -> Dict[str, Tuple[int, int]]:
+        stamps = {}
+        try:
+            with os.scandir(self.dir) as it:
+                for entry in it:
+                    if entry.name.startswith("doc-") and entry.name.endswith(".json"):
+                        st = entry.stat()
+                        stamps[entry.name] = (st.st_mtime_ns, st.st_size)
+        except FileNotFoundError:
+            pass
+        return stamps
+
+    def _remove_segment(self, name: str) -> None:
+        chunk_ids, terms = self._segments.pop(name, ([], []))
+
+        for chunk_id in chunk_ids:
+            info = self._chunks.pop(chunk_id, None)
+            if info is not None:
+                self._total_len = self._total_len - info[0]
+
+        for term in terms:
+            posting = self._postings.get(term)
+            if posting is None:
+                continue
+            for chunk_id in chunk_ids:
+                posting.pop(chunk_id, None)
+            if not posting:
+                del self._postings[term]
+
+    def _add_segment(self, name: str) -> bool:
+        try:
+            with open(self.dir / name, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return False
+        except ValueError:
+            logger.warning("lexical segment %s/%s is unreadable; skipped", self.dir, name)
+            return True
+
+        document_id = int(data.get("document_id", 0))
+        chunk_ids = []
+        terms = {}
+        for chunk_id, chunk_index, importance, length, tf in data.get("chunks", []):
+            self._chunks[chunk_id] = (length, document_id, chunk_index, importance)
+            self._total_len = self._total_len + length
+            chunk_ids.append(chunk_id)
+
+            for term, count in tf.items():
+                posting = self._postings.get(term)
+                if posting is None:
+                    posting = {}
+                    self._postings[term] = posting
+                posting[chunk_id] = count
+                terms[term] = None
+
+        self._segments[name] = (chunk_ids, list(terms))
+        return True
+
+    def refresh(self) -> None:
+        """
+        바뀐 segment만 다시 반영합니다(추가/덮어쓰기/삭제).
+        """
+        stamps = self._scan()
+
+        with self._lock:
+            if stamps == self._stamps:
+                return
+
+            for name in list(self._stamps.keys()):
+                if stamps.get(name) != self._stamps[name]:
+                    self._remove_segment(name)
+                    del self._stamps[name]
+
+            for name, stamp in stamps.items():
+                if name in self._stamps:
+                    continue
+                if self._add_segment(name):
+                    self._stamps[name] = stamp
+
+    def search(self, query: str, top_k: int) -> List[Tuple[int, float]]:
+        """
+        BM25 점수 상위 top_k 청크
+
+        Returns:
+            [(chunk_id, bm25_score), ...] 점수 내림차순
+        """
+        self.refresh()
+
+        terms = set(tokenize(query))
+        if not terms or top_k <= 0:
+            return []
+
+        with self._lock:
+            n = len(self._chunks)
+            if n == 0:
+                return []
+            avg_len = max(self._total_len / n, 1.0)
+
+            scores: Dict[int, float] = {}
+            for term in terms:
+                posting = self._postings.get(term)
+                if not posting:
+                    continue
+
+                df = len(posting)
+                idf = math.log(1.0 + (n - df + 0.5) / (df + 0.5))
+
+                for chunk_id, tf in posting.items():
+                    length = self._chunks[chunk_id][0]
+                    norm = BM25_K1 * (1.0 - BM25_B + BM25_B * length / avg_len)
+                    scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * tf * (BM25_K1 + 1.0) / (tf + norm)
+
+        return heapq.nlargest(int(top_k), scores.items(), key=lambda x: x[1])
+
+    def matches(self, query: str, top_k: int) -> List[Dict[str, Any]]:
+        """
+        search() 결과를 벡터 검색 match와 같은 형태로 반환합니다.
+
+        - id(벡터 id)는 없으므로 None이고, hydrate_matches()는 metadata.kb_chunk_id로 청크를 찾습니다.
+        """
+        out = []
+        for chunk_id, score in self.search(query, top_k):
+            info = self._chunks.get(chunk_id)
+            if info is None:
+                continue
+            out.append(
+                {
+                    "id": None,
+                    "score": score,
+                    "metadata": {
+                        "kb_chunk_id": chunk_id,
+                        "document_id": info[1],
+                        "chunk_index": info[2],
+                        "importance": info[3],
+                    },
+                }
+            )
+        return out
+
+
+_indexes: "OrderedDict[int, LexicalIndex]" = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+def get_lexical_index(project_id: int) -> LexicalIndex:
+    """
+    프로세스 공용 프로젝트 역색인(첫 조회 시 segment 전체 로드)
+
+    - 최근 사용한 KB_LEXICAL_MAX_PROJECTS개만 유지하고, 가장 오래 안 쓴 프로젝트부터 내보냅니다
+      (다시 조회하면 segment 파일에서 새로 로드).
+    """
+    project_id = int(project_id)
+    with _indexes_lock:
+        index = _indexes.get(project_id)
+        if index is None:
+            index = LexicalIndex(project_id)
+            _indexes[project_id] = index
+        _indexes.move_to_end(project_id)
+
+        while len(_indexes) > max(1, settings.KB_LEXICAL_MAX_PROJECTS):
+            _indexes.popitem(last=False)
+    return index
+
+
+def lexical_search(project_id: int, query: str, top_k: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    프로젝트 BM25 검색(ORM을 쓰지 않으므로 fan-out 스레드에서 실행 가능)
+    """
+    if top_k is None:
+        top_k = settings.KB_LEXICAL_TOP_K
+    return get_lexical_index(project_id).matches(query, top_k)
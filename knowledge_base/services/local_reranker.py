@@ -0,0 +1,128 @@
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from django.conf import settings
+
+from ..models import KBChunk
+from .lexical_index import tokenize
+
+
+class LocalReranker:
+    """
+    로컬 rerank(CPU, 외부 호출 없음)
+
+    - 점수 = (1 - w) * 코사인(질문 임베딩, 청크 임베딩) + w * 질문 2-gram 포함 비율
+      (w = KB_LOCAL_RERANK_LEXICAL_WEIGHT)
+    - 청크 임베딩은 인덱싱 때 KBChunk.embedding_vector에 보관한 값을 사용합니다(재임베딩 없음).
+      벡터가 없는 청크(미인덱싱)는 다른 후보의 평균 코사인을 대신 씁니다.
+    - 반환 형식은 PineconeHostedReranker.rerank와 같습니다.
+    """
+
+    def __init__(self, lexical_weight: Optional[float] = None):
+        if lexical_weight is None:
+            lexical_weight = settings.KB_LOCAL_RERANK_LEXICAL_WEIGHT
+        self.lexical_weight = min(1.0, max(0.0, float(lexical_weight)))
+
+    def rerank(
+        self,
+        query: str,
+        documents: List[Dict[str, Any]],
+        top_n: int = 5,
+        query_vec: Optional[List[float]] = None,
+        vectors: Optional[Dict[str, np.ndarray]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Parameters:
+            documents: [{"id": "...", "text": "..."}, ...]
+            query_vec: 질문 임베딩(없으면 글자 겹침만 사용)
+            vectors: {document id: 청크 임베딩} (load_chunk_vectors 결과)
+
+        Returns:
+            [{"id": "...", "score": float}, ...] 점수 내림차순 top_n개
+        """
+        if not documents:
+            return []
+
+        lexical = self._lexical_scores(query, documents)
+        cosine = self._cosine_scores(query_vec, documents, vectors or {})
+
+        w = self.lexical_weight
+        if cosine is None:
+            w = 1.0
+            cosine = np.zeros(len(documents), dtype=np.float32)
+
+        scores = (1.0 - w) * cosine + w * lexical
+        order = np.argsort(-scores, kind="stable")[: max(0, int(top_n))]
+
+        out = []
+        for i in order:
+            out.append({"id": documents[i]["id"], "score": float(scores[i])})
+        return out
+
+    def _lexical_scores(self, query: str, documents: List[Dict[str, Any]]) -> np.ndarray:
+        q = set(tokenize(query))
+        scores = np.zeros(len(documents), dtype=np.float32)
+        if not q:
+            return scores
+
+        i = 0
+        while i < len(documents):
+            d = set(tokenize(documents[i].get("text", "")))
+            scores[i] = len(q & d) / len(q)
+            i = i + 1
+        return scores
+
+    def _cosine_scores(self, query_vec, documents, vectors) -> Optional[np.ndarray]:
+        if query_vec is None:
+            return None
+
+        q = np.asarray(query_vec, dtype=np.float32)
+        q_norm = float(np.linalg.norm(q))
+        if q_norm == 0.0:
+            return None
+        q = q / q_norm
+
+        scores = np.full(len(documents), np.nan, dtype=np.float32)
+        i = 0
+        while i < len(documents):
+            v = vectors.get(str(documents[i]["id"]))
+            if v is not None and v.shape[0] == q.shape[0]:
+                norm = float(np.linalg.norm(v))
+                if norm > 0.0:
+                    scores[i] = float(v @ q) / norm
+            i = i + 1
+
+        known = ~np.isnan(scores)
+        if not known.any():
+            return None
+        scores[~known] = float(scores[known].mean())
+        return scores
+
+
+def _vectors_qs(chunk_ids: List[int]):
+    return KBChunk.objects.filter(
+        id__in=chunk_ids,
+        embedding_model=settings.OPENAI_EMBEDDING_MODEL,
+        embedding_dim=settings.OPENAI_EMBEDDING_DIM,
+        embedding_vector__isnull=False,
+    ).values_list("id", "embedding_vector")
+
+
+def load_chunk_vectors(chunk_ids: List[int]) -> Dict[str, np.ndarray]:
+    """
+    보관된 청크 임베딩(현재 모델/차원)을 {str(kb_chunk_id): vector}로 가져옵니다(쿼리 1회).
+    """
+    out = {}
+    for chunk_id, blob in _vectors_qs(chunk_ids):
+        out[str(chunk_id)] = np.frombuffer(bytes(blob), dtype="<f4")
+    return out
+
+
+async def aload_chunk_vectors(chunk_ids: List[int]) -> Dict[str, np.ndarray]:
+    """
+    load_chunk_vectors의 async 버전
+    """
+    out = {}
+    async for chunk_id, blob in _vectors_qs(chunk_ids):
+        out[str(chunk_id)] = np.frombuffer(bytes(blob), dtype="<f4")
+    return out
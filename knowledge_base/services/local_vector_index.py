@@ -0,0 +1,545 @@
+import json
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from django.conf import settings
+
+try:
+    import fcntl
+except ImportError:  # Windows: 프로세스 간 잠금 없이 단일 프로세스 기준으로 동작
+    fcntl = None
+
+# 로컬 벡터 저장소(Pinecone 대체 백엔드)
+#
+# 디렉터리: KB_LOCAL_INDEX_DIR/<namespace>/<project_id>/
+#   - header.json          : {"dim", "gen", "count", "capacity", "log_bytes"} (작은 파일, 원자적 교체)
+#   - vectors-<gen>.npy    : float32 (capacity, dim) 행렬, L2 정규화된 행 → 내적 = 코사인 유사도
+#   - meta-<gen>.jsonl     : 행 변경 로그 {"r": row, "id": vector_id | null, "m": metadata}
+#                            (마지막 줄이 우선, id가 null이면 삭제된 행)
+#
+# - 검색 프로세스는 행렬을 읽기 전용 memmap으로 열고, header가 바뀌면 로그의 새 부분만 읽어 반영합니다.
+# - 쓰기(kb_worker/인덱싱 요청)는 파일 잠금으로 직렬화하고,
+#   벡터를 먼저 쓰고 로그를 추가한 뒤 header를 교체하므로 읽는 쪽은 항상 완성된 행만 봅니다.
+# - 용량이 차면 2배 크기의 새 gen 파일로 복사하면서 로그도 현재 상태로 압축합니다.
+
+_INITIAL_CAPACITY = 1024
+# 한 번에 내적할 행 수(임시 메모리 상한: 65536 x 1024 x 4B = 256MB memmap 페이지 단위 접근)
+_SEARCH_BLOCK_ROWS = 65536
+
+
+def _unit_rows(values: Iterable[Iterable[float]], dim: int) -> np.ndarray:
+    mat = np.asarray(list(values), dtype=np.float32).reshape(-1, dim)
+    norms = np.linalg.norm(mat, axis=1, keepdims=True)
+    norms[norms == 0.0] = 1.0
+    return mat / norms
+
+
+class LocalVectorStore:
+    """
+    (namespace, project) 단위 로컬 벡터 저장소
+
+    - 같은 프로세스에서는 get_local_store()로 인스턴스를 공유합니다(memmap/id 맵 재사용).
+    """
+
+    def __init__(self, root: str, namespace: str, project_id: int, dim: int):
+        self.dir = Path(root) / str(namespace) / str(int(project_id))
+        self.dim = int(dim)
+
+        self._lock = threading.RLock()
+        self._stamp: Optional[Tuple[int, int, int, int]] = None
+
+        self.gen = 0
+        self.count = 0
+        self.capacity = 0
+        self._offset = 0
+        self._mat: Optional[np.ndarray] = None
+        self._ids: List[Optional[str]] = []
+        self._meta: List[Optional[Dict[str, Any]]] = []
+        self._pos: Dict[str, int] = {}
+        self._alive = np.zeros(0, dtype=bool)
+
+    # ---- 파일 ----
+
+    @property
+    def _header_path(self) -> Path:
+        return self.dir / "header.json"
+
+    def _vectors_path(self, gen: int) -> Path:
+        return self.dir / f"vectors-{gen}.npy"
+
+    def _log_path(self, gen: int) -> Path:
+        return self.dir / f"meta-{gen}.jsonl"
+
+    @contextmanager
+    def _write_lock(self):
+        self.dir.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+
+            with open(self.dir / ".lock", "a") as fp:
+                fcntl.flock(fp, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(fp, fcntl.LOCK_UN)
+
+    def _write_header(self, log_bytes: int) -> None:
+        header = {
+            "dim": self.dim,
+            "gen": self.gen,
+            "count": self.count,
+            "capacity": self.capacity,
+            "log_bytes": log_bytes,
+        }
+        tmp = self.dir / "header.json.tmp"
+        with open(tmp, "w", encoding="utf-8") as fp:
+            json.dump(header, fp)
+        os.replace(tmp, self._header_path)
+
+    # ---- 읽기 상태 동기화 ----
+
+    def refresh(self) -> None:
+        """
+        header가 바뀌었으면 새 상태를 반영합니다(같은 gen이면 로그의 추가분만 읽음).
+
+        - header는 100바이트 남짓이라 매 조회마다 읽어 비교합니다
+          (파일 mtime은 해상도가 거칠어 연속 쓰기를 놓칠 수 있음).
+        """
+        with self._lock:
+            try:
+                with open(self._header_path, "r", encoding="utf-8") as fp:
+                    header = json.load(fp)
+            except FileNotFoundError:
+                return
+
+            stamp = (int(header["dim"]), int(header["gen"]), int(header["count"]), int(header["log_bytes"]))
+            if stamp == self._stamp:
+                return
+
+            if int(header["dim"]) != self.dim:
+                # 임베딩 차원이 바뀐 저장소는 사용하지 않습니다(재인덱싱하면 새로 만들어짐).
+                self._reset_state()
+                self._stamp = stamp
+                return
+
+            if int(header["gen"]) != self.gen or self._mat is None:
+                self._reset_state()
+                self.gen = int(header["gen"])
+                self.capacity = int(header["capacity"])
+                self._alive = np.zeros(self.capacity, dtype=bool)
+                self._ids = [None] * self.capacity
+                self._meta = [None] * self.capacity
+                self._mat = np.load(self._vectors_path(self.gen), mmap_mode="r")
+                self._load_gen_extras()
+
+            self._read_log(int(header["log_bytes"]))
+            self.count = int(header["count"])
+            self._stamp = stamp
+
+    def _reset_state(self) -> None:
+        self.gen = 0
+        self.count = 0
+        self.capacity = 0
+        self._offset = 0
+        self._mat = None
+        self._ids = []
+        self._meta = []
+        self._pos = {}
+        self._alive = np.zeros(0, dtype=bool)
+
+    def _read_log(self, log_bytes: int) -> None:
+        if log_bytes <= self._offset:
+            return
+
+        with open(self._log_path(self.gen), "rb") as fp:
+            fp.seek(self._offset)
+            data = fp.read(log_bytes - self._offset)
+
+        for line in data.splitlines():
+            if line.strip():
+                self._apply_record(json.loads(line))
+
+        self._offset = log_bytes
+
+    def _apply_record(self, rec: Dict[str, Any]) -> None:
+        self._apply(int(rec["r"]), rec.get("id"), rec.get("m"))
+
+    def _apply(self, row: int, vector_id: Optional[str], meta: Optional[Dict[str, Any]]) -> None:
+        old = self._ids[row]
+        if old is not None and self._pos.get(old) == row:
+            del self._pos[old]
+
+        self._ids[row] = vector_id
+        self._meta[row] = meta if vector_id is not None else None
+        self._alive[row] = vector_id is not None
+        if vector_id is not None:
+            self._pos[vector_id] = row
+
+    # ---- 쓰기 ----
+
+    def upsert(self, items: List[Tuple[str, List[float], Dict[str, Any]]]) -> int:
+        """
+        (id, values, metadata) 목록을 저장합니다(같은 id는 덮어쓰기).
+
+        Returns:
+            int: 저장한 벡터 수
+        """
+        if not items:
+            return 0
+
+        rows_in = _unit_rows((values for _, values, _ in items), self.dim)
+
+        with self._write_lock():
+            self.refresh()
+            if self._mat is None:
+                self._create(_INITIAL_CAPACITY)
+
+            # 행 배정: 기존 id → 같은 행, 새 id → 삭제된 빈 행 → 끝에 추가
+            free = np.flatnonzero(~self._alive[: self.count]).tolist()
+            free.reverse()
+            rows: List[int] = []
+            new_count = self.count
+            pending: Dict[str, int] = {}
+            for vector_id, _, _ in items:
+                vector_id = str(vector_id)
+                row = self._pos.get(vector_id, pending.get(vector_id))
+                if row is None:
+                    if free:
+                        row = free.pop()
+                    else:
+                        row = new_count
+                        new_count = new_count + 1
+                    pending[vector_id] = row
+                rows.append(row)
+
+            if new_count > self.capacity:
+                capacity = self.capacity
+                while capacity < new_count:
+                    capacity = capacity * 2
+                self._rewrite(capacity)
+
+            mat = np.load(self._vectors_path(self.gen), mmap_mode="r+")
+            mat[np.asarray(rows)] = rows_in
+            mat.flush()
+            del mat
+
+            self.count = new_count
+            self._append_log(self._upsert_lines(items, rows, rows_in))
+
+        return len(items)
+
+    def _upsert_lines(self, items, rows: List[int], rows_in: np.ndarray) -> List[Dict[str, Any]]:
+        lines = []
+        i = 0
+        while i < len(items):
+            vector_id, _, meta = items[i]
+            lines.append({"r": rows[i], "id": str(vector_id), "m": meta})
+            i = i + 1
+        return lines
+
+    def _state_line(self, row: int) -> Dict[str, Any]:
+        return {"r": row, "id": self._ids[row], "m": self._meta[row]}
+
+    def delete(self, ids: Iterable[str]) -> int:
+        """
+        id 목록을 삭제합니다(행은 빈 행으로 표시되어 다음 upsert에서 재사용).
+
+        Returns:
+            int: 실제로 삭제된 벡터 수
+        """
+        with self._write_lock():
+            self.refresh()
+            if self._mat is None:
+                return 0
+
+            lines = []
+            for vector_id in ids:
+                row = self._pos.get(str(vector_id))
+                if row is not None:
+                    lines.append({"r": row, "id": None})
+
+            if lines:
+                self._append_log(lines)
+            return len(lines)
+
+    def _append_log(self, lines: List[Dict[str, Any]]) -> None:
+        payload = "".join(json.dumps(x, ensure_ascii=False) + "\n" for x in lines).encode("utf-8")
+
+        # 중단된 이전 쓰기가 header 이후에 남긴 바이트는 잘라내고 이어 씁니다.
+        with open(self._log_path(self.gen), "r+b") as fp:
+            fp.seek(self._offset)
+            fp.truncate()
+            fp.write(payload)
+            log_bytes = fp.tell()
+
+        self._write_header(log_bytes)
+        self.refresh()
+
+    def _create(self, capacity: int) -> None:
+        # 차원이 바뀐 이전 저장소 파일이 있으면 다음 gen으로 새로 만들고 이전 파일은 지웁니다.
+        old_files = [p for p in self.dir.iterdir() if "-" in p.stem and p.stem.rsplit("-", 1)[1].isdigit()]
+        gens = [int(p.stem.rsplit("-", 1)[1]) for p in old_files]
+
+        self.gen = max(gens, default=0) + 1
+        self.capacity = capacity
+        np.lib.format.open_memmap(
+            self._vectors_path(self.gen), mode="w+", dtype=np.float32, shape=(capacity, self.dim)
+        ).flush()
+        open(self._log_path(self.gen), "wb").close()
+
+        self._write_header(0)
+        self._stamp = None
+        self._mat = None
+        self.refresh()
+
+        for path in old_files:
+            path.unlink(missing_ok=True)
+
+    def _rewrite(self, capacity: int) -> None:
+        """
+        capacity 크기의 새 gen 파일로 행렬을 복사하고 로그를 현재 상태로 압축합니다(용량 확장/재구성).
+        """
+        old_gen = self.gen
+        new_gen = old_gen + 1
+
+        new_mat = np.lib.format.open_memmap(
+            self._vectors_path(new_gen), mode="w+", dtype=np.float32, shape=(capacity, self.dim)
+        )
+        start = 0
+        while start < self.count:
+            end = min(start + _SEARCH_BLOCK_ROWS, self.count)
+            new_mat[start:end] = self._mat[start:end]
+            start = end
+        new_mat.flush()
+        del new_mat
+
+        with open(self._log_path(new_gen), "wb") as fp:
+            for row in range(self.count):
+                if self._alive[row]:
+                    line = self._state_line(row)
+                    fp.write((json.dumps(line, ensure_ascii=False) + "\n").encode("utf-8"))
+            log_bytes = fp.tell()
+
+        self._write_gen_extras(new_gen)
+
+        self.gen = new_gen
+        self.capacity = capacity
+        self._write_header(log_bytes)
+
+        # 새 gen으로 다시 읽고 이전 파일 삭제(이미 열린 memmap은 unlink 후에도 유효)
+        self._stamp = None
+        self._mat = None
+        self.refresh()
+        for path in self._gen_files(old_gen):
+            path.unlink(missing_ok=True)
+
+    # ---- 하위 클래스 확장 지점(gen별 부가 파일) ----
+
+    def _gen_files(self, gen: int) -> List[Path]:
+        # 하위 클래스가 만든 부가 파일(예: ivf-<gen>.npz)까지 함께 정리
+        return [p for p in self.dir.iterdir() if p.stem.endswith(f"-{gen}")]
+
+    def _write_gen_extras(self, gen: int) -> None:
+        pass
+
+    def _load_gen_extras(self) -> None:
+        pass
+
+    # ---- 조회 ----
+
+    def fetch(self, ids: Iterable[str]) -> Dict[str, List[float]]:
+        """
+        id 목록의 (정규화된) 벡터를 반환합니다(없는 id는 제외).
+        """
+        self.refresh()
+        out: Dict[str, List[float]] = {}
+        if self._mat is None:
+            return out
+
+        for vector_id in ids:
+            row = self._pos.get(str(vector_id))
+            if row is not None:
+                out[str(vector_id)] = self._mat[row].tolist()
+        return out
+
+    def search(self, vector: List[float], top_k: int, include_metadata: bool = True) -> List[Dict[str, Any]]:
+        """
+        코사인 유사도 상위 top_k를 반환합니다(정확 검색).
+
+        - 행렬을 _SEARCH_BLOCK_ROWS 단위로 나눠 내적하고, argpartition으로 top_k만 정렬합니다.
+
+        Returns:
+            [{"id", "score", "metadata"}, ...]  (PineconeRetriever와 같은 형태)
+        """
+        self.refresh()
+        with self._lock:
+            mat = self._mat
+            count = self.count
+            alive = self._alive[:count]
+            ids = self._ids
+            metas = self._meta
+
+        if mat is None or count == 0 or top_k <= 0:
+            return []
+
+        q = _unit_rows([vector], self.dim)[0]
+
+        scores = np.empty(count, dtype=np.float32)
+        start = 0
+        while start < count:
+            end = min(start + _SEARCH_BLOCK_ROWS, count)
+            np.dot(mat[start:end], q, out=scores[start:end])
+            start = end
+        scores[~alive] = -np.inf
+
+        k = min(int(top_k), int(alive.sum()))
+        if k == 0:
+            return []
+
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+
+        return self._matches(top, scores[top], ids, metas, include_metadata)
+
+    def _matches(self, rows, scores, ids, metas, include_metadata: bool) -> List[Dict[str, Any]]:
+        matches = []
+        i = 0
+        while i < len(rows):
+            row = int(rows[i])
+            matches.append(
+                {
+                    "id": ids[row],
+                    "score": float(scores[i]),
+                    "metadata": (metas[row] or {}) if include_metadata else {},
+                }
+            )
+            i = i + 1
+        return matches
+
+
+_stores: Dict[Tuple[type, str, str, int], LocalVectorStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_local_store(namespace: str, project_id: int, store_class=LocalVectorStore) -> LocalVectorStore:
+    """
+    프로세스 공용 저장소 인스턴스를 반환합니다(KB_LOCAL_INDEX_DIR 기준).
+    """
+    key = (store_class, settings.KB_LOCAL_INDEX_DIR, str(namespace), int(project_id))
+
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = store_class(
+                settings.KB_LOCAL_INDEX_DIR,
+                namespace,
+                project_id,
+                settings.OPENAI_EMBEDDING_DIM,
+            )
+            _stores[key] = store
+
+    return store
+
+
+def namespace_project_ids(namespace: str) -> List[int]:
+    """
+    namespace 아래에 로컬 저장소가 있는 project_id 목록
+    """
+    root = Path(settings.KB_LOCAL_INDEX_DIR) / str(namespace)
+    if not root.is_dir():
+        return []
+
+    out = []
+    for child in root.iterdir():
+        if child.is_dir() and child.name.isdigit():
+            out.append(int(child.name))
+    return out
+
+
+def group_by_project(vectors: List[Tuple[str, List[float], Dict[str, Any]]]) -> Dict[int, list]:
+    """
+    upsert 목록을 metadata.project_id 기준으로 나눕니다(로컬 저장소는 프로젝트별 파일).
+    """
+    groups: Dict[int, list] = {}
+    for item in vectors:
+        meta = item[2] or {}
+        if "project_id" not in meta:
+            raise ValueError("로컬 벡터 저장소 upsert에는 metadata.project_id 가 필요합니다.")
+        groups.setdefault(int(meta["project_id"]), []).append(item)
+    return groups
+
+
+class LocalRetriever:
+    """
+    로컬 벡터 저장소 검색(PineconeRetriever와 같은 인터페이스)
+
+    - project_id 필터 대신 (namespace, project) 저장소를 직접 엽니다.
+    """
+
+    store_class = LocalVectorStore
+
+    def query(
+        self,
+        namespace: str,
+        vector: List[float],
+        project_id: int,
+        top_k: int,
+        include_metadata: bool = True,
+    ) -> List[Dict[str, Any]]:
+        return get_local_store(namespace, project_id, self.store_class).search(vector, top_k, include_metadata)
+
+    async def aquery(
+        self,
+        namespace: str,
+        vector: List[float],
+        project_id: int,
+        top_k: int,
+        include_metadata: bool = True,
+    ) -> List[Dict[str, Any]]:
+        # 네트워크 대기가 없고 메모리 내 연산이라 이벤트 루프에서 바로 실행합니다.
+        return self.query(namespace, vector, project_id, top_k, include_metadata)
+
+
+class LocalIndexer:
+    """
+    로컬 벡터 저장소 upsert/fetch/delete(PineconeIndexer와 같은 인터페이스)
+    """
+
+    store_class = LocalVectorStore
+
+    def upsert_vectors(
+        self,
+        namespace: str,
+        vectors: List[Tuple[str, List[float], Dict[str, Any]]],
+    ):
+        upserted = 0
+        for project_id, items in group_by_project(vectors).items():
+            upserted = upserted + get_local_store(namespace, project_id, self.store_class).upsert(items)
+        return {"upserted_count": upserted}
+
+    def fetch_vectors(self, namespace: str, ids: List[str]) -> Dict[str, List[float]]:
+        if not ids:
+            return {}
+
+        out: Dict[str, List[float]] = {}
+        for project_id in namespace_project_ids(namespace):
+            out.update(get_local_store(namespace, project_id, self.store_class).fetch(ids))
+        return out
+
+    def delete_vectors(self, namespace: str, ids: List[str]) -> int:
+        """
+        id 목록을 namespace의 모든 프로젝트 저장소에서 삭제합니다.
+        """
+        if not ids:
+            return 0
+
+        deleted = 0
+        for project_id in namespace_project_ids(namespace):
+            deleted = deleted + get_local_store(namespace, project_id, self.store_class).delete(ids)
+        return deleted
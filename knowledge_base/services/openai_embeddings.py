@@ -1,6 +1,24 @@
-from typing import List
+import asyncio
+from typing import Dict, List, Tuple
+
 from django.conf import settings
 
+from ..utils import normalize_embedding_text, text_sha256
+from .clients import get_async_openai_client, get_openai_client
+from .embedding_cache import get_embedding_cache
+from .embedding_tokens import estimate_tokens, pack_token_batches, truncate_to_tokens
+
+
+def is_token_limit_error(error: BaseException) -> bool:
+    """
+    Embeddings API 400 응답이 토큰 한도 초과(입력/요청)인지 판별합니다.
+    """
+    if getattr(error, "status_code", None) != 400:
+        return False
+
+    text = str(error).lower()
+    return "token" in text and ("maximum" in text or "limit" in text or "too many" in text)
+
 
 class OpenAIEmbeddingClient:
     """
@@ -8,39 +26,199 @@ class OpenAIEmbeddingClient:
 
     - model: settings.OPENAI_EMBEDDING_MODEL (text-embedding-3-large)
     - dimensions: settings.OPENAI_EMBEDDING_DIM (1024)
+    - 로컬 캐시(KB_EMBEDDING_CACHE_PATH)에 있는 텍스트는 API를 호출하지 않습니다.
+    - 호출 측 배치 크기와 무관하게 토큰 수 기준으로 요청을 묶습니다
+      (KB_EMBED_MAX_INPUT_TOKENS / KB_EMBED_MAX_REQUEST_TOKENS / KB_EMBED_MAX_BATCH_INPUTS).
     """
 
     def __init__(self):
-        if not settings.OPENAI_API_KEY:
-            raise ValueError("OPENAI_API_KEY 가 설정되어 있지 않습니다.")
+        # 프로세스 공용 클라이언트(커넥션 풀 재사용)
+        self.client = get_openai_client()
+        self.cache = get_embedding_cache()
 
-        from openai import OpenAI
-        self.client = OpenAI(api_key=settings.OPENAI_API_KEY)
+        # 실제 API 호출 횟수(벤치마크/로그용)
+        self.request_count = 0
 
     def embed_texts(self, texts: List[str]) -> List[List[float]]:
         """
         입력 텍스트 리스트를 임베딩 벡터 리스트로 변환합니다.
 
+        동작:
+            1) 텍스트 정규화(공백 정리) + 입력 토큰 한도로 절단 후 SHA-256 key 생성
+            2) 캐시 hit는 그대로 사용
+            3) miss만 중복 제거 → 토큰 예산으로 요청을 묶어 API 호출 → 캐시에 저장
+
         Parameters:
             texts (List[str]): 임베딩 대상 텍스트 목록
 
         Returns:
             List[List[float]]: 임베딩 벡터(각 벡터 차원=1024)
         """
+        hashes, found, miss_hashes, miss_texts = self._lookup(texts)
+
+        if miss_texts:
+            self._store(miss_hashes, self._embed_packed(miss_texts), found)
+
+        return [found[h] for h in hashes]
+
+    async def aembed_texts(self, texts: List[str]) -> List[List[float]]:
+        """
+        embed_texts의 async 버전(async view용)
+
+        - API 호출은 AsyncOpenAI로 보내고(요청별 배치는 동시에 전송),
+        - 로컬 캐시(SQLite) 조회/저장은 스레드에서 실행해 이벤트 루프를 막지 않습니다.
+        """
+        hashes, found, miss_hashes, miss_texts = await asyncio.to_thread(self._lookup, texts)
+
+        if miss_texts:
+            new_vectors = await self._aembed_packed(miss_texts)
+            await asyncio.to_thread(self._store, miss_hashes, new_vectors, found)
+
+        return [found[h] for h in hashes]
+
+    def _lookup(self, texts: List[str]) -> Tuple[List[str], Dict[str, List[float]], List[str], List[str]]:
+        """
+        정규화/해시 후 캐시를 조회합니다.
+
+        Returns:
+            (입력별 hash, 캐시 hit {hash: vector}, miss hash 목록, miss 텍스트 목록(중복 제거))
+        """
+        model = settings.OPENAI_EMBEDDING_MODEL
+        dim = settings.OPENAI_EMBEDDING_DIM
+        max_input_tokens = settings.KB_EMBED_MAX_INPUT_TOKENS
+
         cleaned: List[str] = []
+        hashes: List[str] = []
 
         for t in texts:
-            if t is None:
-                cleaned.append("")
-                continue
+            s = truncate_to_tokens(normalize_embedding_text(t), max_input_tokens)
+            cleaned.append(s)
+            hashes.append(text_sha256(s))
 
-            s = str(t).replace("\n", " ").strip()
+        found: Dict[str, List[float]] = {}
+        if self.cache is not None:
+            found = self.cache.get_many(model, dim, hashes)
 
-            # PoC 안전장치: 지나치게 긴 텍스트는 임시로 절단
-            if len(s) > 6000:
-                s = s[:6000]
+        # miss 텍스트(중복 제거)
+        miss_hashes: List[str] = []
+        miss_texts: List[str] = []
+        i = 0
+        while i < len(cleaned):
+            h = hashes[i]
+            if h not in found and h not in miss_hashes:
+                miss_hashes.append(h)
+                miss_texts.append(cleaned[i])
+            i = i + 1
 
-            cleaned.append(s)
+        return hashes, found, miss_hashes, miss_texts
+
+    def _store(
+        self,
+        miss_hashes: List[str],
+        new_vectors: List[List[float]],
+        found: Dict[str, List[float]],
+    ) -> None:
+        """
+        새로 받은 벡터를 캐시에 저장하고 found에 합칩니다.
+        """
+        fresh: Dict[str, List[float]] = {}
+        j = 0
+        while j < len(miss_hashes):
+            fresh[miss_hashes[j]] = new_vectors[j]
+            j = j + 1
+
+        if self.cache is not None:
+            self.cache.put_many(settings.OPENAI_EMBEDDING_MODEL, settings.OPENAI_EMBEDDING_DIM, fresh)
+
+        found.update(fresh)
+
+    def _pack(self, cleaned: List[str]) -> List[List[int]]:
+        counts = [estimate_tokens(s) for s in cleaned]
+        return pack_token_batches(
+            counts,
+            max_request_tokens=settings.KB_EMBED_MAX_REQUEST_TOKENS,
+            max_inputs=settings.KB_EMBED_MAX_BATCH_INPUTS,
+        )
+
+    def _embed_packed(self, cleaned: List[str]) -> List[List[float]]:
+        """
+        토큰 예산에 맞춰 요청을 나눠 호출하고, 입력 순서대로 결과를 합칩니다.
+        """
+        vectors: List[List[float]] = [None] * len(cleaned)
+        for idx_list in self._pack(cleaned):
+            part = self._embed_request([cleaned[i] for i in idx_list])
+            k = 0
+            while k < len(idx_list):
+                vectors[idx_list[k]] = part[k]
+                k = k + 1
+
+        return vectors
+
+    async def _aembed_packed(self, cleaned: List[str]) -> List[List[float]]:
+        batches = self._pack(cleaned)
+        parts = await asyncio.gather(
+            *[self._aembed_request([cleaned[i] for i in idx_list]) for idx_list in batches]
+        )
+
+        vectors: List[List[float]] = [None] * len(cleaned)
+        b = 0
+        while b < len(batches):
+            k = 0
+            while k < len(batches[b]):
+                vectors[batches[b][k]] = parts[b][k]
+                k = k + 1
+            b = b + 1
+
+        return vectors
+
+    def _embed_request(self, cleaned: List[str]) -> List[List[float]]:
+        """
+        요청 1회를 보내고, 토큰 한도 초과(400)면 나눠서 다시 보냅니다.
+
+        - 토큰 수가 추정치(tiktoken 미설치)라 실제보다 적게 잡혔을 때를 대비합니다.
+        - 여러 입력이면 절반씩 분할, 입력 1개면 3/4 길이로 줄여 재시도합니다.
+        """
+        try:
+            return self._create_embeddings(cleaned)
+        except Exception as e:
+            if not is_token_limit_error(e):
+                raise
+
+        if len(cleaned) > 1:
+            mid = len(cleaned) // 2
+            return self._embed_request(cleaned[:mid]) + self._embed_request(cleaned[mid:])
+
+        tokens = estimate_tokens(cleaned[0])
+        shorter = truncate_to_tokens(cleaned[0], (tokens * 3) // 4)
+        if shorter == "" or shorter == cleaned[0]:
+            raise ValueError("임베딩 입력을 토큰 한도 안으로 줄일 수 없습니다.")
+        return self._embed_request([shorter])
+
+    async def _aembed_request(self, cleaned: List[str]) -> List[List[float]]:
+        """
+        _embed_request의 async 버전(분할/축소 재시도 규칙 동일)
+        """
+        try:
+            return await self._acreate_embeddings(cleaned)
+        except Exception as e:
+            if not is_token_limit_error(e):
+                raise
+
+        if len(cleaned) > 1:
+            mid = len(cleaned) // 2
+            return await self._aembed_request(cleaned[:mid]) + await self._aembed_request(cleaned[mid:])
+
+        tokens = estimate_tokens(cleaned[0])
+        shorter = truncate_to_tokens(cleaned[0], (tokens * 3) // 4)
+        if shorter == "" or shorter == cleaned[0]:
+            raise ValueError("임베딩 입력을 토큰 한도 안으로 줄일 수 없습니다.")
+        return await self._aembed_request([shorter])
+
+    def _create_embeddings(self, cleaned: List[str]) -> List[List[float]]:
+        """
+        정규화된 텍스트 목록으로 Embeddings API를 1회 호출합니다.
+        """
+        self.request_count = self.request_count + 1
 
         response = self.client.embeddings.create(
             model=settings.OPENAI_EMBEDDING_MODEL,
@@ -49,6 +227,24 @@ class OpenAIEmbeddingClient:
             encoding_format="float",
         )
 
+        return self._parse_response(response)
+
+    async def _acreate_embeddings(self, cleaned: List[str]) -> List[List[float]]:
+        """
+        _create_embeddings의 async 버전(AsyncOpenAI, 이벤트 루프별 공용 클라이언트)
+        """
+        self.request_count = self.request_count + 1
+
+        response = await get_async_openai_client().embeddings.create(
+            model=settings.OPENAI_EMBEDDING_MODEL,
+            input=cleaned,
+            dimensions=settings.OPENAI_EMBEDDING_DIM,
+            encoding_format="float",
+        )
+
+        return self._parse_response(response)
+
+    def _parse_response(self, response) -> List[List[float]]:
         vectors: List[List[float]] = []
 
         for item in response.data:
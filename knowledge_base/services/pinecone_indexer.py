@@ -1,5 +1,6 @@
 from typing import Any, Dict, List, Tuple
-from django.conf import settings
+
+from .clients import get_pinecone_index
 
 
 class PineconeIndexer:
@@ -11,15 +12,8 @@ class PineconeIndexer:
     """
 
     def __init__(self):
-        if not settings.PINECONE_API_KEY:
-            raise ValueError("PINECONE_API_KEY 가 설정되어 있지 않습니다.")
-        if not settings.PINECONE_HOST:
-            raise ValueError("PINECONE_HOST 가 설정되어 있지 않습니다.")
-
-        from pinecone import Pinecone
-
-        self.pc = Pinecone(api_key=settings.PINECONE_API_KEY)
-        self.index = self.pc.Index(host=settings.PINECONE_HOST)
+        # 프로세스 공용 Index 핸들(gRPC 채널/HTTP 커넥션 재사용)
+        self.index = get_pinecone_index()
 
     def upsert_vectors(
         self,
@@ -32,3 +26,34 @@ class PineconeIndexer:
         metadata는 flat JSON + 제한된 타입을 지켜야 합니다.
         """
         return self.index.upsert(vectors=vectors, namespace=namespace)
+
+    def fetch_vectors(self, namespace: str, ids: List[str]) -> Dict[str, List[float]]:
+        """
+        id 목록의 벡터 값을 가져옵니다(임베딩 재사용용).
+
+        Returns:
+            Dict[str, List[float]]: {vector_id: values}, 없는 id는 제외
+        """
+        if not ids:
+            return {}
+
+        res = self.index.fetch(ids=ids, namespace=namespace)
+
+        out: Dict[str, List[float]] = {}
+        for vid, v in (getattr(res, "vectors", {}) or {}).items():
+            values = getattr(v, "values", None)
+            if values:
+                out[str(vid)] = list(values)
+
+        return out
+
+    def delete_vectors(self, namespace: str, ids: List[str]) -> int:
+        """
+        id 목록의 벡터를 삭제합니다(요청 1회당 최대 1000개).
+        """
+        start = 0
+        while start < len(ids):
+            self.index.delete(ids=ids[start : start + 1000], namespace=namespace)
+            start = start + 1000
+
+        return len(ids)
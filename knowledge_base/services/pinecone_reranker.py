@@ -1,5 +1,8 @@
+import asyncio
 from typing import Dict, List, Any
-from django.conf import settings
+
+from .clients import get_async_pinecone_client, get_pinecone_client
+from .timing import submit_rerank
 
 
 class PineconeHostedReranker:
@@ -9,11 +12,7 @@ class PineconeHostedReranker:
     """
 
     def __init__(self):
-        if not settings.PINECONE_API_KEY:
-            raise ValueError("PINECONE_API_KEY 가 설정되어 있지 않습니다.")
-
-        from pinecone import Pinecone
-        self.pc = Pinecone(api_key=settings.PINECONE_API_KEY)
+        self.pc = get_pinecone_client()
 
     def rerank(
         self,
@@ -47,6 +46,42 @@ class PineconeHostedReranker:
             parameters={"truncate": "END"},
         )
 
+        return self._parse_result(res)
+
+    async def arerank(
+        self,
+        query: str,
+        documents: List[Dict[str, Any]],
+        top_n: int = 5,
+        rank_fields: List[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        rerank의 async 버전(pinecone[asyncio]가 없으면 동기 호출을 hosted rerank 전용 스레드풀에서 실행)
+
+        - 전용 풀이 꽉 차 있으면 RuntimeError(호출 측은 로컬 순위로 대체)
+        """
+        if rank_fields is None:
+            rank_fields = ["chunk_text"]
+
+        pc = get_async_pinecone_client()
+        if pc is None:
+            future = submit_rerank(self.rerank, query, documents, top_n, rank_fields)
+            if future is None:
+                raise RuntimeError("hosted rerank pool is full")
+            return await asyncio.wrap_future(future)
+
+        res = await pc.inference.rerank(
+            model="bge-reranker-v2-m3",
+            query=query,
+            documents=documents,
+            top_n=top_n,
+            rank_fields=rank_fields,
+            return_documents=True,
+            parameters={"truncate": "END"},
+        )
+        return self._parse_result(res)
+
+    def _parse_result(self, res) -> List[Dict[str, Any]]:
         out: List[Dict[str, Any]] = []
         for item in getattr(res, "data", []) or []:
             doc = getattr(item, "document", None)
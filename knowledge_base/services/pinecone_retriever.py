@@ -1,5 +1,7 @@
+import asyncio
 from typing import Any, Dict, List, Optional
-from django.conf import settings
+
+from .clients import get_async_pinecone_index, get_pinecone_index
 
 
 class PineconeRetriever:
@@ -10,15 +12,8 @@ class PineconeRetriever:
     """
 
     def __init__(self):
-        if not settings.PINECONE_API_KEY:
-            raise ValueError("PINECONE_API_KEY 가 설정되어 있지 않습니다.")
-        if not settings.PINECONE_HOST:
-            raise ValueError("PINECONE_HOST 가 설정되어 있지 않습니다.")
-
-        from pinecone import Pinecone
-
-        self.pc = Pinecone(api_key=settings.PINECONE_API_KEY)
-        self.index = self.pc.Index(host=settings.PINECONE_HOST)
+        # 프로세스 공용 Index 핸들(gRPC 채널/HTTP 커넥션 재사용)
+        self.index = get_pinecone_index()
 
     def query(
         self,
@@ -43,6 +38,36 @@ class PineconeRetriever:
             filter=flt,
         )
 
+        return self._parse_matches(res)
+
+    async def aquery(
+        self,
+        namespace: str,
+        vector: List[float],
+        project_id: int,
+        top_k: int,
+        include_metadata: bool = True,
+    ) -> List[Dict[str, Any]]:
+        """
+        query의 async 버전
+
+        - pinecone[asyncio]가 있으면 IndexAsyncio로 호출하고,
+          없으면 동기 query를 스레드에서 실행합니다(이벤트 루프는 막지 않음).
+        """
+        index = get_async_pinecone_index()
+        if index is None:
+            return await asyncio.to_thread(self.query, namespace, vector, project_id, top_k, include_metadata)
+
+        res = await index.query(
+            namespace=namespace,
+            vector=vector,
+            top_k=top_k,
+            include_metadata=include_metadata,
+            filter={"project_id": {"$eq": int(project_id)}},
+        )
+        return self._parse_matches(res)
+
+    def _parse_matches(self, res) -> List[Dict[str, Any]]:
         matches: List[Dict[str, Any]] = []
 
         # SDK 응답 구조에 맞춰 안전하게 파싱
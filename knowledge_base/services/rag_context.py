@@ -43,6 +43,66 @@ def sort_matches_with_importance(matches: List[Dict[str, Any]]) -> List[Dict[str
     return out
 
 
+def _match_key(m: Dict[str, Any]):
+    # 같은 청크는 벡터/키워드 검색 모두 kb_chunk_id로 묶습니다(없는 옛 벡터는 벡터 id).
+    meta = m.get("metadata", {}) or {}
+    kb_chunk_id = meta.get("kb_chunk_id")
+    if kb_chunk_id is not None:
+        return ("chunk", int(kb_chunk_id))
+    return ("id", m.get("id"))
+
+
+def fuse_matches_rrf(
+    vector_matches: List[Dict[str, Any]],
+    lexical_matches: List[Dict[str, Any]],
+    k: int = 60,
+) -> List[Dict[str, Any]]:
+    """
+    벡터 검색과 키워드(BM25) 검색 결과를 reciprocal rank fusion으로 합칩니다.
+
+    - rrf = Σ 1 / (k + rank), 두 목록 모두 1위인 청크가 1.0이 되도록 나눠 0~1로 맞춥니다
+      (sort_matches_with_importance의 importance 가산(최대 0.15)과 같은 척도).
+    - 결과 match의 score는 정규화된 rrf이고, 원래 점수는 vector_score / lexical_score에 남깁니다.
+    - 키워드 결과가 비면 벡터 결과를 그대로 반환합니다(score = 코사인 유사도 유지).
+
+    Returns:
+        List[dict]: rrf 내림차순 match 목록(sort_matches_with_importance 입력)
+    """
+    if not lexical_matches:
+        return vector_matches
+
+    fused: Dict[Any, Dict[str, Any]] = {}
+    order = []
+
+    for source, matches in (("vector_score", vector_matches), ("lexical_score", lexical_matches)):
+        rank = 1
+        for m in matches:
+            key = _match_key(m)
+            item = fused.get(key)
+            if item is None:
+                item = dict(m)
+                item["rrf"] = 0.0
+                fused[key] = item
+                order.append(key)
+            elif source in item:
+                # 같은 목록에서 다시 나온 청크(여러 벡터)는 첫 순위만 사용
+                continue
+
+            item[source] = m.get("score")
+            item["rrf"] = item["rrf"] + 1.0 / (k + rank)
+            rank = rank + 1
+
+    best = 2.0 / (k + 1)
+    out = []
+    for key in order:
+        item = fused[key]
+        item["score"] = item.pop("rrf") / best
+        out.append(item)
+
+    out.sort(key=lambda x: x["score"], reverse=True)
+    return out
+
+
 def build_context_snippets(
     matches: List[Dict[str, Any]],
     max_snippets: int = 8,
@@ -73,9 +133,11 @@ def build_context_snippets(
                 "doc_title": meta.get("doc_title", ""),
                 "source_type": meta.get("source_type", ""),
                 "tags": meta.get("tags", []),
-                # chunk_text는 Pinecone metadata에 넣지 않으셨으므로
-                # DB에서 kb_chunk_id로 가져오는 방식이 Step7에 유리합니다.
+                # store_text 모드로 인덱싱된 벡터만 chunk_text가 있습니다.
+                # 없거나 잘린 경우(text_truncated)는 kb_chunk_id로 DB에서 가져옵니다.
                 "kb_chunk_id": meta.get("kb_chunk_id"),
+                "chunk_text": meta.get("chunk_text"),
+                "text_truncated": bool(meta.get("text_truncated", False)),
             }
         )
 
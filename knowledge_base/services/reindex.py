@@ -0,0 +1,154 @@
+import logging
+import time
+from typing import Callable, Optional
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from ..models import KBJob
+from .index_pipeline import ProjectChunkIndexer, pending_chunks_queryset
+
+logger = logging.getLogger(__name__)
+
+# 한 라운드에서 DB로 읽어오는 청크 수(메모리 상한)
+ROUND_SIZE = 1000
+
+
+def is_rate_limited(error: BaseException) -> bool:
+    """
+    OpenAI/Pinecone 응답이 rate limit(429)인지 판별합니다.
+    """
+    for attr in ("status_code", "status"):
+        if getattr(error, attr, None) == 429:
+            return True
+
+    response = getattr(error, "response", None)
+    if getattr(response, "status_code", None) == 429:
+        return True
+
+    name = type(error).__name__
+    if name == "RateLimitError":
+        return True
+
+    return "rate limit" in str(error).lower()
+
+
+def run_reindex_job(
+    job: KBJob,
+    sleep: Callable[[float], None] = time.sleep,
+    on_progress: Optional[Callable[[KBJob], None]] = None,
+) -> None:
+    """
+    프로젝트의 인덱싱 대상 청크를 모두 처리할 때까지 반복합니다.
+
+    체크포인트:
+        - 청크는 배치 단위로 indexed_at이 갱신되므로, 중단 후 재실행하면
+          남은 청크부터 이어서 처리합니다.
+        - force=true면 job 시작 시각 이전에 인덱싱된 청크를 다시 처리합니다.
+          기준 시각은 처음 실행할 때 params["force_before"]에 기록해 두므로,
+          회수(requeue)되어 다시 시작한 job도 처음 기준으로 이어서 처리합니다.
+
+    rate limit:
+        - 429 응답이면 지수 backoff(KB_REINDEX_BACKOFF_BASE * 2^n, 최대 60초) 후
+          같은 라운드를 재시도합니다(이미 커밋된 배치는 다시 처리하지 않음).
+        - KB_REINDEX_MAX_RETRIES를 넘으면 예외를 올립니다.
+
+    Parameters:
+        job (KBJob): job_type=reindex, params 예: {"force": false, "batch": 64, "store_text": true}
+        sleep: backoff 대기 함수(테스트/관리 명령에서 교체 가능)
+        on_progress: 라운드마다 호출되는 콜백(관리 명령 진행률 출력용)
+    """
+    from .openai_embeddings import OpenAIEmbeddingClient
+    from .vector_store import get_indexer
+
+    params = job.params or {}
+    force = bool(params.get("force", False))
+    store_text = bool(params.get("store_text", settings.KB_PINECONE_STORE_TEXT))
+    batch_size = int(params.get("batch", 64))
+    if batch_size < 1:
+        batch_size = 1
+    if batch_size > 256:
+        batch_size = 256
+
+    model = settings.OPENAI_EMBEDDING_MODEL
+    dim = settings.OPENAI_EMBEDDING_DIM
+
+    # 강제 재인덱싱 기준 시각(재시작해도 바뀌지 않도록 params에 보관)
+    force_before = None
+    if force:
+        force_before = parse_datetime(str(params.get("force_before") or ""))
+        if force_before is None:
+            force_before = job.started_at or timezone.now()
+            params = dict(params, force_before=force_before.isoformat())
+            job.params = params
+            job.save(update_fields=["params"])
+
+    def pending():
+        return pending_chunks_queryset(
+            project_id=job.project_id,
+            owner_id=job.owner_id,
+            model=model,
+            dim=dim,
+            force=force,
+            indexed_before=force_before,
+        )
+
+    job.stage = "index"
+    job.progress_done = 0
+    job.progress_total = pending().count()
+    job.save(update_fields=["stage", "progress_done", "progress_total"])
+
+    indexer = ProjectChunkIndexer(
+        owner_id=job.owner_id,
+        project_id=job.project_id,
+        namespace=str(job.owner_id),
+        embedder=OpenAIEmbeddingClient(),
+        pinecone=get_indexer(),
+        model=model,
+        dim=dim,
+        embed_concurrency=settings.KB_INDEX_EMBED_CONCURRENCY,
+        queue_size=settings.KB_INDEX_QUEUE_SIZE,
+        store_text=store_text,
+        text_max_bytes=settings.KB_PINECONE_TEXT_MAX_BYTES,
+    )
+
+    retries = 0
+    embedded_total = 0
+    reused_total = 0
+
+    while True:
+        targets = list(
+            pending().select_related("document").order_by("document_id", "chunk_index")[:ROUND_SIZE]
+        )
+        if not targets:
+            break
+
+        try:
+            result = indexer.run(targets, batch_size=batch_size)
+        except Exception as e:
+            if not is_rate_limited(e) or retries >= settings.KB_REINDEX_MAX_RETRIES:
+                raise
+
+            delay = min(60.0, settings.KB_REINDEX_BACKOFF_BASE * (2 ** retries))
+            retries = retries + 1
+            logger.warning("reindex job %s rate limited, retry %s in %.1fs", job.id, retries, delay)
+            sleep(delay)
+            continue
+
+        retries = 0
+        embedded_total = embedded_total + result["embedded_count"]
+        reused_total = reused_total + result["reused_count"]
+
+        # 남은 청크 수 기준으로 진행률 갱신(실패한 배치는 다음 라운드에서 다시 집계)
+        remaining = pending().count()
+        job.progress_done = max(0, job.progress_total - remaining)
+        job.save(update_fields=["progress_done"])
+
+        if on_progress is not None:
+            on_progress(job)
+
+    job.stage = "done"
+    job.progress_done = job.progress_total
+    job.params = dict(params, embedded_count=embedded_total, reused_count=reused_total)
+    job.save(update_fields=["stage", "progress_done", "params"])
@@ -0,0 +1,205 @@
+import hashlib
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import caches
+
+from ..utils import pack_float32, unpack_float32
+
+# 질문 → 검색 결과(정렬된 청크 id) 캐시
+#
+# - key: (namespace, project, 프로젝트 버전, 정규화 질문, reranker(off/hosted/local), 하이브리드 여부, 임베딩 모델/차원)
+# - 프로젝트 청크가 바뀌면(업로드 처리 완료/인덱싱 커밋) 버전을 올려 이전 항목을 모두 무효화합니다.
+#   항목을 찾아 지우지 않고, 새 버전 key로만 조회되게 해 이전 항목은 TTL로 사라집니다.
+# - 저장은 조회(검색 시작) 때 읽은 버전으로 합니다. 검색하는 동안 버전이 올라가면
+#   바뀌기 전 결과가 새 버전 key로 저장되지 않고, 이전 버전 key에 남아 아무도 읽지 않습니다.
+# - 웹 프로세스와 kb_worker가 버전을 공유해야 하므로 KB_CACHE_ALIAS 캐시는
+#   프로세스 간 공유되는 백엔드(파일/DB/Redis 등)를 사용합니다.
+
+
+def _cache():
+    return caches[settings.KB_CACHE_ALIAS]
+
+
+def normalize_question(text: str) -> str:
+    """
+    캐시 key용 질문 정규화(대소문자/공백/끝 문장부호 차이 무시)
+    """
+    s = " ".join(str(text or "").split()).casefold()
+    return s.rstrip(" ?!.。？！")
+
+
+def _version_key(project_id: int) -> str:
+    return f"kb:rv:{int(project_id)}"
+
+
+def project_version(project_id: int) -> int:
+    """
+    프로젝트 캐시 버전을 반환합니다(없으면 현재 시각으로 생성).
+
+    - 버전 key가 만료/퇴출되어도 0부터 다시 세지 않으므로 이전 항목이 되살아나지 않습니다.
+    """
+    return _cache().get_or_set(_version_key(project_id), time.time_ns(), timeout=None)
+
+
+async def aproject_version(project_id: int) -> int:
+    """
+    project_version의 async 버전
+    """
+    return await _cache().aget_or_set(_version_key(project_id), time.time_ns(), timeout=None)
+
+
+def bump_project_version(project_id: int) -> None:
+    """
+    프로젝트의 검색 캐시를 무효화합니다(청크 추가/인덱싱 커밋 후 호출).
+    """
+    _cache().set(_version_key(project_id), time.time_ns(), timeout=None)
+
+
+def _entry_key(namespace: str, project_id: int, version: int, question: str, reranker: str) -> str:
+    raw = "|".join(
+        [
+            str(namespace),
+            str(int(project_id)),
+            str(version),
+            "rr:" + str(reranker),
+            "hy1" if settings.KB_HYBRID_SEARCH else "hy0",
+            settings.OPENAI_EMBEDDING_MODEL,
+            str(settings.OPENAI_EMBEDDING_DIM),
+            normalize_question(question),
+        ]
+    )
+    return "kb:rq:" + hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _to_matches(entries) -> List[Dict[str, Any]]:
+    matches = []
+    for pinecone_id, kb_chunk_id, score, final_score in entries:
+        matches.append(
+            {
+                "id": pinecone_id,
+                "score": score,
+                "final_score": final_score,
+                "metadata": {"kb_chunk_id": kb_chunk_id},
+            }
+        )
+    return matches
+
+
+def _to_entries(candidates: List[Dict[str, Any]]):
+    entries = []
+    for c in candidates:
+        entries.append((c["pinecone_id"], c["kb_chunk_id"], c.get("score"), c.get("final_score")))
+    return entries
+
+
+def _to_value(candidates: List[Dict[str, Any]], query_vec) -> Dict[str, Any]:
+    return {
+        "entries": _to_entries(candidates),
+        "query_vec": pack_float32(query_vec) if query_vec is not None else None,
+    }
+
+
+def _from_value(value) -> Tuple[List[Dict[str, Any]], Optional[List[float]]]:
+    # 질문 임베딩을 함께 저장하기 전 형식(entries 목록만)도 읽습니다.
+    if isinstance(value, dict):
+        blob = value.get("query_vec")
+        return _to_matches(value.get("entries", [])), unpack_float32(blob) if blob else None
+    return _to_matches(value), None
+
+
+def get_cached_ranking(
+    namespace: str,
+    project_id: int,
+    question: str,
+    reranker: str,
+) -> Tuple[Optional[List[Dict[str, Any]]], Optional[List[float]], int]:
+    """
+    캐시된 검색 결과를 match 형태로 반환합니다.
+
+    Returns:
+        Tuple[matches | None, query_vec | None, version]
+            - matches: [{"id": pinecone_id, "score", "final_score", "metadata": {"kb_chunk_id"}}, ...]
+              → hydrate_matches()에 그대로 넣으면 같은 순서의 후보가 만들어집니다(없거나 캐시 비활성화면 None).
+            - query_vec: 저장 당시 질문 임베딩(hit 후 답변 캐시 조회에 재사용, 다시 임베딩하지 않음)
+            - version: 조회한 프로젝트 버전(miss 후 검색 결과는 이 버전으로 set_cached_ranking에 저장)
+    """
+    if settings.KB_RETRIEVAL_CACHE_TTL <= 0:
+        return None, None, 0
+
+    version = project_version(project_id)
+    value = _cache().get(_entry_key(namespace, project_id, version, question, reranker))
+    if value is None:
+        return None, None, version
+    matches, query_vec = _from_value(value)
+    return matches, query_vec, version
+
+
+def set_cached_ranking(
+    namespace: str,
+    project_id: int,
+    question: str,
+    reranker: str,
+    candidates: List[Dict[str, Any]],
+    version: int,
+    query_vec=None,
+) -> None:
+    """
+    최종 후보 순서(rerank 반영)를 (pinecone_id, kb_chunk_id, score, final_score)로 저장합니다.
+
+    - version은 검색 전에 읽은 값(get_cached_ranking 반환값)을 넘깁니다(저장 시점에 다시 읽지 않음).
+    - query_vec(질문 임베딩)은 float32 바이트열로 함께 저장합니다.
+    - 본문은 저장하지 않습니다(조회 시 DB에서 id__in 1회로 다시 가져옴).
+    - 후보가 없으면 저장하지 않습니다(인덱싱 직후 검색 반영 지연으로 빈 결과가 고정되지 않도록).
+    """
+    if settings.KB_RETRIEVAL_CACHE_TTL <= 0 or not candidates:
+        return
+
+    _cache().set(
+        _entry_key(namespace, project_id, version, question, reranker),
+        _to_value(candidates, query_vec),
+        timeout=settings.KB_RETRIEVAL_CACHE_TTL,
+    )
+
+
+async def aget_cached_ranking(
+    namespace: str,
+    project_id: int,
+    question: str,
+    reranker: str,
+) -> Tuple[Optional[List[Dict[str, Any]]], Optional[List[float]], int]:
+    """
+    get_cached_ranking의 async 버전
+    """
+    if settings.KB_RETRIEVAL_CACHE_TTL <= 0:
+        return None, None, 0
+
+    version = await aproject_version(project_id)
+    value = await _cache().aget(_entry_key(namespace, project_id, version, question, reranker))
+    if value is None:
+        return None, None, version
+    matches, query_vec = _from_value(value)
+    return matches, query_vec, version
+
+
+async def aset_cached_ranking(
+    namespace: str,
+    project_id: int,
+    question: str,
+    reranker: str,
+    candidates: List[Dict[str, Any]],
+    version: int,
+    query_vec=None,
+) -> None:
+    """
+    set_cached_ranking의 async 버전
+    """
+    if settings.KB_RETRIEVAL_CACHE_TTL <= 0 or not candidates:
+        return
+
+    await _cache().aset(
+        _entry_key(namespace, project_id, version, question, reranker),
+        _to_value(candidates, query_vec),
+        timeout=settings.KB_RETRIEVAL_CACHE_TTL,
+    )
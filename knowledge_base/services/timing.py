@@ -0,0 +1,120 @@
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from django.conf import settings
+
+
+class StepTimer:
+    """
+    요청 처리 단계별 소요 시간(ms) 기록기
+
+    - 여러 스레드/코루틴에서 동시에 기록해도 되도록 lock으로 보호합니다.
+    - total_ms(요청 전체 경과)와 steps 합계를 비교하면 병렬화로 겹친 시간을 알 수 있습니다.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._t0 = time.perf_counter()
+        self.steps: Dict[str, float] = {}
+
+    def add(self, name: str, seconds: float) -> None:
+        with self._lock:
+            self.steps[name] = self.steps.get(name, 0.0) + seconds * 1000.0
+
+    @contextmanager
+    def step(self, name: str):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - t0)
+
+    def call(self, name: str, fn, *args, **kwargs):
+        """
+        fn(*args, **kwargs)를 실행하고 소요 시간을 name으로 기록합니다(스레드풀 submit용).
+        """
+        with self.step(name):
+            return fn(*args, **kwargs)
+
+    def as_dict(self) -> Dict[str, float]:
+        with self._lock:
+            out = {k: round(v, 1) for k, v in self.steps.items()}
+            out["sum_steps"] = round(sum(self.steps.values()), 1)
+        out["total"] = round((time.perf_counter() - self._t0) * 1000.0, 1)
+        return out
+
+
+_pool: Optional[ThreadPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+# hosted rerank 전용 풀(시간 초과로 버린 호출이 fan-out 풀 스레드를 붙잡지 않도록 분리)
+_rerank_pool: Optional[ThreadPoolExecutor] = None
+_rerank_slots: Optional[threading.BoundedSemaphore] = None
+
+
+def _reset_pool() -> None:
+    # fork된 자식은 부모의 워커 스레드를 물려받지 못하므로 새로 만듭니다.
+    global _pool, _pool_lock, _rerank_pool, _rerank_slots
+    _pool = None
+    _pool_lock = threading.Lock()
+    _rerank_pool = None
+    _rerank_slots = None
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_pool)
+
+
+def get_fanout_pool() -> ThreadPoolExecutor:
+    """
+    요청 내부의 네트워크 호출(임베딩 등)을 겹쳐 실행할 프로세스 공용 스레드풀
+
+    - 크기는 AGENT_FANOUT_WORKERS(동시에 처리 중인 요청 수만큼 있으면 충분합니다).
+    - DB 작업은 요청 스레드에서만 수행하고, 이 풀에는 ORM을 쓰지 않는 작업만 넣습니다.
+    """
+    global _pool
+
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(
+                max_workers=settings.AGENT_FANOUT_WORKERS,
+                thread_name_prefix="agent-fanout",
+            )
+
+    return _pool
+
+
+def submit_rerank(fn, *args, **kwargs) -> Optional[Future]:
+    """
+    hosted rerank 호출을 전용 스레드풀에 넣습니다.
+
+    - 동시에 실행 중인 호출은 AGENT_RERANK_WORKERS개까지입니다.
+      SDK가 요청 단위 timeout을 받지 않아, 시간 초과로 버린 호출도 응답이 올 때까지 스레드를 잡습니다.
+      빈 자리가 없으면(느린 호출이 쌓인 상태) 대기열에 넣지 않고 None을 반환하므로 호출 측은 로컬 순위를 씁니다.
+    """
+    global _rerank_pool, _rerank_slots
+
+    with _pool_lock:
+        if _rerank_pool is None:
+            workers = max(1, settings.AGENT_RERANK_WORKERS)
+            _rerank_pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="agent-rerank")
+            _rerank_slots = threading.BoundedSemaphore(workers)
+        pool = _rerank_pool
+        slots = _rerank_slots
+
+    if not slots.acquire(blocking=False):
+        return None
+
+    try:
+        future = pool.submit(fn, *args, **kwargs)
+    except BaseException:
+        slots.release()
+        raise
+
+    future.add_done_callback(lambda _: slots.release())
+    return future
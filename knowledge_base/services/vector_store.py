@@ -0,0 +1,47 @@
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+# 벡터 검색/저장 백엔드 선택(KB_VECTOR_BACKEND)
+#
+# - retriever: query(namespace, vector, project_id, top_k, include_metadata) / aquery(...)
+#              → [{"id", "score", "metadata"}, ...]
+# - indexer:   upsert_vectors(namespace, [(id, values, metadata), ...]) / fetch_vectors(namespace, ids)
+#              / delete_vectors(namespace, ids)
+#
+# 백엔드를 바꾸면 기존 벡터는 옮겨지지 않으므로 kb_reindex --force로 다시 인덱싱합니다.
+VECTOR_BACKENDS = {
+    "pinecone": (
+        "knowledge_base.services.pinecone_retriever.PineconeRetriever",
+        "knowledge_base.services.pinecone_indexer.PineconeIndexer",
+    ),
+    "local": (
+        "knowledge_base.services.local_vector_index.LocalRetriever",
+        "knowledge_base.services.local_vector_index.LocalIndexer",
+    ),
+    # local과 같은 파일을 쓰므로 local ↔ local_ivf 전환은 재인덱싱이 필요 없습니다.
+    "local_ivf": (
+        "knowledge_base.services.ivf_index.IVFRetriever",
+        "knowledge_base.services.ivf_index.IVFIndexer",
+    ),
+}
+
+
+def _backend():
+    name = settings.KB_VECTOR_BACKEND
+    if name not in VECTOR_BACKENDS:
+        raise ValueError(f"지원하지 않는 KB_VECTOR_BACKEND 입니다: {name}")
+    return VECTOR_BACKENDS[name]
+
+
+def get_retriever():
+    """
+    설정된 백엔드의 retriever 인스턴스를 반환합니다.
+    """
+    return import_string(_backend()[0])()
+
+
+def get_indexer():
+    """
+    설정된 백엔드의 indexer 인스턴스를 반환합니다.
+    """
+    return import_string(_backend()[1])()
@@ -0,0 +1,48 @@
+import logging
+
+from django.db import transaction
+from django.db.models.signals import pre_delete
+from django.dispatch import receiver
+
+from .models import KBChunk, KBDocument
+from .services.lexical_index import delete_document_segment
+from .services.retrieval_cache import bump_project_version
+
+logger = logging.getLogger(__name__)
+
+
+@receiver(pre_delete, sender=KBDocument)
+def delete_document_vectors(sender, instance: KBDocument, **kwargs):
+    """
+    문서가 삭제되면(프로젝트/사용자 삭제로 인한 cascade 포함) 벡터 백엔드에서도 청크 벡터를 지웁니다.
+    키워드 검색 역색인의 문서 segment도 함께 지웁니다.
+
+    - 청크는 cascade로 함께 지워지므로 삭제 전에 pinecone_id를 모아 둡니다.
+    - 외부 삭제는 트랜잭션 커밋 후에 실행하고, 실패해도 문서 삭제는 되돌리지 않습니다
+      (남은 벡터는 검색 시 DB에 없는 match로 걸러집니다).
+    """
+    ids = list(
+        KBChunk.objects.filter(document=instance)
+        .exclude(pinecone_id__isnull=True)
+        .exclude(pinecone_id="")
+        .values_list("pinecone_id", flat=True)
+    )
+    namespace = str(instance.owner_id)
+    project_id = instance.project_id
+
+    document_id = instance.id
+
+    def remove():
+        delete_document_segment(project_id, document_id)
+        bump_project_version(project_id)
+        if not ids:
+            return
+
+        from .services.vector_store import get_indexer
+
+        try:
+            get_indexer().delete_vectors(namespace, ids)
+        except Exception:
+            logger.warning("vector delete failed for document %s (%s ids)", instance.id, len(ids), exc_info=True)
+
+    transaction.on_commit(remove)
@@ -1,3 +1,625 @@
-from django.test import TestCase
+import asyncio
+import sqlite3
+import tempfile
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from django.test import TestCase, override_settings
+
+from agent_work.models import Project
+from core.models import User
+from .models import KBChunk, KBDocument, KBJob
+from .management.commands.kb_bench_candidates import list_dedup, list_reorder, make_candidates
+from .services.candidate_set import CandidateSet
+from .services.embedding_cache import EmbeddingCache
+from .services.embedding_tokens import pack_token_batches
+from .services.ivf_index import IVFVectorStore
+from .services import lexical_index
+from .services.lexical_index import (
+    delete_document_segment,
+    get_lexical_index,
+    lexical_search,
+    tokenize,
+    write_document_segment,
+)
+from .services.job_queue import claim_next_job, enqueue_job, requeue_job
+from .services.local_vector_index import LocalVectorStore, get_local_store
+from .services.openai_embeddings import OpenAIEmbeddingClient
+from .services.rag_context import fuse_matches_rrf
+
+DIM = 4
+
+
+def unit(values):
+    v = np.asarray(values, dtype=np.float32)
+    return (v / np.linalg.norm(v)).tolist()
+
+
+def meta(i: int) -> dict:
+    return {"project_id": 1, "kb_chunk_id": i}
+
+
+class LocalVectorStoreTests(TestCase):
+    """
+    로컬 벡터 저장소(header/로그/gen 파일) 동작
+    """
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def open_store(self, store_class=LocalVectorStore):
+        return store_class(self.tmp.name, "ns", 1, DIM)
+
+    def test_upsert_overwrites_same_id(self):
+        store = self.open_store()
+        store.upsert([("a", [1, 0, 0, 0], meta(1)), ("b", [0, 1, 0, 0], meta(2))])
+        store.upsert([("a", [0, 0, 1, 0], meta(3))])
+
+        self.assertEqual(store.count, 2)
+        self.assertEqual(store.fetch(["a"])["a"], [0.0, 0.0, 1.0, 0.0])
+
+        top = store.search([0, 0, 1, 0], top_k=1)
+        self.assertEqual(top[0]["id"], "a")
+        self.assertEqual(top[0]["metadata"], meta(3))
+
+    def test_delete_hides_vector_and_reuses_row(self):
+        store = self.open_store()
+        store.upsert([("a", [1, 0, 0, 0], meta(1)), ("b", [0, 1, 0, 0], meta(2))])
+
+        self.assertEqual(store.delete(["a", "missing"]), 1)
+        self.assertEqual(store.fetch(["a"]), {})
+        self.assertEqual([m["id"] for m in store.search([1, 0, 0, 0], top_k=5)], ["b"])
+
+        # 새 id는 삭제된 행을 재사용합니다(행 수가 늘지 않음).
+        store.upsert([("c", [0, 0, 1, 0], meta(3))])
+        self.assertEqual(store.count, 2)
+        self.assertEqual(store.search([0, 0, 1, 0], top_k=1)[0]["id"], "c")
+
+    def test_second_instance_sees_changes(self):
+        writer = self.open_store()
+        reader = self.open_store()
+        writer.upsert([("a", [1, 0, 0, 0], meta(1))])
+        self.assertEqual([m["id"] for m in reader.search([1, 0, 0, 0], top_k=5)], ["a"])
+
+        # 같은 gen: 로그 추가분만 읽어 반영
+        writer.upsert([("b", [0, 1, 0, 0], meta(2))])
+        writer.delete(["a"])
+        self.assertEqual([m["id"] for m in reader.search([1, 0, 0, 0], top_k=5)], ["b"])
+        self.assertEqual(reader.fetch(["a", "b"]).keys(), {"b"})
+
+    def test_log_bytes_after_header_are_ignored(self):
+        store = self.open_store()
+        store.upsert([("a", [1, 0, 0, 0], meta(1))])
+
+        # 중단된 쓰기가 header 이후에 남긴 줄은 읽지 않고, 다음 쓰기에서 잘라냅니다.
+        with open(store._log_path(store.gen), "ab") as fp:
+            fp.write(b'{"r": 0, "id": null, "m": {"pad": "' + b"x" * 200 + b'"}}\n')
+
+        reader = self.open_store()
+        self.assertEqual(reader.fetch(["a"]).keys(), {"a"})
+
+        store.upsert([("b", [0, 1, 0, 0], meta(2))])
+        self.assertEqual(store._log_path(store.gen).stat().st_size, store._offset)
+        reader = self.open_store()
+        self.assertEqual(reader.fetch(["a", "b"]).keys(), {"a", "b"})
+
+    def test_capacity_rewrite_keeps_rows(self):
+        store = self.open_store()
+        reader = self.open_store()
+        store.upsert([("a", [1, 0, 0, 0], meta(1))])
+        reader.refresh()
+        old_gen = store.gen
+        old_capacity = store.capacity
+
+        rng = np.random.default_rng(0)
+        items = [(f"v{i}", rng.normal(size=DIM).tolist(), meta(i)) for i in range(old_capacity)]
+        store.upsert(items)
+        store.delete(["v0"])
+
+        self.assertGreater(store.gen, old_gen)
+        self.assertEqual(store.capacity, old_capacity * 2)
+        self.assertEqual(store.count, old_capacity + 1)
+        self.assertFalse(store._vectors_path(old_gen).exists())
+        self.assertFalse(store._log_path(old_gen).exists())
+
+        # 이전 gen을 열고 있던 인스턴스도 새 gen으로 다시 읽습니다.
+        self.assertEqual(reader.search([1, 0, 0, 0], top_k=1)[0]["id"], "a")
+        self.assertEqual(reader.fetch(["v0", "v5"]).keys(), {"v5"})
+        self.assertEqual(reader.capacity, old_capacity * 2)
+
+
+@override_settings(KB_IVF_MIN_TRAIN_ROWS=1000000, KB_IVF_NPROBE=1)
+class IVFVectorStoreTests(TestCase):
+    """
+    IVF 목록 배정/삭제/재배정
+    """
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+        # 축 방향 4개 클러스터
+        rng = np.random.default_rng(0)
+        items = []
+        for i in range(200):
+            v = np.eye(DIM)[i % DIM] + rng.normal(scale=0.05, size=DIM)
+            items.append((f"v{i}", v.tolist(), meta(i)))
+
+        self.store = IVFVectorStore(self.tmp.name, "ns", 1, DIM)
+        self.store.upsert(items)
+        self.store.train(nlist=DIM)
+
+    def test_search_after_delete_and_reinsert(self):
+        store = self.store
+        self.assertEqual(store.nlist, DIM)
+        self.assertEqual(store.search(store.fetch(["v0"])["v0"], top_k=1)[0]["id"], "v0")
+
+        store.delete(["v0"])
+        self.assertNotIn("v0", [m["id"] for m in store.search(unit([1, 0, 0, 0]), top_k=200)])
+
+        # 다른 클러스터로 다시 넣으면 새 목록에서만 검색됩니다(이전 목록의 행은 걸러짐).
+        store.upsert([("v0", unit([0, 0, 0, 1]), meta(0))])
+        self.assertNotIn("v0", [m["id"] for m in store.search(unit([1, 0, 0, 0]), top_k=200)])
+
+        found = [m["id"] for m in store.search(unit([0, 0, 0, 1]), top_k=200)]
+        self.assertIn("v0", found)
+        self.assertEqual(len(found), len(set(found)))
+
+    def test_reinsert_into_same_list_has_no_duplicates(self):
+        store = self.store
+        store.upsert([("v0", unit([1, 0.01, 0, 0]), meta(0))])
+        store.upsert([("v0", unit([1, 0.02, 0, 0]), meta(0))])
+
+        found = [m["id"] for m in store.search(unit([1, 0, 0, 0]), top_k=200)]
+        self.assertEqual(found.count("v0"), 1)
+
+    def test_second_instance_reads_lists(self):
+        self.store.delete(["v1"])
+        self.store.upsert([("new", unit([0, 1, 0, 0]), meta(999))])
+
+        reader = IVFVectorStore(self.tmp.name, "ns", 1, DIM)
+        found = [m["id"] for m in reader.search(unit([0, 1, 0, 0]), top_k=200)]
+        self.assertEqual(reader.nlist, DIM)
+        self.assertIn("new", found)
+        self.assertNotIn("v1", found)
+
+
+class DeleteDocumentVectorsTests(TestCase):
+    """
+    문서 삭제 시 signals.delete_document_vectors가 로컬 저장소의 청크 벡터를 지우는지 확인
+    """
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        override = override_settings(
+            KB_VECTOR_BACKEND="local",
+            KB_LOCAL_INDEX_DIR=f"{tmp.name}/vectors",
+            KB_LEXICAL_INDEX_DIR=f"{tmp.name}/lexical",
+            OPENAI_EMBEDDING_DIM=DIM,
+        )
+        override.enable()
+        self.addCleanup(override.disable)
+
+        self.user = User.objects.create(login_id="HQ:test", affiliation="HQ", employee_no="test", full_name="T")
+        self.project = Project.objects.create(owner=self.user, name="p")
+
+    def make_document(self, n: int) -> KBDocument:
+        doc = KBDocument.objects.create(owner=self.user, project=self.project, title="d", source_type="text")
+        store = get_local_store(str(self.user.id), self.project.id)
+        i = 0
+        while i < n:
+            pid = f"d{doc.id}-c{i}"
+            KBChunk.objects.create(document=doc, chunk_index=i, chunk_text="본문", pinecone_id=pid)
+            store.upsert([(pid, unit([1, i + 1, 0, 0]), {"project_id": self.project.id})])
+            i = i + 1
+        return doc
+
+    def test_document_delete_removes_vectors(self):
+        doc = self.make_document(3)
+        other = self.make_document(2)
+        store = get_local_store(str(self.user.id), self.project.id)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            doc.delete()
+
+        remaining = {m["id"] for m in store.search(unit([1, 1, 0, 0]), top_k=10)}
+        self.assertEqual(remaining, {f"d{other.id}-c0", f"d{other.id}-c1"})
+
+
+@override_settings(KB_JOB_MAX_REQUEUES=2)
+class RequeueJobTests(TestCase):
+    """
+    kb_worker 프로세스 풀이 깨졌을 때 중단된 job 되돌리기(job_queue.requeue_job)
+    """
+
+    def setUp(self):
+        self.user = User.objects.create(login_id="HQ:test", affiliation="HQ", employee_no="test", full_name="T")
+        self.project = Project.objects.create(owner=self.user, name="p")
+
+    def start_ingest(self) -> KBJob:
+        enqueue_job(self.user, self.project, "ingest", {"file_path": "/nonexistent"})
+        job = claim_next_job()
+        doc = KBDocument.objects.create(owner=self.user, project=self.project, title="d", source_type="text")
+        KBJob.objects.filter(id=job.id).update(document=doc, stage="chunk", progress_done=5, progress_total=10)
+        return job
+
+    def test_ingest_requeue_drops_partial_document(self):
+        job = self.start_ingest()
+        doc_id = KBJob.objects.get(id=job.id).document_id
+
+        self.assertEqual(requeue_job(job.id, count_attempt=False, isolate=True), "queued")
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.stage, job.document_id, job.progress_done), ("queued", "queued", None, 0))
+        self.assertEqual(job.params, {"file_path": "/nonexistent", "isolate": True})
+        self.assertFalse(KBDocument.objects.filter(id=doc_id).exists())
+
+    def test_requeue_limit_fails_job(self):
+        job = self.start_ingest()
+        self.assertEqual(requeue_job(job.id), "queued")
+        claim_next_job()
+        self.assertEqual(requeue_job(job.id), "queued")
+        claim_next_job()
+        self.assertEqual(requeue_job(job.id), "failed")
+
+        job.refresh_from_db()
+        self.assertEqual(job.error, "worker_crashed")
+
+    def test_finished_job_is_left_alone(self):
+        job = self.start_ingest()
+        KBJob.objects.filter(id=job.id).update(status="succeeded")
+        self.assertEqual(requeue_job(job.id), "")
+
+
+class EmbeddingCacheTests(TestCase):
+    """
+    임베딩 캐시 항목 수 카운터(stats "entries")와 LRU 정리
+    """
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = f"{tmp.name}/emb.sqlite3"
+
+    def count_rows(self) -> int:
+        conn = sqlite3.connect(self.path)
+        try:
+            return conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        finally:
+            conn.close()
+
+    def test_entries_follow_insert_overwrite_and_eviction(self):
+        cache = EmbeddingCache(self.path, max_entries=10)
+        cache.put_many("m", DIM, {f"h{i}": [float(i)] * DIM for i in range(6)})
+        cache.put_many("m", DIM, {"h0": [9.0] * DIM, "h6": [6.0] * DIM})
+        self.assertEqual(cache.stats()["entries"], 7)
+
+        cache.put_many("m", DIM, {f"n{i}": [1.0] * DIM for i in range(5)})
+        stats = cache.stats()
+        self.assertEqual(stats["entries"], self.count_rows())
+        self.assertEqual(stats["entries"], 9)
+        self.assertEqual(stats["evictions"], 3)
+        self.assertEqual(cache.get_many("m", DIM, ["h0"])["h0"], [9.0] * DIM)
+
+        cache.clear()
+        self.assertEqual(cache.stats()["entries"], 0)
+
+    def test_existing_file_without_counter_is_counted_once(self):
+        EmbeddingCache(self.path, max_entries=100).put_many("m", DIM, {"a": [1.0] * DIM, "b": [2.0] * DIM})
+        conn = sqlite3.connect(self.path)
+        conn.execute("DELETE FROM stats WHERE key = 'entries'")
+        conn.commit()
+        conn.close()
+
+        cache = EmbeddingCache(self.path, max_entries=100)
+        cache.put_many("m", DIM, {"c": [3.0] * DIM})
+        self.assertEqual(cache.stats()["entries"], 3)
+
+
+class PackTokenBatchesTests(TestCase):
+    """
+    embedding_tokens.pack_token_batches: 토큰/입력 수 한도로 요청 묶기
+    """
+
+    def test_keeps_order_and_splits_on_token_budget(self):
+        self.assertEqual(
+            pack_token_batches([4, 4, 4, 9, 1], max_request_tokens=10, max_inputs=100),
+            [[0, 1], [2], [3, 4]],
+        )
+
+    def test_splits_on_input_count(self):
+        self.assertEqual(pack_token_batches([1] * 5, max_request_tokens=100, max_inputs=2), [[0, 1], [2, 3], [4]])
+
+    def test_large_input_goes_alone(self):
+        self.assertEqual(pack_token_batches([2, 30, 2], max_request_tokens=10, max_inputs=100), [[0], [1], [2]])
+
+    def test_input_over_limit_raises(self):
+        with self.assertRaises(ValueError):
+            pack_token_batches([1, 50], max_request_tokens=100, max_inputs=10, max_input_tokens=40)
+
+
+class TokenLimitError(Exception):
+    status_code = 400
+
+
+class FakeEmbeddings:
+    """
+    Embeddings API 대역(입력 텍스트 "t<n>"의 벡터 = [n, 0, 0, 0])
+
+    - max_inputs개를 넘는 요청은 토큰 한도 초과(400)로 거절합니다.
+    """
+
+    def __init__(self, max_inputs: int):
+        self.max_inputs = max_inputs
+        self.requests = []
+
+    def _respond(self, input):
+        self.requests.append(list(input))
+        if len(input) > self.max_inputs:
+            raise TokenLimitError("Requested 9000 tokens, maximum context length is 8192 tokens")
+        data = [SimpleNamespace(embedding=[float(t.lstrip("t")), 0.0, 0.0, 0.0]) for t in input]
+        return SimpleNamespace(data=data)
+
+    def create(self, model, input, dimensions, encoding_format):
+        return self._respond(input)
+
+    async def acreate(self, model, input, dimensions, encoding_format):
+        return self._respond(input)
+
+
+@override_settings(OPENAI_EMBEDDING_DIM=DIM, KB_EMBED_MAX_BATCH_INPUTS=8)
+class OpenAIEmbeddingClientTests(TestCase):
+    """
+    OpenAIEmbeddingClient의 요청 분할/순서 복원/중복 제거(대역 API 사용)
+    """
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        override = override_settings(KB_EMBEDDING_CACHE_PATH=f"{tmp.name}/emb.sqlite3")
+        override.enable()
+        self.addCleanup(override.disable)
+
+        self.api = FakeEmbeddings(max_inputs=3)
+        sync_client = SimpleNamespace(embeddings=SimpleNamespace(create=self.api.create))
+        async_client = SimpleNamespace(embeddings=SimpleNamespace(create=self.api.acreate))
+
+        for target, value in (("get_openai_client", sync_client), ("get_async_openai_client", async_client)):
+            patcher = mock.patch(f"knowledge_base.services.openai_embeddings.{target}", return_value=value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def expected(self, texts):
+        return [[float(t.strip().lstrip("t")), 0.0, 0.0, 0.0] for t in texts]
+
+    def test_oversize_batch_is_split_and_order_kept(self):
+        texts = [f"t{i}" for i in range(10)]
+        client = OpenAIEmbeddingClient()
+
+        self.assertEqual(client.embed_texts(texts), self.expected(texts))
+
+        # 8개 묶음이 거절되면 절반씩 나눠 다시 보내고, 받아들여진 요청에는 각 입력이 한 번씩만 들어갑니다.
+        self.assertEqual(self.api.requests[0], texts[:8])
+        accepted = [t for r in self.api.requests if len(r) <= 3 for t in r]
+        self.assertEqual(sorted(accepted), sorted(texts))
+
+    def test_async_split_keeps_order(self):
+        texts = [f"t{i}" for i in range(10)]
+        client = OpenAIEmbeddingClient()
+
+        self.assertEqual(asyncio.run(client.aembed_texts(texts)), self.expected(texts))
+
+    def test_duplicate_misses_are_sent_once(self):
+        texts = ["t1", "t2", " t1 ", "t3", "t2"]
+        client = OpenAIEmbeddingClient()
+
+        self.assertEqual(client.embed_texts(texts), self.expected(texts))
+        sent = [t for r in self.api.requests if len(r) <= 3 for t in r]
+        self.assertEqual(sorted(sent), ["t1", "t2", "t3"])
+
+        # 두 번째 호출은 캐시 hit만으로 같은 순서의 결과를 돌려줍니다.
+        self.api.requests.clear()
+        self.assertEqual(client.embed_texts(["t3", "t1", "t4"]), self.expected(["t3", "t1", "t4"]))
+        self.assertEqual(self.api.requests, [["t4"]])
+
+
+class CandidateSetTests(TestCase):
+    """
+    CandidateSet이 기존 list 방식(kb_bench_candidates의 list_dedup/list_reorder)과 같은 결과를 내는지 확인
+    """
+
+    def setUp(self):
+        self.matches = make_candidates(50)  # 중복 청크 10% 포함
+        self.candidates = CandidateSet(self.matches)
+
+    def ids(self, cands):
+        return [c["kb_chunk_id"] for c in cands]
+
+    def test_dedup_keeps_first_occurrence(self):
+        expected = list_dedup(self.matches)
+        self.assertEqual(self.candidates.ids(), self.ids(expected))
+        self.assertEqual(len(self.candidates), 50)
+
+        # 먼저 들어온(점수가 높은) 후보 dict가 남습니다.
+        first = self.matches[0]
+        self.assertIs(self.candidates.get(first["kb_chunk_id"]), first)
+        self.assertFalse(self.candidates.add(dict(first)))
+
+    def test_reorder_matches_list_reorder(self):
+        base = list_dedup(self.matches)
+        reranked = [{"id": str(c["kb_chunk_id"])} for c in reversed(base)]
+
+        self.assertEqual(
+            self.candidates.reorder(r["id"] for r in reranked).ids(),
+            self.ids(list_reorder(base, reranked)),
+        )
+
+    def test_reorder_partial_and_unknown_ids(self):
+        base = list_dedup(self.matches)
+        reranked = [{"id": "100007"}, {"id": "999"}, {"id": "100002"}, {"id": None}, {"id": "x"}]
+
+        out = self.candidates.reorder(r["id"] for r in reranked)
+        self.assertEqual(out.ids(), [100007, 100002])
+        self.assertEqual(out.ids(), self.ids(list_reorder(base, reranked)))
+
+        # id를 하나도 못 찾으면 기존 순서 그대로(기존 방식과 동일)
+        unknown = [{"id": "1"}, {"id": "2"}]
+        self.assertIs(self.candidates.reorder(r["id"] for r in unknown), self.candidates)
+        self.assertEqual(self.ids(list_reorder(base, unknown)), self.candidates.ids())
+
+    def test_reorder_skips_repeated_ids(self):
+        out = self.candidates.reorder(["100003", 100003, "100001"])
+        self.assertEqual(out.ids(), [100003, 100001])
+
+    def test_indexing_and_slicing(self):
+        base = list_dedup(self.matches)
+
+        self.assertIs(self.candidates[0], base[0])
+        self.assertIs(self.candidates[-1], base[-1])
+        self.assertEqual(self.ids(self.candidates[3:7]), self.ids(base[3:7]))
+        self.assertEqual(self.ids(self.candidates.top(5)), self.ids(base[:5]))
+        self.assertEqual(self.candidates.top(0), [])
+        self.assertEqual(self.ids(list(self.candidates)), self.ids(base))
+        self.assertIn("100004", self.candidates)
+        self.assertNotIn(5, self.candidates)
+
+
+class TokenizeTests(TestCase):
+    """
+    lexical_index.tokenize: 단어 안 문자 2-gram
+    """
+
+    def test_korean_bigrams_overlap_across_particles(self):
+        self.assertEqual(tokenize("직급코드는"), ["직급", "급코", "코드", "드는"])
+        self.assertEqual(set(tokenize("직급코드는")) & set(tokenize("직급코드를")), {"직급", "급코", "코드"})
+
+    def test_normalizes_width_and_case(self):
+        self.assertEqual(tokenize("ＨＲ-12 a"), ["hr", "12", "a"])
+        self.assertEqual(tokenize(""), [])
+
+
+class LexicalIndexTests(TestCase):
+    """
+    segment 파일 기반 BM25 역색인(쓰기/삭제/증분 반영)
+    """
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        override = override_settings(KB_LEXICAL_INDEX_DIR=tmp.name, KB_LEXICAL_MAX_PROJECTS=2)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        # 프로세스 공용 역색인은 이전 테스트의 디렉터리를 들고 있으므로 비웁니다.
+        lexical_index._indexes.clear()
+        self.addCleanup(lexical_index._indexes.clear)
+
+        self.user = User.objects.create(login_id="HQ:test", affiliation="HQ", employee_no="test", full_name="T")
+        self.project = Project.objects.create(owner=self.user, name="p")
+
+    def make_document(self, texts, importance: int = 3) -> KBDocument:
+        doc = KBDocument.objects.create(
+            owner=self.user, project=self.project, title="d", source_type="text", importance=importance
+        )
+        i = 0
+        while i < len(texts):
+            KBChunk.objects.create(document=doc, chunk_index=i, chunk_text=texts[i], importance=importance)
+            i = i + 1
+        write_document_segment(doc.id)
+        return doc
+
+    def chunk_id(self, doc: KBDocument, index: int) -> int:
+        return doc.chunks.get(chunk_index=index).id
+
+    def test_bm25_ranks_matching_chunks(self):
+        doc = self.make_document(
+            [
+                "연차 휴가는 입사 1년 후 15일이 부여됩니다.",
+                "직급코드는 인사 시스템에서 조회합니다. 직급코드를 변경하려면 승인이 필요합니다.",
+                "직급코드 안내",
+                "복리후생 규정",
+            ]
+        )
+
+        ranked = [m["metadata"]["kb_chunk_id"] for m in lexical_search(self.project.id, "직급코드 변경", top_k=10)]
+        self.assertEqual(ranked[0], self.chunk_id(doc, 1))
+        self.assertIn(self.chunk_id(doc, 2), ranked)
+        self.assertNotIn(self.chunk_id(doc, 3), ranked)
+
+        self.assertEqual(lexical_search(self.project.id, "없는단어xyz", top_k=10), [])
+
+    def test_matches_have_vector_match_shape(self):
+        doc = self.make_document(["직급코드 안내"], importance=5)
+
+        match = get_lexical_index(self.project.id).matches("직급코드", top_k=5)[0]
+        self.assertIsNone(match["id"])
+        self.assertEqual(
+            match["metadata"],
+            {"kb_chunk_id": self.chunk_id(doc, 0), "document_id": doc.id, "chunk_index": 0, "importance": 5},
+        )
+
+    def test_segment_delete_and_rewrite_are_picked_up(self):
+        keep = self.make_document(["직급코드 안내"])
+        gone = self.make_document(["직급코드 변경 절차"])
+        index = get_lexical_index(self.project.id)
+        self.assertEqual(len(index.search("직급코드", top_k=10)), 2)
+
+        delete_document_segment(self.project.id, gone.id)
+        self.assertEqual([c for c, _ in index.search("직급코드", top_k=10)], [self.chunk_id(keep, 0)])
+
+        # 같은 문서 segment를 다시 쓰면 이전 postings를 빼고 새 내용으로 반영합니다.
+        KBChunk.objects.filter(document=keep).update(chunk_text="연차 휴가 일수 계산 방법 안내")
+        write_document_segment(keep.id)
+        self.assertEqual(index.search("직급코드", top_k=10), [])
+        self.assertEqual([c for c, _ in index.search("연차 휴가", top_k=10)], [self.chunk_id(keep, 0)])
+        self.assertNotIn("직급", index._postings)
+
+    def test_index_cache_is_bounded(self):
+        first = get_lexical_index(self.project.id)
+        get_lexical_index(self.project.id + 1000)
+        get_lexical_index(self.project.id + 2000)
+
+        # KB_LEXICAL_MAX_PROJECTS=2: 가장 오래 안 쓴 프로젝트는 내보내고 다시 조회하면 새로 만듭니다.
+        self.assertIsNot(get_lexical_index(self.project.id), first)
+
+
+def match(chunk_id: int, score: float, vector_id=None) -> dict:
+    return {"id": vector_id, "score": score, "metadata": {"kb_chunk_id": chunk_id}}
+
+
+class FuseMatchesRrfTests(TestCase):
+    """
+    rag_context.fuse_matches_rrf: 벡터 + 키워드 결과 reciprocal rank fusion
+    """
+
+    def test_merges_lexical_only_and_vector_matches(self):
+        vector = [match(1, 0.9, "v1"), match(2, 0.8, "v2")]
+        lexical = [match(3, 12.0), match(1, 7.5)]
+
+        fused = fuse_matches_rrf(vector, lexical, k=60)
+        by_chunk = {m["metadata"]["kb_chunk_id"]: m for m in fused}
+
+        # 두 목록에 모두 나온 청크가 1위, 나머지는 각 목록의 순위대로
+        self.assertEqual([m["metadata"]["kb_chunk_id"] for m in fused], [1, 3, 2])
+        self.assertAlmostEqual(by_chunk[1]["score"], (1 / 61 + 1 / 62) / (2 / 61))
+        self.assertAlmostEqual(by_chunk[3]["score"], (1 / 61) / (2 / 61))
+
+        self.assertEqual((by_chunk[1]["vector_score"], by_chunk[1]["lexical_score"]), (0.9, 7.5))
+        self.assertEqual(by_chunk[1]["id"], "v1")
+        self.assertNotIn("vector_score", by_chunk[3])
+        self.assertNotIn("lexical_score", by_chunk[2])
+
+    def test_repeated_vector_hits_count_once(self):
+        vector = [match(1, 0.9, "v1"), match(1, 0.85, "v1-old"), match(2, 0.8, "v2")]
+        lexical = [match(2, 5.0)]
+
+        by_chunk = {m["metadata"]["kb_chunk_id"]: m for m in fuse_matches_rrf(vector, lexical, k=60)}
+        self.assertAlmostEqual(by_chunk[1]["score"], (1 / 61) / (2 / 61))
+        self.assertAlmostEqual(by_chunk[2]["score"], (1 / 62 + 1 / 61) / (2 / 61))
+
+    def test_without_lexical_matches_vector_list_is_unchanged(self):
+        vector = [match(1, 0.9, "v1")]
+        self.assertIs(fuse_matches_rrf(vector, []), vector)
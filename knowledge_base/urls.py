@@ -10,6 +10,8 @@ urlpatterns = [
     path("api/project/<int:project_id>/upload/", api_views.upload_document, name="kb_upload_document"),
     path("api/project/<int:project_id>/documents/", api_views.document_list, name="kb_document_list"),
     path("api/document/<int:document_id>/chunks/", api_views.chunk_list, name="kb_chunk_list"),
+    path("api/job/<int:job_id>/", api_views.job_status, name="kb_job_status"),
 
     path("api/project/<int:project_id>/index/", api_views.index_project_chunks, name="kb_index_project_chunks"),
+    path("api/project/<int:project_id>/index/async/", api_views.index_project_chunks_async, name="kb_index_project_chunks_async"),
 ]
@@ -1,10 +1,168 @@
+import hashlib
+import mmap
 import os
-from typing import List
-
+import sys
+from array import array
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Callable, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import xlrd
 from openpyxl import load_workbook
 from pypdf import PdfReader
 
 
+LineExtractor = Callable[[str], Iterator[str]]
+
+# 확장자 → (source_type, 라인 generator) 레지스트리
+# 새 포맷은 @register_extractor(".ext", "source_type")로 등록하면
+# 업로드 허용 확장자와 ingest 경로에 자동으로 반영됩니다.
+EXTRACTORS: Dict[str, Tuple[str, LineExtractor]] = {}
+
+
+def register_extractor(ext: str, source_type: str) -> Callable[[LineExtractor], LineExtractor]:
+    """
+    확장자별 텍스트 라인 추출기를 등록하는 데코레이터입니다.
+
+    Parameters:
+        ext (str): 소문자 확장자(예: ".xlsx")
+        source_type (str): KBDocument.source_type 값(예: "excel")
+    """
+    def decorator(func: LineExtractor) -> LineExtractor:
+        EXTRACTORS[ext.lower()] = (source_type, func)
+        return func
+
+    return decorator
+
+
+def get_extractor(ext: str) -> Optional[Tuple[str, LineExtractor]]:
+    """
+    확장자에 등록된 (source_type, 라인 generator)를 반환합니다(없으면 None).
+    """
+    return EXTRACTORS.get(ext.lower())
+
+
+@register_extractor(".xlsx", "excel")
+def iter_excel_lines(file_path: str) -> Iterator[str]:
+    """
+    엑셀(.xlsx)을 read_only 모드로 열어 시트/행 단위 텍스트를 하나씩 생성합니다.
+
+    - 시트 시작 시 "[SHEET] 시트명" 라인을 먼저 내보냅니다(시트 문맥 유지).
+    - read_only 모드는 셀 객체를 메모리에 올리지 않으므로
+      대용량 파일에서도 peak memory가 행 1개 수준으로 유지됩니다.
+
+    Parameters:
+        file_path (str):
+            엑셀 파일 경로
+            예: "/tmp/upload.xlsx"
+
+    Yields:
+        str: "[SHEET] 시트명" 또는 "셀1 | 셀2 | ..." 형태의 행 텍스트
+    """
+    wb = load_workbook(filename=file_path, read_only=True, data_only=True)
+
+    try:
+        for ws in wb.worksheets:
+            yield f"[SHEET] {ws.title}"
+
+            for row in ws.iter_rows(values_only=True):
+                cells = []
+
+                for v in row:
+                    if v is None:
+                        continue
+                    s = str(v).strip()
+                    if not s:
+                        continue
+                    cells.append(s)
+
+                if cells:
+                    # 행 단위 텍스트
+                    yield " | ".join(cells)
+    finally:
+        # read_only 워크북은 파일 핸들을 잡고 있으므로 명시적으로 닫습니다.
+        wb.close()
+
+
+def xls_cell_to_text(cell: xlrd.sheet.Cell, datemode: int) -> str:
+    """
+    xlrd 셀 값을 openpyxl(data_only) 추출 결과와 같은 형태의 문자열로 변환합니다.
+
+    - 정수형 숫자(3.0) → "3"
+    - 날짜 셀 → datetime 문자열(예: "2024-01-31 00:00:00")
+    - 빈 셀 → ""
+    """
+    ctype = cell.ctype
+
+    if ctype in (xlrd.XL_CELL_EMPTY, xlrd.XL_CELL_BLANK):
+        return ""
+
+    if ctype == xlrd.XL_CELL_NUMBER:
+        v = cell.value
+        if float(v).is_integer():
+            return str(int(v))
+        return str(v)
+
+    if ctype == xlrd.XL_CELL_DATE:
+        try:
+            return str(xlrd.xldate.xldate_as_datetime(cell.value, datemode))
+        except (xlrd.xldate.XLDateError, ValueError, OverflowError):
+            return str(cell.value)
+
+    if ctype == xlrd.XL_CELL_BOOLEAN:
+        return str(bool(cell.value))
+
+    if ctype == xlrd.XL_CELL_ERROR:
+        return xlrd.error_text_from_code.get(cell.value, "")
+
+    return str(cell.value).strip()
+
+
+@register_extractor(".xls", "excel")
+def iter_xls_lines(file_path: str) -> Iterator[str]:
+    """
+    레거시 엑셀(.xls, BIFF)을 xlrd로 읽어 시트/행 단위 텍스트를 하나씩 생성합니다.
+
+    - openpyxl은 .xls를 읽지 못하므로 xlrd 전용 추출기를 사용합니다.
+    - on_demand=True로 열어 시트를 하나씩 로드/해제합니다(시트 수만큼 메모리가 늘지 않음).
+    - 출력 형식은 iter_excel_lines와 동일합니다.
+
+    Parameters:
+        file_path (str):
+            엑셀 파일 경로
+            예: "/tmp/upload.xls"
+
+    Yields:
+        str: "[SHEET] 시트명" 또는 "셀1 | 셀2 | ..." 형태의 행 텍스트
+    """
+    book = xlrd.open_workbook(file_path, on_demand=True)
+
+    try:
+        sheet_idx = 0
+        while sheet_idx < book.nsheets:
+            sheet = book.sheet_by_index(sheet_idx)
+            yield f"[SHEET] {sheet.name}"
+
+            for row in sheet.get_rows():
+                cells = []
+
+                for cell in row:
+                    s = xls_cell_to_text(cell, book.datemode).strip()
+                    if not s:
+                        continue
+                    cells.append(s)
+
+                if cells:
+                    # 행 단위 텍스트
+                    yield " | ".join(cells)
+
+            book.unload_sheet(sheet_idx)
+            sheet_idx = sheet_idx + 1
+    finally:
+        book.release_resources()
+
+
 def extract_text_from_excel(file_path: str) -> str:
     """
     엑셀(.xlsx/.xls)에서 텍스트를 최대한 범용적으로 추출합니다.
@@ -18,31 +176,119 @@ def extract_text_from_excel(file_path: str) -> str:
         str:
             시트/행 단위로 합친 텍스트
     """
-    wb = load_workbook(filename=file_path, data_only=True)
+    if safe_get_extension(file_path) == ".xls":
+        return "\n".join(iter_xls_lines(file_path))
 
-    lines: List[str] = []
+    return "\n".join(iter_excel_lines(file_path))
 
-    for ws in wb.worksheets:
-        sheet_name = ws.title
-        lines.append(f"[SHEET] {sheet_name}")
 
-        for row in ws.iter_rows(values_only=True):
-            cells = []
+def open_pdf_mmap(file_path: str) -> Tuple[PdfReader, mmap.mmap]:
+    """
+    PDF를 mmap으로 열어 PdfReader를 만듭니다.
 
-            for v in row:
-                if v is None:
-                    continue
-                s = str(v).strip()
-                if not s:
-                    continue
-                cells.append(s)
+    여러 프로세스가 같은 파일을 열어도 OS 페이지 캐시를 공유하므로
+    worker마다 파일 전체를 복사해 읽지 않습니다.
+    호출자는 반환된 mmap을 사용 후 close() 해야 합니다.
+    """
+    with open(file_path, "rb") as fp:
+        mm = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
 
-            if cells:
-                # 행 단위 텍스트
-                line = " | ".join(cells)
-                lines.append(line)
+    return PdfReader(mm), mm
 
-    return "\n".join(lines)
+
+def extract_pdf_page_range(file_path: str, start: int, end: int) -> List[Tuple[int, str]]:
+    """
+    PDF의 [start, end) 페이지 텍스트를 추출합니다(프로세스 풀 worker 작업 단위).
+
+    Returns:
+        List[Tuple[int, str]]: (1부터 시작하는 페이지 번호, strip된 텍스트) 목록
+    """
+    reader, mm = open_pdf_mmap(file_path)
+
+    out: List[Tuple[int, str]] = []
+    try:
+        page_no = start
+        while page_no < end:
+            text = reader.pages[page_no].extract_text() or ""
+            out.append((page_no + 1, text.strip()))
+            page_no = page_no + 1
+    finally:
+        del reader
+        mm.close()
+
+    return out
+
+
+def iter_pdf_pages_parallel(file_path: str, page_count: int, workers: int) -> Iterator[Tuple[int, str]]:
+    """
+    페이지를 연속 구간(shard)으로 나눠 ProcessPoolExecutor로 병렬 추출합니다.
+
+    - 각 worker는 파일 경로로 PDF를 직접 엽니다(mmap, 파싱 결과를 피클로 넘기지 않음).
+    - executor.map은 제출 순서대로 결과를 돌려주므로 페이지 순서가 유지됩니다.
+    - shard를 worker 수의 4배로 잘게 나눠 페이지별 편차가 있어도 부하가 고르게 분산됩니다.
+
+    Yields:
+        Tuple[int, str]: (페이지 번호, 텍스트)
+    """
+    shard_count = workers * 4
+    shard_size = max(1, -(-page_count // shard_count))
+
+    starts = list(range(0, page_count, shard_size))
+    ends = [min(st + shard_size, page_count) for st in starts]
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = pool.map(extract_pdf_page_range, [file_path] * len(starts), starts, ends)
+        for shard in results:
+            for page_no, text in shard:
+                yield page_no, text
+
+
+@register_extractor(".pdf", "pdf")
+def iter_pdf_lines(file_path: str, workers: Optional[int] = None) -> Iterator[str]:
+    """
+    PDF를 페이지 단위로 읽어 "[PAGE] n" 마커와 페이지 텍스트를 하나씩 생성합니다.
+
+    - workers > 1 이고 페이지 수가 settings.KB_PDF_PARALLEL_MIN_PAGES 이상이면
+      페이지 샤딩 병렬 추출을 사용합니다(pypdf 텍스트 추출은 CPU-bound).
+    - 출력(마커/순서)은 직렬 추출과 동일합니다.
+    - 빈 파일(0 byte)은 mmap할 수 없으므로 열지 않고 아무것도 생성하지 않습니다
+      (ingest는 no_text_extracted로 실패 처리).
+
+    Parameters:
+        file_path (str): PDF 파일 경로
+        workers (int | None): 추출 프로세스 수(None이면 settings.KB_PDF_WORKERS)
+
+    Yields:
+        str: "[PAGE] n" 또는 해당 페이지 텍스트
+    """
+    from django.conf import settings
+
+    if workers is None:
+        workers = settings.KB_PDF_WORKERS
+
+    if os.path.getsize(file_path) == 0:
+        return
+
+    reader, mm = open_pdf_mmap(file_path)
+
+    try:
+        page_count = len(reader.pages)
+
+        if workers > 1 and page_count >= settings.KB_PDF_PARALLEL_MIN_PAGES:
+            pages = iter_pdf_pages_parallel(file_path, page_count, min(workers, page_count))
+        else:
+            pages = (
+                (page_no + 1, (reader.pages[page_no].extract_text() or "").strip())
+                for page_no in range(page_count)
+            )
+
+        for page_no, text in pages:
+            if text:
+                yield f"[PAGE] {page_no}"
+                yield text
+    finally:
+        del reader
+        mm.close()
 
 
 def extract_text_from_pdf(file_path: str) -> str:
@@ -61,22 +307,27 @@ def extract_text_from_pdf(file_path: str) -> str:
         str:
             페이지 단위로 합친 텍스트
     """
-    reader = PdfReader(file_path)
+    return "\n".join(iter_pdf_lines(file_path))
 
-    pages = []
-    page_no = 0
-    while page_no < len(reader.pages):
-        page = reader.pages[page_no]
-        text = page.extract_text() or ""
-        text = text.strip()
 
-        if text:
-            pages.append(f"[PAGE] {page_no + 1}")
-            pages.append(text)
+def iter_units(lines: Iterable[str]) -> Iterator[str]:
+    """
+    라인 스트림에서 '기본 유닛'을 하나씩 생성합니다(build_units_from_text의 스트리밍 버전).
 
-        page_no = page_no + 1
+    - 한 라인 안에 줄바꿈이 있으면(예: 셀 내부 줄바꿈) 다시 나눕니다.
+    - 공백/너무 짧은 라인은 제거합니다.
+    """
+    for text in lines:
+        for line in text.splitlines():
+            s = line.strip()
+            if not s:
+                continue
 
-    return "\n".join(pages)
+            # 너무 짧은 노이즈 제거(필요시 조정)
+            if len(s) < 2:
+                continue
+
+            yield s
 
 
 def build_units_from_text(extracted_text: str) -> List[str]:
@@ -91,21 +342,59 @@ def build_units_from_text(extracted_text: str) -> List[str]:
         List[str]:
             기본 유닛 리스트
     """
-    raw_lines = extracted_text.splitlines()
-    units: List[str] = []
+    return list(iter_units([extracted_text]))
+
+
+def iter_chunks_with_context(
+    units: Iterable[str],
+    window: int = 1,
+    max_chars: int = 1200,
+) -> Iterator[str]:
+    """
+    chunk_with_context의 스트리밍 버전입니다.
+
+    유닛 전체를 리스트로 만들지 않고, 앞/뒤 window 만큼만 버퍼(deque)에 유지하면서
+    i번째 chunk를 만들 수 있는 시점(i+window 유닛 도착)에 바로 내보냅니다.
+    결과는 chunk_with_context와 동일합니다.
+    """
+    buf: Deque[str] = deque()
+    base = 0  # buf[0]의 절대 인덱스
+    count = 0  # 지금까지 받은 유닛 수
+    next_idx = 0  # 다음에 내보낼 chunk의 중심 인덱스
+
+    def build(idx: int) -> str:
+        start = idx - window
+        end = idx + window
+
+        if start < 0:
+            start = 0
+        if end >= count:
+            end = count - 1
+
+        # 후보 chunk
+        candidate = "\n".join(islice(buf, start - base, end - base + 1))
 
-    for line in raw_lines:
-        s = line.strip()
-        if not s:
-            continue
+        if len(candidate) > max_chars:
+            candidate = buf[idx - base]
+
+        return candidate
+
+    for unit in units:
+        buf.append(unit)
+        count = count + 1
 
-        # 너무 짧은 노이즈 제거(필요시 조정)
-        if len(s) < 2:
-            continue
+        while next_idx + window < count:
+            yield build(next_idx)
+            next_idx = next_idx + 1
 
-        units.append(s)
+            # 더 이상 필요 없는 앞쪽 유닛 제거
+            while base < next_idx - window:
+                buf.popleft()
+                base = base + 1
 
-    return units
+    while next_idx < count:
+        yield build(next_idx)
+        next_idx = next_idx + 1
 
 
 def chunk_with_context(units: List[str], window: int = 1, max_chars: int = 1200) -> List[str]:
@@ -128,33 +417,73 @@ def chunk_with_context(units: List[str], window: int = 1, max_chars: int = 1200)
         List[str]:
             chunk 텍스트 리스트
     """
-    chunks: List[str] = []
+    return list(iter_chunks_with_context(units, window=window, max_chars=max_chars))
 
-    idx = 0
-    while idx < len(units):
-        start = idx - window
-        end = idx + window
 
-        if start < 0:
-            start = 0
-        if end >= len(units):
-            end = len(units) - 1
+def safe_get_extension(filename: str) -> str:
+    """
+    파일명에서 확장자를 소문자로 반환합니다.
+    """
+    _, ext = os.path.splitext(filename)
+    return ext.lower().strip()
 
-        # 후보 chunk
-        candidate = "\n".join(units[start : end + 1])
 
-        if len(candidate) > max_chars:
-            candidate = units[idx]
+def text_sha256(text: str) -> str:
+    """
+    문자열의 SHA-256 hex digest를 반환합니다(UTF-8 기준).
+    """
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
 
-        chunks.append(candidate)
-        idx = idx + 1
+def normalize_embedding_text(text: str, max_chars: Optional[int] = None) -> str:
+    """
+    임베딩 입력 텍스트를 정규화합니다(캐시 key와 API 입력에 동일하게 사용).
 
-    return chunks
+    - 줄바꿈/연속 공백 → 공백 1개
+    - max_chars를 주면 그 길이로 절단(모델 입력 한도는 토큰 기준으로
+      OpenAIEmbeddingClient에서 따로 절단합니다)
+    """
+    if text is None:
+        return ""
 
+    s = " ".join(str(text).split())
+    if max_chars is not None and len(s) > max_chars:
+        s = s[:max_chars]
+    return s
 
-def safe_get_extension(filename: str) -> str:
+
+def truncate_utf8(text: str, max_bytes: int) -> Tuple[str, bool]:
     """
-    파일명에서 확장자를 소문자로 반환합니다.
+    UTF-8 인코딩 기준 max_bytes 이하로 텍스트를 자릅니다(멀티바이트 문자 중간에서 자르지 않음).
+
+    Returns:
+        Tuple[str, bool]: (잘린 텍스트, 잘렸는지 여부)
     """
-    _, ext = os.path.splitext(filename)
-    return ext.lower().strip()
\ No newline at end of file
+    data = (text or "").encode("utf-8")
+    if len(data) <= max_bytes:
+        return text or "", False
+
+    return data[:max_bytes].decode("utf-8", errors="ignore"), True
+
+
+def pack_float32(vector: Iterable[float]) -> bytes:
+    """
+    벡터를 float32 little-endian 바이트열로 압축합니다(1024차원 = 4KB).
+    """
+    arr = array("f", vector)
+    if arr.itemsize != 4:
+        raise ValueError("float32 array 를 지원하지 않는 플랫폼입니다.")
+    if sys.byteorder == "big":
+        arr.byteswap()
+    return arr.tobytes()
+
+
+def unpack_float32(blob: bytes) -> List[float]:
+    """
+    pack_float32로 만든 바이트열을 float 리스트로 복원합니다.
+    """
+    arr = array("f")
+    arr.frombytes(bytes(blob))
+    if sys.byteorder == "big":
+        arr.byteswap()
+    return arr.tolist()